@@ -0,0 +1,196 @@
+"""
+Admission control for research sessions
+
+At most max_active research pipelines run per instance. Further requests wait
+in a bounded FIFO queue (the client is told its position via `event: queued`)
+and anything beyond the queue is refused up front with 503 + Retry-After.
+Inside an admitted pipeline each expensive stage (planning, MCP search,
+summarisation) also has its own concurrency limit.
+"""
+import os
+import time
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, Optional
+from fastapi import HTTPException
+
+
+class _Ticket:
+    __slots__ = ("future", "admitted", "released", "enqueued_at")
+
+    def __init__(self) -> None:
+        self.future: Optional["asyncio.Future[bool]"] = None
+        self.admitted = False
+        self.released = False
+        self.enqueued_at = time.time()
+
+
+class _Stage:
+    __slots__ = ("semaphore", "limit", "active", "waiting", "entered_total", "wait_seconds_total")
+
+    def __init__(self, limit: int) -> None:
+        self.semaphore = asyncio.Semaphore(limit)
+        self.limit = limit
+        self.active = 0
+        self.waiting = 0
+        self.entered_total = 0
+        self.wait_seconds_total = 0.0
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        max_active: int = 32,
+        max_queue: int = 64,
+        queue_timeout: float = 30.0,
+        retry_after: int = 5,
+        stage_limits: Optional[Dict[str, int]] = None,
+        enabled: bool = True,
+    ) -> None:
+        self.enabled = enabled
+        self.max_active = max(1, max_active)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.stages: Dict[str, _Stage] = {name: _Stage(max(1, n)) for name, n in (stage_limits or {}).items()}
+        self.active = 0
+        self._waiters: Deque[_Ticket] = deque()
+        self.admitted_total = 0
+        self.queued_total = 0
+        self.rejected_total = 0
+        self.queue_timeouts_total = 0
+
+    def reserve(self) -> _Ticket:
+        """Admit immediately, take a place in the queue, or raise 503 when the queue is full"""
+        ticket = _Ticket()
+        if not self.enabled:
+            ticket.admitted = True
+            return ticket
+        if self.active < self.max_active and not self._waiters:
+            self._admit(ticket)
+            return ticket
+        if len(self._waiters) >= self.max_queue:
+            self.rejected_total += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Server busy. Please retry shortly.",
+                headers={"Retry-After": str(self.retry_after)},
+            )
+        ticket.future = asyncio.get_running_loop().create_future()
+        self._waiters.append(ticket)
+        self.queued_total += 1
+        return ticket
+
+    def _admit(self, ticket: _Ticket) -> None:
+        ticket.admitted = True
+        self.active += 1
+        self.admitted_total += 1
+        if ticket.future is not None and not ticket.future.done():
+            ticket.future.set_result(True)
+
+    def position(self, ticket: _Ticket) -> int:
+        """1-based queue position, or 0 once admitted"""
+        if ticket.admitted:
+            return 0
+        try:
+            return self._waiters.index(ticket) + 1
+        except ValueError:
+            return 0
+
+    async def wait(self, ticket: _Ticket, poll_interval: float = 2.0) -> AsyncIterator[int]:
+        """Yield the ticket's queue position whenever it changes until admitted.
+
+        Raises asyncio.TimeoutError (and gives up the place) after queue_timeout.
+        """
+        deadline = ticket.enqueued_at + self.queue_timeout
+        last = -1
+        while not ticket.admitted:
+            pos = self.position(ticket)
+            if pos != last:
+                last = pos
+                yield pos
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                self.queue_timeouts_total += 1
+                self.release(ticket)
+                raise asyncio.TimeoutError("Timed out waiting for admission")
+            try:
+                await asyncio.wait_for(asyncio.shield(ticket.future), min(poll_interval, remaining))  # type: ignore[arg-type]
+            except asyncio.TimeoutError:
+                pass
+
+    def release(self, ticket: _Ticket) -> None:
+        """Give up a running slot or queue place (idempotent) and admit the next waiter"""
+        if ticket.released or not self.enabled:
+            return
+        ticket.released = True
+        if not ticket.admitted:
+            try:
+                self._waiters.remove(ticket)
+            except ValueError:
+                pass
+            return
+        self.active -= 1
+        while self._waiters and self.active < self.max_active:
+            self._admit(self._waiters.popleft())
+
+    @asynccontextmanager
+    async def stage(self, name: str) -> AsyncIterator[None]:
+        """Hold one of the stage's concurrency slots (no limit for unknown stages)"""
+        stage = self.stages.get(name)
+        if stage is None or not self.enabled:
+            yield
+            return
+        started = time.perf_counter()
+        stage.waiting += 1
+        try:
+            await stage.semaphore.acquire()
+        finally:
+            stage.waiting -= 1
+        stage.active += 1
+        stage.entered_total += 1
+        stage.wait_seconds_total += time.perf_counter() - started
+        try:
+            yield
+        finally:
+            stage.active -= 1
+            stage.semaphore.release()
+
+    def get_stats(self) -> Dict:
+        """Get admission and per-stage concurrency metrics"""
+        return {
+            "enabled": self.enabled,
+            "max_active": self.max_active,
+            "max_queue": self.max_queue,
+            "active": self.active,
+            "queued": len(self._waiters),
+            "admitted_total": self.admitted_total,
+            "queued_total": self.queued_total,
+            "rejected_total": self.rejected_total,
+            "queue_timeouts_total": self.queue_timeouts_total,
+            "stages": {
+                name: {
+                    "limit": s.limit,
+                    "active": s.active,
+                    "waiting": s.waiting,
+                    "entered_total": s.entered_total,
+                    "avg_wait_ms": round(s.wait_seconds_total / s.entered_total * 1000, 2) if s.entered_total else 0,
+                }
+                for name, s in self.stages.items()
+            },
+        }
+
+
+admission = AdmissionController(
+    max_active=int(os.getenv("ADMISSION_MAX_SESSIONS", "32")),
+    max_queue=int(os.getenv("ADMISSION_MAX_QUEUE", "64")),
+    queue_timeout=float(os.getenv("ADMISSION_QUEUE_TIMEOUT_SECONDS", "30")),
+    retry_after=int(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", "5")),
+    stage_limits={
+        "planning": int(os.getenv("STAGE_PLANNING_CONCURRENCY", "16")),
+        "search": int(os.getenv("STAGE_SEARCH_CONCURRENCY", "8")),
+        "summarize": int(os.getenv("STAGE_SUMMARIZE_CONCURRENCY", "16")),
+    },
+    enabled=os.getenv("ADMISSION_ENABLED", "1").lower() not in ("0", "false", "no"),
+)
@@ -0,0 +1,253 @@
+"""
+Response caches for the Olexi Extension Host
+
+Bounded LRU+TTL caches with hit/miss counters and a pluggable backend:
+in-process by default, a local SQLite file, or a Redis-compatible store.
+"""
+import os
+import time
+import json
+import sqlite3
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    import redis.asyncio as aioredis  # type: ignore
+except Exception:  # pragma: no cover
+    aioredis = None  # type: ignore
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Case- and whitespace-insensitive form of a prompt for cache keys."""
+    return " ".join((prompt or "").lower().split()).rstrip(" .?!")
+
+
+def stable_hash(value: Any) -> str:
+    """Short, stable content hash of a JSON-serialisable value."""
+    raw = json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+
+class MemoryCacheBackend:
+    """In-process LRU cache with per-entry expiry."""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 3600) -> None:
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self.evictions = 0
+
+    async def get(self, key: str) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.time():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        self._data[key] = (time.time() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    async def delete(self, key: str) -> None:
+        self._data.pop(key, None)
+
+    def size(self) -> int:
+        return len(self._data)
+
+
+class SqliteCacheBackend:
+    """LRU+TTL cache persisted to a local SQLite file, so entries survive restarts.
+
+    Queries run in a worker thread to keep the event loop free.
+    """
+
+    def __init__(self, path: str, namespace: str, max_entries: int = 1024, ttl_seconds: float = 3600) -> None:
+        self.path = path
+        self.namespace = namespace
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "ns TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, "
+            "expires_at REAL NOT NULL, accessed_at REAL NOT NULL, PRIMARY KEY (ns, key))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cache_lru ON cache (ns, accessed_at)")
+
+    def _get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM cache WHERE ns = ? AND key = ?", (self.namespace, key)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] < now:
+                self._conn.execute("DELETE FROM cache WHERE ns = ? AND key = ?", (self.namespace, key))
+                return None
+            self._conn.execute(
+                "UPDATE cache SET accessed_at = ? WHERE ns = ? AND key = ?", (now, self.namespace, key)
+            )
+        return json.loads(row[0])
+
+    def _set(self, key: str, value: Any, ttl: float) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (ns, key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (self.namespace, key, json.dumps(value), now + ttl, now),
+            )
+            count = self._conn.execute("SELECT COUNT(*) FROM cache WHERE ns = ?", (self.namespace,)).fetchone()[0]
+            if count > self.max_entries:
+                excess = count - self.max_entries
+                self._conn.execute(
+                    "DELETE FROM cache WHERE ns = ? AND key IN ("
+                    "SELECT key FROM cache WHERE ns = ? ORDER BY expires_at < ? DESC, accessed_at ASC LIMIT ?)",
+                    (self.namespace, self.namespace, now, excess),
+                )
+                self.evictions += excess
+
+    def _delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE ns = ? AND key = ?", (self.namespace, key))
+
+    async def get(self, key: str) -> Optional[Any]:
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        await asyncio.to_thread(self._set, key, value, ttl)
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(self._delete, key)
+
+    def size(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM cache WHERE ns = ?", (self.namespace,)).fetchone()[0]
+
+
+class RedisCacheBackend:
+    """Redis-protocol backend; values are stored as JSON with a server-side TTL.
+
+    Size is bounded by the store's own eviction policy (e.g. allkeys-lru).
+    """
+
+    def __init__(self, url: str, namespace: str, ttl_seconds: float = 3600) -> None:
+        if aioredis is None:
+            raise RuntimeError("Redis cache backend requires the 'redis' package")
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.client = aioredis.Redis.from_url(url)
+        self.evictions = 0
+
+    def _key(self, key: str) -> str:
+        return f"olexi:{self.namespace}:{key}"
+
+    async def get(self, key: str) -> Optional[Any]:
+        raw = await self.client.get(self._key(key))
+        return json.loads(raw) if raw is not None else None
+
+    async def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        await self.client.set(self._key(key), json.dumps(value), ex=max(1, int(ttl)))
+
+    async def delete(self, key: str) -> None:
+        await self.client.delete(self._key(key))
+
+    def size(self) -> int:
+        return -1
+
+
+class ResponseCache:
+    """Named cache front-end with hit/miss counters.
+
+    Backend errors are logged and treated as misses, so a flaky store never
+    fails a research request.
+    """
+
+    def __init__(self, name: str, backend: Any, enabled: bool = True) -> None:
+        self.name = name
+        self.backend = backend
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    async def get(self, key: str) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        try:
+            value = await self.backend.get(key)
+        except Exception as e:
+            self.errors += 1
+            print(f"{self.name} cache get failed: {e}")
+            value = None
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        if not self.enabled:
+            return
+        try:
+            await self.backend.set(key, value, ttl_seconds)
+        except Exception as e:
+            self.errors += 1
+            print(f"{self.name} cache set failed: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "backend": type(self.backend).__name__,
+            "entries": self.backend.size(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0,
+            "evictions": self.backend.evictions,
+            "errors": self.errors,
+        }
+
+
+def make_cache(name: str, default_size: int = 1024, default_ttl: float = 3600) -> ResponseCache:
+    """Build a cache configured from <NAME>_CACHE_* env vars.
+
+    <NAME>_CACHE_ENABLED (default 1), <NAME>_CACHE_SIZE, <NAME>_CACHE_TTL_SECONDS,
+    <NAME>_CACHE_BACKEND=memory|sqlite|redis (sqlite uses CACHE_SQLITE_PATH,
+    redis uses CACHE_REDIS_URL).
+    """
+    prefix = name.upper()
+    enabled = os.getenv(f"{prefix}_CACHE_ENABLED", "1").lower() not in ("0", "false", "no")
+    size = int(os.getenv(f"{prefix}_CACHE_SIZE", str(default_size)))
+    ttl = float(os.getenv(f"{prefix}_CACHE_TTL_SECONDS", str(default_ttl)))
+    backend_name = os.getenv(f"{prefix}_CACHE_BACKEND", "memory").strip().lower()
+    backend: Any = None
+    if backend_name == "sqlite":
+        try:
+            backend = SqliteCacheBackend(os.getenv("CACHE_SQLITE_PATH", "/tmp/olexi-cache.sqlite3"), name.lower(), size, ttl)
+        except Exception as e:
+            print(f"{name} cache: SQLite backend unavailable ({e}); using in-process cache")
+    elif backend_name == "redis":
+        try:
+            backend = RedisCacheBackend(os.getenv("CACHE_REDIS_URL", "redis://127.0.0.1:6379/0"), name.lower(), ttl)
+        except Exception as e:
+            print(f"{name} cache: Redis backend unavailable ({e}); using in-process cache")
+    if backend is None:
+        backend = MemoryCacheBackend(size, ttl)
+    return ResponseCache(name.lower(), backend, enabled=enabled)
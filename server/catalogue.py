@@ -0,0 +1,181 @@
+"""
+Precomputed views of the AustLII database catalogue for the host planner
+
+Builds, once at import, a compact one-line-per-database text for planner
+prompts and a keyword index from court abbreviations and jurisdiction words
+to database codes, used to narrow the candidate set for a prompt.
+"""
+import os
+import re
+from typing import Dict, List, Set, Tuple, Any
+
+from .cache import stable_hash
+from .database_map import DATABASE_TOOLS_LIST
+
+_YEARS_RE = re.compile(r"\((\d{4})-present\)")
+_USE_FOR_RE = re.compile(r"Use for (.*?)\.?$")
+
+
+def compact_line(tool: Dict[str, Any]) -> str:
+    """Render one database as `code | name (since) | use for` for planner prompts."""
+    desc = str(tool.get("description", ""))
+    years = _YEARS_RE.search(desc)
+    use = _USE_FOR_RE.search(desc)
+    name = str(tool.get("name", ""))
+    if years:
+        name = f"{name} ({years.group(1)}-)"
+    return f"{tool.get('code', '')} | {name} | {use.group(1) if use else desc}"
+
+
+_LINES_BY_CODE: Dict[str, str] = {str(t["code"]): compact_line(t) for t in DATABASE_TOOLS_LIST}
+COMPACT_CATALOGUE = "\n".join(_LINES_BY_CODE[str(t["code"])] for t in DATABASE_TOOLS_LIST)
+CATALOGUE_HASH = stable_hash(DATABASE_TOOLS_LIST)
+
+
+def catalogue_text(tools: List[Dict[str, Any]]) -> str:
+    """Compact catalogue text for tools, reusing the precomputed lines where possible."""
+    if tools is DATABASE_TOOLS_LIST:
+        return COMPACT_CATALOGUE
+    return "\n".join(_LINES_BY_CODE.get(str(t.get("code")), None) or compact_line(t) for t in tools)
+
+
+def catalogue_hash(tools: List[Dict[str, Any]]) -> str:
+    return CATALOGUE_HASH if tools is DATABASE_TOOLS_LIST else stable_hash(tools)
+
+
+def _jurisdiction(code: str) -> str:
+    parts = code.split("/")
+    return parts[2] if len(parts) > 2 else ""
+
+
+# Jurisdiction words. Short forms that are also common English words
+# (WA, SA, NT, ACT) only count when written in capitals.
+_JURISDICTION_WORDS: Dict[str, List[str]] = {
+    "cth": ["commonwealth", "federal", "cth", "national"],
+    "nsw": ["nsw", "new south wales", "sydney"],
+    "vic": ["vic", "victoria", "victorian", "melbourne"],
+    "qld": ["qld", "queensland", "brisbane"],
+    "wa": ["western australia", "western australian", "perth"],
+    "sa": ["south australia", "south australian", "adelaide"],
+    "tas": ["tas", "tasmania", "tasmanian", "hobart"],
+    "nt": ["northern territory", "darwin"],
+    "act": ["australian capital territory", "canberra"],
+}
+_JURISDICTION_CAPS: Dict[str, str] = {"WA": "wa", "SA": "sa", "NT": "nt", "ACT": "act"}
+
+# Court names and common abbreviations that are not the AustLII code itself
+_COURT_ALIASES: Dict[str, str] = {
+    "high court": "au/cases/cth/HCA",
+    "full federal court": "au/cases/cth/FCAFC",
+    "full court of the federal court": "au/cases/cth/FCAFC",
+    "federal court": "au/cases/cth/FCA",
+    "family court": "au/cases/cth/FamCA",
+    "federal circuit": "au/cases/cth/FedCFamC1F",
+    "aat": "au/cases/cth/AATA",
+    "administrative appeals tribunal": "au/cases/cth/AATA",
+    "fair work": "au/cases/cth/FWC",
+    "fwc": "au/cases/cth/FWC",
+    "native title": "au/cases/cth/NNTTA",
+    "ncat": "au/cases/nsw/NSWCATAD",
+    "land and environment court": "au/cases/nsw/NSWLEC",
+    "court of criminal appeal": "au/cases/nsw/NSWCCA",
+    "vcat": "au/cases/vic/VCAT",
+    "county court": "au/cases/vic/VCC",
+    "qcat": "au/cases/qld/QCAT",
+    "sacat": "au/cases/sa/SACAT",
+    "tascat": "au/cases/tas/TASCAT",
+    "ntcat": "au/cases/nt/NTCAT",
+    "acat": "au/cases/act/ACAT",
+}
+# Aliases that are also subject matter ("native title extinguishment", "fair work
+# unfair dismissal"): the words may be the search itself, not a court choice
+_AMBIGUOUS_ALIASES = frozenset({"native title", "fair work", "county court"})
+_AMBIGUOUS_RE = re.compile(r"\b(" + "|".join(sorted(_AMBIGUOUS_ALIASES)) + r")\b")
+
+# Court code index: the last path segment of each case database (HCA, NSWSC, ...)
+COURT_CODE_INDEX: Dict[str, str] = {}
+for _tool in DATABASE_TOOLS_LIST:
+    _code = str(_tool["code"])
+    _segments = _code.split("/")
+    if len(_segments) == 4 and _segments[1] == "cases":
+        COURT_CODE_INDEX[_segments[3].lower()] = _code
+for _alias, _code in _COURT_ALIASES.items():
+    COURT_CODE_INDEX.setdefault(_alias, _code)
+
+# Databases grouped by jurisdiction, in catalogue order
+JURISDICTION_INDEX: Dict[str, List[str]] = {}
+for _tool in DATABASE_TOOLS_LIST:
+    JURISDICTION_INDEX.setdefault(_jurisdiction(str(_tool["code"])), []).append(str(_tool["code"]))
+
+
+def _phrase_pattern(phrases: List[str]) -> "re.Pattern[str]":
+    # Longest first so "full federal court" wins over "federal court"
+    alternatives = sorted(phrases, key=len, reverse=True)
+    return re.compile(r"\b(" + "|".join(re.escape(p) for p in alternatives) + r")\b")
+
+
+_COURT_RE = _phrase_pattern(list(COURT_CODE_INDEX))
+_JURISDICTION_BY_WORD: Dict[str, str] = {w: j for j, words in _JURISDICTION_WORDS.items() for w in words}
+_JURISDICTION_RE = _phrase_pattern(list(_JURISDICTION_BY_WORD))
+_JURISDICTION_CAPS_RE = re.compile(r"\b(" + "|".join(_JURISDICTION_CAPS) + r")\b")
+
+
+def match_databases(prompt: str) -> Tuple[List[str], List[str]]:
+    """Find court codes and jurisdictions named in a prompt.
+
+    Returns (database codes named directly, jurisdictions mentioned), both in
+    first-mention order.
+    """
+    text = prompt or ""
+    lowered = text.lower()
+    courts: List[str] = []
+    for m in _COURT_RE.finditer(lowered):
+        code = COURT_CODE_INDEX[m.group(1)]
+        if code not in courts:
+            courts.append(code)
+    jurisdictions: List[str] = []
+    for m in _JURISDICTION_RE.finditer(lowered):
+        j = _JURISDICTION_BY_WORD[m.group(1)]
+        if j not in jurisdictions:
+            jurisdictions.append(j)
+    for m in _JURISDICTION_CAPS_RE.finditer(text):
+        j = _JURISDICTION_CAPS[m.group(1)]
+        if j not in jurisdictions:
+            jurisdictions.append(j)
+    return courts, jurisdictions
+
+
+def ambiguous_terms(prompt: str) -> List[str]:
+    """Court aliases in a prompt that could equally be its search terms"""
+    return sorted(set(_AMBIGUOUS_RE.findall((prompt or "").lower())))
+
+
+def strip_database_terms(prompt: str) -> str:
+    """Lower-cased prompt with court and jurisdiction mentions removed."""
+    text = _JURISDICTION_CAPS_RE.sub(" ", prompt or "").lower()
+    text = _COURT_RE.sub(" ", text)
+    return _JURISDICTION_RE.sub(" ", text)
+
+
+_PREFILTER_ENABLED = os.getenv("PLANNER_PREFILTER", "1").lower() not in ("0", "false", "no")
+_ALWAYS_OFFERED = ["au/cases/cth/HCA"]
+
+
+def narrow_catalogue(prompt: str, tools: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Candidate databases for a prompt: named courts plus their jurisdictions.
+
+    Returns tools unchanged when the prompt names no court or jurisdiction (or
+    PLANNER_PREFILTER=0), so the model still sees the full catalogue for broad
+    questions.
+    """
+    if not _PREFILTER_ENABLED:
+        return tools
+    courts, jurisdictions = match_databases(prompt)
+    if not courts and not jurisdictions:
+        return tools
+    wanted: Set[str] = set(courts) | set(_ALWAYS_OFFERED)
+    for j in jurisdictions:
+        wanted.update(JURISDICTION_INDEX.get(j, []))
+    for code in courts:
+        wanted.update(c for c in JURISDICTION_INDEX.get(_jurisdiction(code), []) if "/legis/" not in c)
+    return [t for t in tools if str(t.get("code")) in wanted]
@@ -8,7 +8,11 @@ from __future__ import annotations
 
 import os
 import json
-from typing import Dict, List, Any, Optional
+import time
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional, AsyncIterator
 from dotenv import load_dotenv
 from pathlib import Path
 
@@ -38,6 +42,10 @@ if not _DEFAULT_ENV_LOADED:
     except Exception:
         pass
 
+from .cache import make_cache, normalize_prompt
+from .catalogue import catalogue_hash, catalogue_text, narrow_catalogue
+from .tracing import TRACER
+
 try:
     from google import genai
     from google.genai import types
@@ -50,6 +58,18 @@ class HostAI:
     def __init__(self) -> None:
         self.available = False
         self.client = None
+        # Async call limits: bounded concurrency and a per-call timeout
+        self.max_concurrency = max(1, int(os.getenv("HOST_AI_MAX_CONCURRENCY", "16")))
+        self.timeout_seconds = float(os.getenv("HOST_AI_TIMEOUT_SECONDS", "60"))
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="host-ai")
+        self._queued = 0
+        self._in_flight = 0
+        self.calls_total = 0
+        self.timeouts_total = 0
+        self.errors_total = 0
+        # Plans are cached by normalised prompt, max_dbs and catalogue hash
+        self.plan_cache = make_cache("plan", default_size=1024, default_ttl=3600)
         host_key = os.getenv("HOST_GOOGLE_API_KEY") or os.getenv("GOOGLE_API_KEY")
         if genai is None or types is None or not host_key:
             return
@@ -60,10 +80,9 @@ class HostAI:
         except Exception:
             self.available = False
 
-    def plan_search(self, user_prompt: str, database_tools: List[Dict[str, Any]], max_dbs: int = 5) -> Dict[str, Any]:
-        if not self.available or self.client is None:
-            raise RuntimeError("Host AI unavailable")
-        tools_json = json.dumps(database_tools, indent=2)
+    def _plan_request(self, user_prompt: str, database_tools: List[Dict[str, Any]], max_dbs: int) -> Dict[str, Any]:
+        # Compact, precomputed catalogue lines, narrowed to the prompt's courts/jurisdictions
+        tools_text = catalogue_text(narrow_catalogue(user_prompt, database_tools))
         sys_prompt = (
             "You are a legal research planner for AustLII. Return STRICT JSON with keys exactly:\n"
             "{\"query\": string, \"databases\": string[]} and nothing else.\n\n"
@@ -75,8 +94,8 @@ class HostAI:
             f"- Select at most {max_dbs} database codes. Prefer specific court codes over broad masks unless user intent is ambiguous.\n"
             "- If the prompt implies federal/high court, bias to HCA, FCA, FCAFC; else choose the closest state/tribunal codes.\n"
             "- Do not add commentary. Output MUST be valid JSON with only the two keys above.\n\n"
-            "Available databases (code, name, description):\n"
-            f"{tools_json}\n"
+            "Available databases (code | name (coverage from) | use for):\n"
+            f"{tools_text}\n"
         )
         kwargs: Dict[str, Any] = {
             "model": os.getenv("HOST_MODEL", "gemini-2.5-flash"),
@@ -84,8 +103,9 @@ class HostAI:
         }
         if types is not None:
             kwargs["config"] = types.GenerateContentConfig(response_mime_type="application/json")
-        resp = self.client.models.generate_content(**kwargs)
+        return kwargs
 
+    def _parse_plan(self, resp: Any, max_dbs: int) -> Dict[str, Any]:
         # Robust JSON extraction: handle code fences or extra text around JSON
         raw_text = (getattr(resp, "text", None) or "").strip()
         def _strip_code_fences(s: str) -> str:
@@ -139,9 +159,7 @@ class HostAI:
         data["query"] = q
         return data
 
-    def summarize(self, user_prompt: str, results: List[Dict[str, Any]]) -> str:
-        if not self.available or self.client is None:
-            raise RuntimeError("Host AI unavailable")
+    def _summary_request(self, user_prompt: str, results: List[Dict[str, Any]]) -> Dict[str, Any]:
         sys_prompt = (
             "You are Olexi AI, a neutral legal research assistant. Summarise ONLY based on the provided results. "
             "Use British English. Return concise Markdown with sections: \n\n"
@@ -157,8 +175,149 @@ class HostAI:
             f"{sys_prompt}\n\nUser question: {user_prompt}\n\n"
             f"Results JSON:\n{tool_str}"
         )
-        resp = self.client.models.generate_content(model=os.getenv("HOST_MODEL", "gemini-2.5-flash"), contents=prompt)
+        return {"model": os.getenv("HOST_MODEL", "gemini-2.5-flash"), "contents": prompt}
+
+    def _require_client(self) -> None:
+        if not self.available or self.client is None:
+            raise RuntimeError("Host AI unavailable")
+
+    async def _agenerate(self, **kwargs: Any) -> Any:
+        """Run generate_content without blocking the event loop.
+
+        Uses the SDK's async client when present, otherwise a bounded thread pool.
+        Concurrency is capped by a semaphore; callers beyond the cap queue here.
+        """
+        with TRACER.span("gemini.generate_content", **{"gen_ai.system": "gemini", "gen_ai.request.model": kwargs.get("model")}) as span:
+            queued_at = time.perf_counter()
+            self._queued += 1
+            try:
+                await self._semaphore.acquire()
+            finally:
+                self._queued -= 1
+            span.set_attribute("queue_wait_ms", round((time.perf_counter() - queued_at) * 1000, 2))
+            self._in_flight += 1
+            self.calls_total += 1
+            try:
+                aio = getattr(self.client, "aio", None)
+                if aio is not None:
+                    call = aio.models.generate_content(**kwargs)
+                else:
+                    loop = asyncio.get_running_loop()
+                    call = loop.run_in_executor(self._executor, functools.partial(self.client.models.generate_content, **kwargs))
+                return await asyncio.wait_for(call, timeout=self.timeout_seconds)
+            except asyncio.TimeoutError:
+                self.timeouts_total += 1
+                raise RuntimeError(f"Host AI call timed out after {self.timeout_seconds:g}s")
+            except Exception:
+                self.errors_total += 1
+                raise
+            finally:
+                self._in_flight -= 1
+                self._semaphore.release()
+
+    def plan_search(self, user_prompt: str, database_tools: List[Dict[str, Any]], max_dbs: int = 5) -> Dict[str, Any]:
+        self._require_client()
+        resp = self.client.models.generate_content(**self._plan_request(user_prompt, database_tools, max_dbs))
+        return self._parse_plan(resp, max_dbs)
+
+    async def aplan_search(self, user_prompt: str, database_tools: List[Dict[str, Any]], max_dbs: int = 5) -> Dict[str, Any]:
+        """Async variant of plan_search that does not block the event loop.
+
+        Repeated prompts are served from the plan cache.
+        """
+        self._require_client()
+        cache_key = f"{catalogue_hash(database_tools)}:{max_dbs}:{normalize_prompt(user_prompt)}"
+        cached = await self.plan_cache.get(cache_key)
+        if cached is not None:
+            return dict(cached)
+        resp = await self._agenerate(**self._plan_request(user_prompt, database_tools, max_dbs))
+        plan = self._parse_plan(resp, max_dbs)
+        await self.plan_cache.set(cache_key, plan)
+        return dict(plan)
+
+    def summarize(self, user_prompt: str, results: List[Dict[str, Any]]) -> str:
+        self._require_client()
+        resp = self.client.models.generate_content(**self._summary_request(user_prompt, results))
+        return resp.text or ""
+
+    async def asummarize(self, user_prompt: str, results: List[Dict[str, Any]]) -> str:
+        """Async variant of summarize that does not block the event loop."""
+        self._require_client()
+        resp = await self._agenerate(**self._summary_request(user_prompt, results))
         return resp.text or ""
 
+    async def astream_summary(self, user_prompt: str, results: List[Dict[str, Any]]) -> AsyncIterator[str]:
+        """Stream the summary as text chunks via the SDK's streaming generation.
+
+        Holds one concurrency slot for the whole stream; the timeout applies to
+        each wait for the next chunk. Falls back to a single chunk when the async
+        client is unavailable.
+        """
+        self._require_client()
+        aio = getattr(self.client, "aio", None)
+        if aio is None:
+            yield await self.asummarize(user_prompt, results)
+            return
+        request = self._summary_request(user_prompt, results)
+        with TRACER.span("gemini.generate_content_stream", **{"gen_ai.system": "gemini", "gen_ai.request.model": request.get("model")}) as span:
+            started = time.perf_counter()
+            self._queued += 1
+            try:
+                await self._semaphore.acquire()
+            finally:
+                self._queued -= 1
+            span.set_attribute("queue_wait_ms", round((time.perf_counter() - started) * 1000, 2))
+            self._in_flight += 1
+            self.calls_total += 1
+            n_chunks = 0
+            chunks = None
+            finished = False
+            try:
+                stream = await asyncio.wait_for(aio.models.generate_content_stream(**request), timeout=self.timeout_seconds)
+                chunks = stream.__aiter__()
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), timeout=self.timeout_seconds)
+                    except StopAsyncIteration:
+                        finished = True
+                        break
+                    text = getattr(chunk, "text", None)
+                    if text:
+                        if n_chunks == 0:
+                            span.set_attribute("time_to_first_chunk_ms", round((time.perf_counter() - started) * 1000, 2))
+                        n_chunks += 1
+                        yield text
+            except asyncio.TimeoutError:
+                self.timeouts_total += 1
+                raise RuntimeError(f"Host AI call timed out after {self.timeout_seconds:g}s")
+            except Exception:
+                self.errors_total += 1
+                raise
+            finally:
+                span.set_attribute("chunks", n_chunks)
+                self._in_flight -= 1
+                self._semaphore.release()
+                # Stopped early (client gone, timeout): close the HTTP stream rather than leave Gemini generating
+                aclose = getattr(chunks, "aclose", None)
+                if not finished and aclose is not None:
+                    try:
+                        await aclose()
+                    except Exception:
+                        pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get Host AI call statistics (queue depth, in-flight calls, timeouts)"""
+        return {
+            "available": self.available,
+            "max_concurrency": self.max_concurrency,
+            "timeout_seconds": self.timeout_seconds,
+            "queued": self._queued,
+            "in_flight": self._in_flight,
+            "calls_total": self.calls_total,
+            "timeouts_total": self.timeouts_total,
+            "errors_total": self.errors_total,
+            "plan_cache": self.plan_cache.get_stats(),
+        }
+
 
 HOST_AI = HostAI()
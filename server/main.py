@@ -1,5 +1,5 @@
-from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import FileResponse, StreamingResponse
+from fastapi import Depends, FastAPI, HTTPException, Request
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
@@ -8,27 +8,46 @@ import urllib.parse
 import os
 from pathlib import Path
 import json
+import time
 import asyncio
+import inspect
+from contextlib import aclosing
 
-# MCP client utilities
-from mcp import ClientSession
-from mcp.client.streamable_http import streamablehttp_client
+# Pooled MCP client sessions
+from .mcp_pool import cancel_request, mcp_pool, next_request_id
 
-# Host-side AI (planning & summarization)
+# Host-side AI (planning & summarization) and the rule-based fast path
 from .host_agent import HOST_AI
+from .rule_planner import RULE_PLANNER
 
-# Rate limiting
+# Response caches and request coalescing
+from .cache import make_cache, normalize_prompt, stable_hash
+from .single_flight import SingleFlight
+
+# Search result parsing, filtering and de-duplication
+from .results import as_items, is_vague, process_results
+from .result_handles import result_handles
+from .research_sessions import parse_last_event_id, research_sessions
+
+# SSE framing, progress coalescing and keep-alives
+from .sse import KEEPALIVE_SECONDS, MAX_BUFFERED_FRAMES, PROGRESS_INTERVAL_SECONDS, ProgressChannel, sse_event, with_keepalive
+
+# Latency and error metrics
+from .metrics import METRICS, SESSIONS_CANCELLED, UPSTREAM_ERRORS, UPSTREAM_SECONDS_SAVED, StageTimer, current_timer
+from .tracing import TRACER
+
+# Rate limiting and admission control
 from .rate_limiter import rate_limiter
+from .admission import admission
 
 # Session token management
 from .session_tokens import session_token_manager
 
 # Security utilities
 from .security import (
-    validate_chrome_extension_request, 
-    validate_fingerprint_format, 
-    get_client_ip, 
-    is_suspicious_request
+    RequestSecurity,
+    request_security,
+    get_client_ip,
 )
 
 
@@ -44,6 +63,18 @@ else:
 
 _allowed_origin_regex = os.getenv("ALLOWED_ORIGIN_REGEX")
 
+@app.on_event("startup")
+async def _start_mcp_pool() -> None:
+    await mcp_pool.start()
+    await rate_limiter.start()
+
+
+@app.on_event("shutdown")
+async def _close_mcp_pool() -> None:
+    await mcp_pool.close()
+    await rate_limiter.close()
+
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=_allowed_origins,
@@ -51,6 +82,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Read by the extension: queue back-off and the resumable research session id
+    expose_headers=["Retry-After", "X-Research-Session"],
 )
 
 # Optional static (for local splash/testing) within the server package directory
@@ -103,6 +136,8 @@ class ResearchRequest(BaseModel):
     maxDatabases: int = 5
     yearFrom: Optional[int] = None
     yearTo: Optional[int] = None
+    # Reattach to a running or recently finished session instead of starting a new one
+    sessionId: Optional[str] = None
 
 
 class TokenRequest(BaseModel):
@@ -110,24 +145,198 @@ class TokenRequest(BaseModel):
 
 
 def _build_austlii_url(query: str, dbs: List[str]) -> str:
+    """Build the AustLII sinosrch.cgi share URL exactly as the MCP `build_search_url` tool does."""
     params = [("query", query), ("method", "boolean"), ("meta", "/au")]
     for code in dbs:
         params.append(("mask_path", code))
     return f"https://www.austlii.edu.au/cgi-bin/sinosrch.cgi?{urllib.parse.urlencode(params)}"
 
 
+# Share URL source: "local" (default) builds it in-process; "verify" also asks the
+# MCP tool in the background and counts mismatches; "remote" restores the old
+# blocking MCP round-trip with the local URL as fallback.
+_SHARE_URL_MODE = os.getenv("SHARE_URL_MODE", "local").strip().lower()
+_share_url_stats: Dict[str, int] = {"verified": 0, "mismatches": 0, "verify_errors": 0}
+_background_tasks: "set[asyncio.Task[Any]]" = set()
+
+
+async def _without_session(coro: Any) -> Any:
+    # The task copied the request's context; its work must not land in that session's timings
+    current_timer.set(None)
+    return await coro
+
+
+def _spawn_background(coro: Any) -> None:
+    """Run a fire-and-forget task while keeping a strong reference to it."""
+    task = asyncio.create_task(_without_session(coro))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+async def _fetch_remote_share_url(query: str, dbs: List[str]) -> Optional[str]:
+    """Ask the MCP `build_search_url` tool for the share URL."""
+    share_url: Optional[str] = None
+    with TRACER.span("mcp.call_tool", **{"mcp.tool": "build_search_url"}):
+        async with mcp_pool.session(headers=TRACER.headers()) as session:
+            request_id = next_request_id(session)
+            try:
+                url_res: Any = await session.call_tool("build_search_url", {"query": query, "databases": dbs})
+            except asyncio.CancelledError:
+                await cancel_request(session, request_id, "client disconnected")
+                raise
+            if hasattr(url_res, "structuredContent") and getattr(url_res, "structuredContent", None):
+                sc = getattr(url_res, "structuredContent")
+                if isinstance(sc, dict):
+                    sc = sc.get("result")
+                share_url = sc if isinstance(sc, str) else None
+            if not share_url:
+                for c in getattr(url_res, "content", []) or []:
+                    if getattr(c, "type", "") == "text":
+                        share_url = getattr(c, "text", None)
+                        break
+    return share_url
+
+
+async def _verify_share_url(query: str, dbs: List[str], local_url: str) -> None:
+    try:
+        remote_url = await _fetch_remote_share_url(query, dbs)
+    except Exception as e:
+        _share_url_stats["verify_errors"] += 1
+        UPSTREAM_ERRORS.inc("mcp", "share_url_verify")
+        print(f"Share URL verification failed: {e}")
+        return
+    _share_url_stats["verified"] += 1
+    if remote_url and remote_url != local_url:
+        _share_url_stats["mismatches"] += 1
+        print(f"Share URL mismatch: local={local_url} remote={remote_url}")
+
+
+def _extract_items(result: Any) -> List[Dict]:
+    """Pull the result list out of a search_with_progress tool response."""
+    items_list: List[Dict] = []
+    if result is None:
+        return items_list
+    if hasattr(result, "structuredContent") and getattr(result, "structuredContent", None):
+        sc = getattr(result, "structuredContent", None)
+        if isinstance(sc, list):
+            items_list = sc  # type: ignore[assignment]
+        elif isinstance(sc, dict) and isinstance(sc.get("result"), list):
+            items_list = sc.get("result")  # type: ignore[assignment]
+    if items_list:
+        return items_list
+    for c in getattr(result, "content", []) or []:
+        try:
+            raw = getattr(c, "text", "") or ""
+            if not raw:
+                continue
+            obj = json.loads(raw)
+            if isinstance(obj, list):
+                return obj
+            if isinstance(obj, dict) and isinstance(obj.get("result"), list):
+                return obj.get("result")  # type: ignore[return-value]
+        except Exception:
+            continue
+    return items_list
+
+
+async def _run_search(query: str, dbs: List[str], method: str, on_progress: Any = None) -> List[Dict]:
+    """Call the MCP search_with_progress tool on a pooled session and return its items."""
+    # Borrow a warm session from the pool (connects lazily when cold)
+    timer = current_timer.get()
+    with TRACER.span("mcp.call_tool", **{"mcp.tool": "search_with_progress", "mcp.databases": len(dbs), "mcp.method": method}) as span:
+        progress_cb = on_progress
+        if on_progress is not None:
+            # Progress notifications arrive on the session's reader task, so parent them explicitly
+            async def progress_cb(progress: float, total: Optional[float], message: Optional[str]) -> None:
+                with TRACER.span("mcp.progress", parent=span, progress=progress, total=total, message=message):
+                    await on_progress(progress, total, message)
+
+        borrow_started = time.perf_counter()
+        async with mcp_pool.session(headers=TRACER.headers()) as session:
+            connect_seconds = time.perf_counter() - borrow_started
+            span.set_attribute("mcp.connect_ms", round(connect_seconds * 1000, 2))
+            if timer is not None:
+                timer.record("mcp_connect", connect_seconds)
+            request_id = next_request_id(session)
+            try:
+                res = await session.call_tool(
+                    "search_with_progress",
+                    {"query": query, "databases": dbs, "method": method},
+                    progress_callback=progress_cb,
+                )
+            except asyncio.CancelledError:
+                # Everyone waiting went away: stop the server-side search too
+                await cancel_request(session, request_id, "client disconnected")
+                raise
+        items = _extract_items(res)
+        span.set_attribute("mcp.items", len(items))
+    return items
+
+
+# Search results are cached per (query, databases, method). Entries younger than
+# SEARCH_CACHE_FRESH_SECONDS are served as-is; older ones are served stale while
+# a background refresh replaces them (until SEARCH_CACHE_TTL_SECONDS).
+_search_cache = make_cache("search", default_size=512, default_ttl=3600)
+_SEARCH_CACHE_FRESH_SECONDS = float(os.getenv("SEARCH_CACHE_FRESH_SECONDS", "300"))
+# Stages that call MCP or Gemini; their expected remaining time is what a cancelled session saves
+_UPSTREAM_STAGES = ("planning", "mcp_search", "share_url", "summarization")
+# Items per results_batch SSE event
+_RESULTS_BATCH_SIZE = max(1, int(os.getenv("RESULTS_BATCH_SIZE", "10")))
+_search_refreshing: "set[str]" = set()
+
+# Summaries are cached by normalised prompt + a fingerprint of the preview items
+_summary_cache = make_cache("summary", default_size=1024, default_ttl=6 * 3600)
+
+
+def _summary_cache_key(prompt: str, items: List[Dict]) -> str:
+    fingerprint = stable_hash([[str(it.get("title") or ""), str(it.get("url") or "")] for it in items])
+    return f"{fingerprint}:{normalize_prompt(prompt)}"
+
+
+# Identical searches in flight at the same time share one upstream call_tool
+_search_flights = SingleFlight()
+
+
+async def _coalesced_search(key: str, query: str, dbs: List[str], method: str, on_progress: Any = None) -> List[Dict]:
+    """Run (or join) the single upstream search for key and cache its result."""
+    async def _search(progress_cb: Any) -> List[Dict]:
+        async with admission.stage("search"):
+            items = await _run_search(query, dbs, method, progress_cb)
+        await _search_cache.set(key, {"items": items, "fetched_at": time.time()})
+        return items
+
+    return await _search_flights.run(key, _search, on_progress)
+
+
+def _refresh_search(key: str, query: str, dbs: List[str], method: str) -> None:
+    """Revalidate a stale search cache entry in the background (once per key)."""
+    if key in _search_refreshing:
+        return
+    _search_refreshing.add(key)
+
+    async def _refresh() -> None:
+        try:
+            await _coalesced_search(key, query, dbs, method)
+        except Exception as e:
+            print(f"Search cache refresh failed: {e}")
+        finally:
+            _search_refreshing.discard(key)
+
+    _spawn_background(_refresh())
+
+
 @app.post("/session/token")
-async def generate_session_token(req: TokenRequest, request: Request):
+async def generate_session_token(req: TokenRequest, request: Request, security: RequestSecurity = Depends(request_security)):
     """Generate a temporary session token for an extension installation"""
     # Security checks
-    if not validate_chrome_extension_request(request):
+    if not security.trusted_source:
         raise HTTPException(status_code=403, detail="Invalid request source")
     
-    if not validate_fingerprint_format(req.fingerprint):
+    if not security.fingerprint_valid(req.fingerprint):
         raise HTTPException(status_code=400, detail="Invalid fingerprint format")
     
     # Check for suspicious patterns
-    if is_suspicious_request(request, req.fingerprint):
+    if security.is_suspicious(req.fingerprint):
         client_ip = get_client_ip(request)
         print(f"Suspicious token request from IP {client_ip}, fingerprint {req.fingerprint}")
         raise HTTPException(status_code=403, detail="Request blocked")
@@ -146,223 +355,317 @@ async def generate_session_token(req: TokenRequest, request: Request):
 
 
 @app.post("/session/research")
-async def session_research(req: ResearchRequest, request: Request):
-    # Security checks
+async def session_research(req: ResearchRequest, request: Request, security: RequestSecurity = Depends(request_security)):
+    # Security checks (headers were parsed once by request_security)
     # 1. Validate Chrome extension request
-    if not validate_chrome_extension_request(request):
+    if not security.trusted_source:
         raise HTTPException(status_code=403, detail="Invalid request source")
     
     # 2. Get and validate extension fingerprint
-    fingerprint = request.headers.get("x-extension-fingerprint")
-    if not fingerprint or not validate_fingerprint_format(fingerprint):
+    fingerprint = security.fingerprint
+    if not security.fingerprint_valid():
         raise HTTPException(status_code=403, detail="Invalid extension fingerprint")
     
+    timer = StageTimer()
+
     # 3. Validate session token
-    session_token = request.headers.get("x-session-token")
+    session_token = security.session_token
     if not session_token:
         raise HTTPException(status_code=401, detail="Missing session token. Please request a new token.")
     
-    if not await session_token_manager.validate_token(session_token, fingerprint):
+    with timer.stage("token_validation"):
+        token_ok = await session_token_manager.validate_token(session_token, fingerprint)
+    if not token_ok:
         raise HTTPException(status_code=401, detail="Invalid or expired session token. Please request a new token.")
     
     # 4. Check for suspicious patterns
-    if is_suspicious_request(request, fingerprint):
+    if security.is_suspicious():
         client_ip = get_client_ip(request)
         print(f"Suspicious request detected from IP {client_ip}, fingerprint {fingerprint}")
         raise HTTPException(status_code=403, detail="Request blocked")
     
-    # 5. Rate limiting check (still useful as backup protection)
-    await rate_limiter.check_and_increment(fingerprint)
+    # 5. Reconnect: replay missed events and attach to the still-running pipeline
+    last_session_id, last_event_id = parse_last_event_id(request.headers.get("last-event-id"))
+    resume_id = req.sessionId or request.headers.get("x-research-session") or last_session_id
+    if resume_id:
+        if last_session_id and last_session_id != resume_id:
+            last_event_id = 0
+        resumed = research_sessions.get(resume_id, fingerprint)
+        if resumed is None:
+            raise HTTPException(status_code=404, detail="Research session expired. Please ask again.")
+        return StreamingResponse(
+            with_keepalive(research_sessions.subscribe(resumed, last_event_id, resumed=True), KEEPALIVE_SECONDS, MAX_BUFFERED_FRAMES),
+            media_type="text/event-stream",
+            headers={"X-Research-Session": resumed.session_id},
+        )
+
     if not getattr(HOST_AI, "available", False):
         raise HTTPException(status_code=503, detail="Host AI unavailable; set HOST_GOOGLE_API_KEY or GOOGLE_API_KEY")
 
+    # 6. Admission control: run now, queue, or refuse fast with 503 + Retry-After
+    ticket = admission.reserve()
+
+    # 7. Rate limiting check (still useful as backup protection)
+    try:
+        with timer.stage("rate_limit"):
+            await rate_limiter.check_and_increment(fingerprint)
+    except BaseException:
+        admission.release(ticket)
+        raise
+
+    # Search and remote share-URL tasks, cancelled if the client goes away
+    upstream_tasks: List["asyncio.Task[Any]"] = []
+
+    session = research_sessions.create(fingerprint)
+
     async def event_stream():
+        current_timer.set(timer)
+        outcome = "ok"
+        # Root span; an incoming W3C traceparent makes this session part of the caller's trace
+        with TRACER.span("session_research", traceparent=request.headers.get("traceparent"), prompt_chars=len(req.prompt), session_id=session.session_id) as root:
+            try:
+                # Reconnect with this id (or the Last-Event-ID of any frame) to resume
+                yield sse_event("session", {"session_id": session.session_id})
+                if not ticket.admitted:
+                    try:
+                        with timer.stage("queued"):
+                            async for position in admission.wait(ticket):
+                                root.add_event("queued", position=position)
+                                yield sse_event("queued", {'position': position, 'max_wait_seconds': admission.queue_timeout})
+                    except asyncio.TimeoutError:
+                        root.set_attribute("outcome", "overloaded")
+                        yield sse_event("error", {'code':'OVERLOADED','detail':'Server busy. Please retry shortly.','retry_after': admission.retry_after})
+                        yield sse_event("timings", timer.finish('overloaded'))
+                        return
+                async with aclosing(research_pipeline()) as pipeline:
+                    async for chunk in pipeline:
+                        if chunk.startswith("event: error"):
+                            outcome = "error"
+                        yield chunk
+                # Final frame: per-stage durations in milliseconds
+                timings = timer.finish(outcome)
+                root.set_attribute("outcome", outcome)
+                root.set_attribute("timings_ms", timings)
+                yield sse_event("timings", timings)
+            except (asyncio.CancelledError, GeneratorExit):
+                # Client disconnected: stop upstream work and count what it would have cost
+                stage = timer.current_stage()
+                saved = timer.remaining_seconds(_UPSTREAM_STAGES)
+                SESSIONS_CANCELLED.inc(stage)
+                UPSTREAM_SECONDS_SAVED.inc(amount=saved)
+                root.set_attribute("outcome", "cancelled")
+                root.set_attribute("upstream_seconds_saved", round(saved, 3))
+                timer.finish("cancelled")
+                raise
+            finally:
+                for upstream in upstream_tasks:
+                    if not upstream.done():
+                        upstream.cancel()
+                admission.release(ticket)
+
+    async def research_pipeline():
         # Plan
-        yield f"event: progress\ndata: {json.dumps({'stage':'planning','message':'Planning search'})}\n\n"
+        yield sse_event("progress", {'stage':'planning','message':'Planning search'})
         from .database_map import DATABASE_TOOLS_LIST  # local copy to keep host independent
-        try:
-            plan = HOST_AI.plan_search(req.prompt, DATABASE_TOOLS_LIST, max_dbs=max(req.maxDatabases, 1))
-        except Exception as e:
-            yield f"event: error\ndata: {json.dumps({'code':'PLANNING_FAILED','detail':str(e)})}\n\n"
-            return
+        planning_started = timer.start("planning")
+        # Well-structured prompts are planned locally; the rest go to Gemini
+        plan = RULE_PLANNER.plan(req.prompt, max_dbs=max(req.maxDatabases, 1))
+        planner = "rules"
+        if plan is None:
+            planner = "llm"
+            try:
+                async with admission.stage("planning"):
+                    plan = await HOST_AI.aplan_search(req.prompt, DATABASE_TOOLS_LIST, max_dbs=max(req.maxDatabases, 1))
+            except Exception as e:
+                timer.record("planning", time.perf_counter() - planning_started)
+                UPSTREAM_ERRORS.inc("gemini", "planning")
+                yield sse_event("error", {'code':'PLANNING_FAILED','detail':str(e)})
+                return
+        timer.record("planning", time.perf_counter() - planning_started)
+        planning_ms = round(timer.stages["planning"], 1)
 
         query = plan.get("query", req.prompt)
         dbs: List[str] = list(plan.get("databases", []))[: req.maxDatabases]
         if not dbs:
             dbs = ["au/cases/cth/HCA", "au/cases/cth/FCA"]
 
-        yield f"event: progress\ndata: {json.dumps({'stage':'planning','message':'Planned query','query': query, 'databases': dbs})}\n\n"
+        yield sse_event("progress", {'stage':'planning','message':'Planned query','query': query, 'databases': dbs, 'planner': planner, 'planning_ms': planning_ms})
 
         # Adaptive method selection
-        def _is_vague(p: str) -> bool:
-            p = (p or "").lower()
-            if len(p.split()) <= 3:
-                return True
-            hints = ["hca", "fca", "nsw", "vic", "qld", "tribunal", "since ", "after ", "before ", "between ", "[20", "(20"]
-            return not any(h in p for h in hints)
-
-        method = "auto" if _is_vague(req.prompt) else "boolean"
-        yield f"event: progress\ndata: {json.dumps({'stage':'planning','message':'Adaptive mode selected','method': method})}\n\n"
-
-        # Connect to remote MCP over Streamable HTTP
-        mcp_url = os.getenv(
-            "MCP_URL",
-            # Default to the provided Cloud Run URL
-            "https://olexi-mcp-root-au-691931843514.australia-southeast1.run.app/",
-        )
+        method = "auto" if is_vague(req.prompt) else "boolean"
+        yield sse_event("progress", {'stage':'planning','message':'Adaptive mode selected','method': method})
 
+        search_started = timer.start("mcp_search")
         try:
-            from asyncio import Queue
-            queue: Queue[str] = Queue()
-            result_holder: Dict[str, Any] = {}
-
-            async def run_tool_call():
-                try:
-                    async with streamablehttp_client(mcp_url) as (read, write, _):
-                        async with ClientSession(read, write) as session:
-                            await session.initialize()
-
-                            async def on_progress(progress: float, total: Optional[float], message: Optional[str]):
-                                evt = {"stage": "search", "pct": progress, "message": message}
-                                await queue.put(f"event: progress\ndata: {json.dumps(evt)}\n\n")
-
-                            res = await session.call_tool(
-                                "search_with_progress",
-                                {"query": query, "databases": dbs, "method": method},
-                                progress_callback=on_progress,
-                            )
-                            result_holder["result"] = res
-                except Exception as e:
-                    result_holder["error"] = e
-                finally:
-                    await queue.put("__DONE__")
-
-            task = asyncio.create_task(run_tool_call())
-
-            # Drain events
-            while True:
-                msg = await queue.get()
-                if msg == "__DONE__":
-                    break
-                await asyncio.sleep(0)
-                yield msg
-
-            # Handle result
-            if "error" in result_holder:
-                raise result_holder["error"]  # type: ignore[misc]
-
-            result: Any = result_holder.get("result")
+            search_key = stable_hash([query, sorted(dbs), method])
+            cached = await _search_cache.get(search_key)
             items_list: List[Dict] = []
-            if result is not None and hasattr(result, "structuredContent") and getattr(result, "structuredContent", None):
-                sc = getattr(result, "structuredContent", None)
-                if isinstance(sc, list):
-                    items_list = sc  # type: ignore[assignment]
-                elif isinstance(sc, dict) and isinstance(sc.get("result"), list):
-                    items_list = sc.get("result")  # type: ignore[assignment]
-            if result is not None:
-                for c in getattr(result, "content", []) or []:
-                    try:
-                        raw = getattr(c, "text", "") or ""
-                        if not raw:
-                            continue
-                        obj = json.loads(raw)
-                        if isinstance(obj, list):
-                            if not items_list:
-                                items_list = obj
-                        elif isinstance(obj, dict) and isinstance(obj.get("result"), list):
-                            if not items_list:
-                                items_list = obj.get("result")  # type: ignore[assignment]
-                    except Exception:
-                        continue
-
-            # Apply optional year filter
-            def _extract_year(title: str) -> Optional[int]:
-                import re as _re
-                m = _re.search(r"\[(\d{4})]", title)
-                if m:
-                    return int(m.group(1))
-                m2 = _re.search(r"\((?:\d{1,2})\s+(January|February|March|April|May|June|July|August|September|October|November|December)\s+(\d{4})\)", title)
-                if m2:
-                    return int(m2.group(2))
-                return None
-
-            unfiltered = items_list if isinstance(items_list, list) else []
-            filtered: List[Dict] = []
-            y_from = req.yearFrom
-            y_to = req.yearTo
-            if unfiltered and (y_from or y_to):
-                for it in unfiltered:
-                    t = str(it.get('title') or '')
-                    y = _extract_year(t)
-                    if y is None:
-                        continue
-                    if y_from and y < y_from:
-                        continue
-                    if y_to and y > y_to:
-                        continue
-                    filtered.append(it)
+            if cached is not None:
+                # Serve immediately; refresh in the background once past the fresh window
+                age = time.time() - float(cached.get("fetched_at", 0))
+                stale = age > _SEARCH_CACHE_FRESH_SECONDS
+                if stale:
+                    _refresh_search(search_key, query, dbs, method)
+                items_list = list(cached.get("items") or [])
+                evt = {"stage": "search", "pct": 100, "message": "Served from cache", "cached": True, "stale": stale, "age_seconds": int(age)}
+                yield sse_event("progress", evt)
             else:
-                filtered = unfiltered
+                # Latest progress per stage, flushed at most every SSE_PROGRESS_INTERVAL_SECONDS
+                channel = ProgressChannel(interval=PROGRESS_INTERVAL_SECONDS)
+                result_holder: Dict[str, Any] = {}
+
+                async def on_progress(progress: float, total: Optional[float], message: Optional[str]):
+                    channel.publish({"stage": "search", "pct": progress, "message": message, "cached": False})
+
+                async def run_tool_call():
+                    try:
+                        result_holder["items"] = await _coalesced_search(search_key, query, dbs, method, on_progress)
+                    except Exception as e:
+                        result_holder["error"] = e
+                    finally:
+                        channel.close()
+
+                task = asyncio.create_task(run_tool_call())
+                upstream_tasks.append(task)
+
+                # Drain events
+                async for evt in channel:
+                    yield sse_event("progress", evt)
+                await task
+
+                # Handle result
+                if "error" in result_holder:
+                    raise result_holder["error"]  # type: ignore[misc]
+
+                items_list = list(result_holder.get("items") or [])
+
+            timer.record("mcp_search", time.perf_counter() - search_started)
+
+            # Parse each item once; de-duplicate, then apply the optional year filter
+            records, kept = process_results(items_list if isinstance(items_list, list) else [], req.yearFrom, req.yearTo)
+            filtered = as_items(kept)
+
+            # Keep the whole filtered set under a handle; more pages come from GET /session/results/{handle}
+            handle = result_handles.put(fingerprint, filtered, query=query, databases=dbs, total_unfiltered=len(records))
 
             # Preview
             preview_items: List[Dict] = filtered[: max(1, min(10, req.maxResults))]
-            yield f"event: results_preview\ndata: {json.dumps({'items': preview_items, 'total_unfiltered': len(unfiltered), 'total_filtered': len(filtered)})}\n\n"
-
-            # Build shareable URL via tool
-            share_url: Optional[str] = None
-            try:
-                async with streamablehttp_client(mcp_url) as (read, write, _):
-                    async with ClientSession(read, write) as session:
-                        await session.initialize()
-                        url_res: Any = await session.call_tool("build_search_url", {"query": query, "databases": dbs})
-                        if hasattr(url_res, "structuredContent") and getattr(url_res, "structuredContent", None):
-                            sc = getattr(url_res, "structuredContent")
-                            share_url = sc if isinstance(sc, str) else None
-                        if not share_url:
-                            for c in getattr(url_res, "content", []) or []:
-                                if getattr(c, "type", "") == "text":
-                                    share_url = getattr(c, "text", None)
-                                    break
-            except Exception:
-                share_url = None
+            yield sse_event("results_preview", {'items': preview_items, 'total_unfiltered': len(records), 'total_filtered': len(filtered), 'handle': handle})
+
+            # The rest of the first maxResults items, in batches, before summarisation starts
+            stream_end = min(len(filtered), max(req.maxResults, len(preview_items)))
+            for offset in range(len(preview_items), stream_end, _RESULTS_BATCH_SIZE):
+                batch = filtered[offset: min(offset + _RESULTS_BATCH_SIZE, stream_end)]
+                done = offset + len(batch) >= stream_end
+                yield sse_event("results_batch", {'handle': handle, 'offset': offset, 'items': batch, 'total_filtered': len(filtered), 'done': done})
+
+            # Build shareable URL locally; the MCP tool is only consulted when opted in.
+            # In remote mode the tool call runs alongside summarisation.
+            share_started = timer.start("share_url")
+            share_url: Optional[str] = _build_austlii_url(query, dbs)
+            share_task: "Optional[asyncio.Task[Optional[str]]]" = None
+            if _SHARE_URL_MODE == "remote":
+                share_task = asyncio.create_task(_fetch_remote_share_url(query, dbs))
+                upstream_tasks.append(share_task)
+            elif _SHARE_URL_MODE == "verify":
+                _spawn_background(_verify_share_url(query, dbs, share_url))
+            share_seconds = time.perf_counter() - share_started
 
         except Exception as e:
-            yield f"event: error\ndata: {json.dumps({'code':'MCP_ERROR','detail':str(e)})}\n\n"
+            if "mcp_search" not in timer.stages:
+                timer.record("mcp_search", time.perf_counter() - search_started)
+            UPSTREAM_ERRORS.inc("mcp", "search")
+            yield sse_event("error", {'code':'MCP_ERROR','detail':str(e)})
             return
 
-        # Summarize
-        try:
-            markdown = HOST_AI.summarize(req.prompt, preview_items)
-        except Exception as e:
-            yield f"event: error\ndata: {json.dumps({'code':'SUMMARIZE_FAILED','detail':str(e)})}\n\n"
-            return
+        # Summarize, streaming partial Markdown as answer_delta events
+        summary_started = timer.start("summarization")
+        summary_key = _summary_cache_key(req.prompt, preview_items)
+        markdown = await _summary_cache.get(summary_key)
+        if markdown is None:
+            parts: List[str] = []
+            try:
+                async with admission.stage("summarize"):
+                    async for delta in HOST_AI.astream_summary(req.prompt, preview_items):
+                        parts.append(delta)
+                        yield sse_event("answer_delta", {'text': delta})
+            except Exception as e:
+                if share_task is not None:
+                    share_task.cancel()
+                timer.record("summarization", time.perf_counter() - summary_started)
+                UPSTREAM_ERRORS.inc("gemini", "summarize")
+                yield sse_event("error", {'code':'SUMMARIZE_FAILED','detail':str(e)})
+                return
+            markdown = "".join(parts)
+            if markdown:
+                await _summary_cache.set(summary_key, markdown)
+
+        timer.record("summarization", time.perf_counter() - summary_started)
+
+        if share_task is not None:
+            share_wait_started = time.perf_counter()
+            try:
+                share_url = await share_task or share_url
+            except Exception:
+                UPSTREAM_ERRORS.inc("mcp", "share_url")
+            share_seconds += time.perf_counter() - share_wait_started
+        timer.record("share_url", share_seconds)
+
+        yield sse_event("answer", {'markdown': markdown, 'url': share_url})
+
+    # The pipeline belongs to the session, not to this response: a dropped client can reattach.
+    # Release the admission slot when it ends, even if cancelled before its first step.
+    research_sessions.run(session, event_stream()).add_done_callback(lambda _: admission.release(ticket))
+    return StreamingResponse(
+        with_keepalive(research_sessions.subscribe(session), KEEPALIVE_SECONDS, MAX_BUFFERED_FRAMES),
+        media_type="text/event-stream",
+        headers={"X-Research-Session": session.session_id},
+    )
+
+
+@app.get("/session/results/{handle}")
+async def get_session_results(handle: str, offset: int = 0, limit: int = 25, security: RequestSecurity = Depends(request_security)):
+    """Page through a research session's filtered results without re-running the search"""
+    if not security.trusted_source:
+        raise HTTPException(status_code=403, detail="Invalid request source")
+
+    fingerprint = security.fingerprint
+    if not security.fingerprint_valid():
+        raise HTTPException(status_code=403, detail="Invalid extension fingerprint")
 
-        yield f"event: answer\ndata: {json.dumps({'markdown': markdown, 'url': share_url or _build_austlii_url(query, dbs)})}\n\n"
+    session_token = security.session_token
+    if not session_token:
+        raise HTTPException(status_code=401, detail="Missing session token. Please request a new token.")
+    if not await session_token_manager.validate_token(session_token, fingerprint):
+        raise HTTPException(status_code=401, detail="Invalid or expired session token. Please request a new token.")
 
-    return StreamingResponse(event_stream(), media_type="text/event-stream")
+    page = result_handles.get_page(handle, fingerprint, offset, limit)
+    if page is None:
+        raise HTTPException(status_code=404, detail="Results expired or not found. Please run the search again.")
+    return page
 
 
 @app.get("/usage/{fingerprint}")
-async def get_usage_stats(fingerprint: str, request: Request):
+async def get_usage_stats(fingerprint: str, security: RequestSecurity = Depends(request_security)):
     """Get current usage statistics for a fingerprint"""
     # Basic security check
-    if not validate_chrome_extension_request(request):
+    if not security.trusted_source:
         raise HTTPException(status_code=403, detail="Invalid request source")
     
-    if not validate_fingerprint_format(fingerprint):
+    if not security.fingerprint_valid(fingerprint):
         raise HTTPException(status_code=400, detail="Invalid fingerprint format")
     
-    stats = rate_limiter.get_usage_stats(fingerprint)
+    stats = await rate_limiter.get_usage_stats(fingerprint)
     return stats
 
 
 @app.get("/session/token/info")
-async def get_token_info(request: Request):
+async def get_token_info(security: RequestSecurity = Depends(request_security)):
     """Get information about the current session token"""
-    if not validate_chrome_extension_request(request):
+    if not security.trusted_source:
         raise HTTPException(status_code=403, detail="Invalid request source")
     
-    session_token = request.headers.get("x-session-token")
+    session_token = security.session_token
     if not session_token:
         raise HTTPException(status_code=400, detail="Missing session token")
     
@@ -378,12 +681,12 @@ async def get_token_info(request: Request):
 
 
 @app.post("/session/token/revoke")
-async def revoke_session_token(request: Request):
+async def revoke_session_token(security: RequestSecurity = Depends(request_security)):
     """Revoke the current session token"""
-    if not validate_chrome_extension_request(request):
+    if not security.trusted_source:
         raise HTTPException(status_code=403, detail="Invalid request source")
     
-    session_token = request.headers.get("x-session-token")
+    session_token = security.session_token
     if not session_token:
         raise HTTPException(status_code=400, detail="Missing session token")
     
@@ -394,6 +697,62 @@ async def revoke_session_token(request: Request):
     return {"message": "Token revoked successfully"}
 
 
+def _collect_metrics() -> List[Any]:
+    """Gauges and counters owned by other components, for /metrics"""
+    caches = {"search": _search_cache, "summary": _summary_cache, "plan": HOST_AI.plan_cache}
+    cache_stats = {name: cache.get_stats() for name, cache in caches.items()}
+    ai = HOST_AI.get_stats()
+    pool = mcp_pool.get_stats()
+    adm = admission.get_stats()
+    return [
+        ("olexi_cache_hit_ratio", "Cache hit ratio since start", "gauge",
+         [({"cache": n}, st["hit_ratio"]) for n, st in cache_stats.items()]),
+        ("olexi_cache_lookups_total", "Cache lookups by result", "counter",
+         [({"cache": n, "result": r}, st[key]) for n, st in cache_stats.items() for r, key in (("hit", "hits"), ("miss", "misses"))]),
+        ("olexi_llm_calls_total", "Gemini calls made", "counter", [({}, ai["calls_total"])]),
+        ("olexi_llm_errors_total", "Gemini call failures by kind", "counter",
+         [({"kind": "timeout"}, ai["timeouts_total"]), ({"kind": "error"}, ai["errors_total"])]),
+        ("olexi_llm_in_flight", "Gemini calls in flight", "gauge", [({}, ai["in_flight"])]),
+        ("olexi_mcp_connect_failures_total", "MCP connection failures", "counter", [({}, pool["connect_failures_total"])]),
+        ("olexi_mcp_sessions", "Pooled MCP sessions by state", "gauge",
+         [({"state": "idle"}, pool["idle"]), ({"state": "in_use"}, pool["in_use"])]),
+        ("olexi_research_sessions", "Research sessions by admission state", "gauge",
+         [({"state": "active"}, adm["active"]), ({"state": "queued"}, adm["queued"])]),
+        ("olexi_admission_rejected_total", "Research sessions refused with 503", "counter", [({}, adm["rejected_total"])]),
+    ]
+
+
+METRICS.register_collector(_collect_metrics)
+
+
+@app.get("/metrics")
+async def get_metrics(request: Request):
+    """Prometheus text exposition (METRICS_TOKEN bearer token, or the admin key)"""
+    # Per-stage error and latency series are operational detail: never serve them unauthenticated
+    metrics_token = os.getenv("METRICS_TOKEN")
+    admin_key = os.getenv("ADMIN_KEY")
+    allowed = (
+        (metrics_token and request.headers.get("authorization") == f"Bearer {metrics_token}")
+        or (admin_key and request.headers.get("x-admin-key") == admin_key)
+    )
+    if not allowed:
+        raise HTTPException(status_code=403, detail="Metrics access denied")
+    return PlainTextResponse(METRICS.render(), media_type="text/plain; version=0.0.4")
+
+
+def _process_rss_bytes() -> int:
+    """Current resident set size (Linux /proc), falling back to the peak from getrusage"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        try:
+            import resource
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        except Exception:
+            return -1
+
+
 @app.get("/admin/stats")
 async def get_admin_stats(request: Request):
     """Get system statistics (admin only)"""
@@ -403,12 +762,35 @@ async def get_admin_stats(request: Request):
         raise HTTPException(status_code=403, detail="Admin access required")
     
     token_stats = session_token_manager.get_stats()
+    if inspect.isawaitable(token_stats):
+        # Shared-store token managers report asynchronously
+        token_stats = await token_stats
+    handle_stats = result_handles.get_stats()
     return {
         "session_tokens": token_stats,
         "rate_limiter": {
-            "active_fingerprints": len(rate_limiter.daily_counts),
+            "store": rate_limiter.store.name,
+            "active_fingerprints": await rate_limiter.active_fingerprints(),
             "requests_per_day_limit": rate_limiter.requests_per_day,
-            "requests_per_hour_limit": rate_limiter.requests_per_hour
-        }
+            "requests_per_hour_limit": rate_limiter.requests_per_hour,
+            "capacity_evictions_total": getattr(rate_limiter.store, "capacity_evictions_total", 0),
+        },
+        "memory": {
+            "rss_bytes": _process_rss_bytes(),
+            "rate_limiter_bytes": rate_limiter.approx_memory_bytes(),
+            "session_tokens_bytes": token_stats.get("approx_bytes", 0),
+            "result_handles_bytes": handle_stats["approx_bytes"],
+        },
+        "result_handles": handle_stats,
+        "research_sessions": research_sessions.get_stats(),
+        "admission": admission.get_stats(),
+        "tracing": TRACER.get_stats(),
+        "mcp_pool": mcp_pool.get_stats(),
+        "host_ai": HOST_AI.get_stats(),
+        "rule_planner": RULE_PLANNER.get_stats(),
+        "share_url": {"mode": _SHARE_URL_MODE, **_share_url_stats},
+        "search_cache": _search_cache.get_stats(),
+        "search_single_flight": _search_flights.get_stats(),
+        "summary_cache": _summary_cache.get_stats(),
     }
 
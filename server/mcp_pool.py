@@ -0,0 +1,345 @@
+"""
+Pooled MCP client sessions for the Olexi Extension Host
+
+Keeps a small set of initialised Streamable HTTP sessions to the remote MCP
+server so research requests can skip the TLS + MCP handshake when warm.
+"""
+import os
+import time
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, Optional
+
+import httpx
+from mcp import ClientSession, types
+from mcp.client.streamable_http import streamablehttp_client
+
+DEFAULT_MCP_URL = "https://olexi-mcp-root-au-691931843514.australia-southeast1.run.app/"
+
+
+def get_mcp_url() -> str:
+    return os.getenv("MCP_URL", DEFAULT_MCP_URL)
+
+
+def _client_factory(extra_headers: Dict[str, str]):
+    """httpx client factory whose requests also carry the live contents of extra_headers.
+
+    A pooled connection keeps one HTTP client for its lifetime, so per-borrow
+    headers (e.g. trace context) are injected by a request hook instead.
+    """
+    async def _inject(request: httpx.Request) -> None:
+        if extra_headers:
+            request.headers.update(extra_headers)
+
+    def factory(headers: Optional[Dict[str, str]] = None, timeout: Optional[httpx.Timeout] = None, auth: Optional[httpx.Auth] = None) -> httpx.AsyncClient:
+        # Same defaults as the SDK's own client: follow redirects, 30 s unless given
+        return httpx.AsyncClient(
+            headers=headers,
+            timeout=timeout if timeout is not None else httpx.Timeout(30.0),
+            auth=auth,
+            follow_redirects=True,
+            event_hooks={"request": [_inject]},
+        )
+
+    return factory
+
+
+_request_id_warned = False
+
+
+def next_request_id(session: ClientSession) -> Optional[int]:
+    """JSON-RPC id the session's next request will use (to cancel it later).
+
+    The SDK has no public accessor, so this reads the session's counter
+    (checked against the mcp version range in requirements.txt). If a future
+    SDK drops it, cancellation is skipped and the request simply runs out.
+    """
+    global _request_id_warned
+    request_id = getattr(session, "_request_id", None)
+    if isinstance(request_id, int):
+        return request_id
+    if not _request_id_warned:
+        _request_id_warned = True
+        print("MCP ClientSession has no request counter; upstream cancellation disabled")
+    return None
+
+
+async def cancel_request(session: ClientSession, request_id: Optional[int], reason: str, timeout: float = 2.0) -> bool:
+    """Tell the MCP server to stop working on an in-flight request (notifications/cancelled)"""
+    if request_id is None:
+        return False
+    notification = types.ClientNotification(
+        types.CancelledNotification(params=types.CancelledNotificationParams(requestId=request_id, reason=reason))
+    )
+    try:
+        await asyncio.wait_for(session.send_notification(notification), timeout=timeout)
+        return True
+    except Exception:
+        return False
+
+
+class _PooledConnection:
+    """One initialised MCP session, owned by a dedicated background task.
+
+    The Streamable HTTP client and ClientSession are anyio context managers that
+    must be entered and exited in the same task, so each connection runs in its
+    own task and is closed by signalling that task.
+    """
+    __slots__ = ("session", "task", "closing", "created_at", "last_used", "headers")
+
+    def __init__(self, session: ClientSession, task: "asyncio.Task[None]", closing: asyncio.Event, headers: Dict[str, str]) -> None:
+        self.session = session
+        self.task = task
+        self.closing = closing
+        # Extra HTTP headers for the current borrower's requests
+        self.headers = headers
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+    @property
+    def alive(self) -> bool:
+        return not self.task.done() and not self.closing.is_set()
+
+
+class MCPSessionPool:
+    def __init__(
+        self,
+        url: Optional[str] = None,
+        max_size: int = 8,
+        min_size: int = 1,
+        health_check_interval: float = 30.0,
+        max_idle_seconds: float = 300.0,
+        connect_timeout: float = 15.0,
+        enabled: bool = True,
+    ) -> None:
+        self.url = url
+        self.max_size = max(1, max_size)
+        self.min_size = max(0, min(min_size, self.max_size))
+        self.health_check_interval = health_check_interval
+        self.max_idle_seconds = max_idle_seconds
+        self.connect_timeout = connect_timeout
+        self.enabled = enabled
+        self._idle: Deque[_PooledConnection] = deque()
+        self._in_use = 0
+        self._waiting = 0
+        self._semaphore = asyncio.Semaphore(self.max_size)
+        self._maintenance_task: Optional["asyncio.Task[None]"] = None
+        self._closed = False
+        # Metrics
+        self.connects_total = 0
+        self.connect_failures_total = 0
+        self.borrows_total = 0
+        self.warm_borrows_total = 0
+        self.discarded_total = 0
+        self.health_checks_total = 0
+        self.health_check_failures_total = 0
+        self.reconnects_total = 0
+        self._wait_seconds_total = 0.0
+
+    def _url(self) -> str:
+        return self.url or get_mcp_url()
+
+    async def _connect(self) -> _PooledConnection:
+        """Open and initialise a new MCP session in its own owner task."""
+        loop = asyncio.get_running_loop()
+        ready: "asyncio.Future[ClientSession]" = loop.create_future()
+        closing = asyncio.Event()
+        url = self._url()
+        headers: Dict[str, str] = {}
+
+        async def _owner() -> None:
+            try:
+                async with streamablehttp_client(url, httpx_client_factory=_client_factory(headers)) as (read, write, _):
+                    async with ClientSession(read, write) as session:
+                        await session.initialize()
+                        if not ready.done():
+                            ready.set_result(session)
+                        await closing.wait()
+            except Exception as e:
+                if not ready.done():
+                    ready.set_exception(e)
+            finally:
+                if not ready.done():
+                    ready.cancel()
+
+        task = asyncio.create_task(_owner())
+        try:
+            session = await asyncio.wait_for(asyncio.shield(ready), timeout=self.connect_timeout)
+        except BaseException:
+            self.connect_failures_total += 1
+            closing.set()
+            task.cancel()
+            raise
+        self.connects_total += 1
+        return _PooledConnection(session, task, closing, headers)
+
+    async def _close_connection(self, conn: _PooledConnection) -> None:
+        conn.closing.set()
+        try:
+            await asyncio.wait_for(conn.task, timeout=5.0)
+        except BaseException:
+            conn.task.cancel()
+
+    async def _ping(self, conn: _PooledConnection) -> bool:
+        self.health_checks_total += 1
+        try:
+            await asyncio.wait_for(conn.session.send_ping(), timeout=self.connect_timeout)
+            return True
+        except Exception:
+            self.health_check_failures_total += 1
+            return False
+
+    async def _checkout(self) -> _PooledConnection:
+        while self._idle:
+            conn = self._idle.pop()
+            if not conn.alive:
+                self.discarded_total += 1
+                continue
+            # Idle sessions may have been dropped by the MCP server; probe before reuse
+            if time.monotonic() - conn.last_used > self.health_check_interval and not await self._ping(conn):
+                self.discarded_total += 1
+                self.reconnects_total += 1
+                asyncio.create_task(self._close_connection(conn))
+                continue
+            self.warm_borrows_total += 1
+            return conn
+        return await self._connect()
+
+    @asynccontextmanager
+    async def session(self, headers: Optional[Dict[str, str]] = None) -> AsyncIterator[ClientSession]:
+        """Borrow an initialised ClientSession for the duration of the block.
+
+        `headers` are added to every HTTP request made while borrowed (used for
+        trace propagation). Sessions that raise inside the block are discarded
+        rather than returned, so a broken transport is never handed to the next
+        request.
+        """
+        if not self.enabled:
+            async with streamablehttp_client(self._url(), headers=headers) as (read, write, _):
+                async with ClientSession(read, write) as fresh:
+                    await fresh.initialize()
+                    self.borrows_total += 1
+                    yield fresh
+            return
+
+        started = time.monotonic()
+        self._waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._waiting -= 1
+        self._wait_seconds_total += time.monotonic() - started
+        try:
+            conn = await self._checkout()
+            self._in_use += 1
+            self.borrows_total += 1
+            if headers:
+                conn.headers.update(headers)
+            ok = False
+            try:
+                yield conn.session
+                ok = True
+            finally:
+                conn.headers.clear()
+                self._in_use -= 1
+                conn.last_used = time.monotonic()
+                if ok and conn.alive and not self._closed:
+                    self._idle.append(conn)
+                else:
+                    self.discarded_total += 1
+                    asyncio.create_task(self._close_connection(conn))
+        finally:
+            self._semaphore.release()
+
+    async def _maintain(self) -> None:
+        """Ping idle sessions, drop dead or long-idle ones, and keep min_size warm."""
+        now = time.monotonic()
+        survivors: Deque[_PooledConnection] = deque()
+        while self._idle:
+            conn = self._idle.popleft()
+            if not conn.alive:
+                self.discarded_total += 1
+                continue
+            idle_for = now - conn.last_used
+            if idle_for > self.max_idle_seconds and len(survivors) >= self.min_size:
+                await self._close_connection(conn)
+                continue
+            if idle_for > self.health_check_interval:
+                if not await self._ping(conn):
+                    self.discarded_total += 1
+                    await self._close_connection(conn)
+                    continue
+                conn.last_used = time.monotonic()
+            survivors.append(conn)
+        # Sessions may have been returned while we were pinging
+        survivors.extend(self._idle)
+        self._idle = survivors
+        while not self._closed and len(self._idle) + self._in_use < self.min_size:
+            try:
+                self._idle.append(await self._connect())
+                self.reconnects_total += 1
+            except Exception as e:
+                print(f"MCP pool: reconnect failed: {e}")
+                break
+
+    async def _maintenance_loop(self) -> None:
+        while not self._closed:
+            await asyncio.sleep(self.health_check_interval)
+            try:
+                await self._maintain()
+            except Exception as e:
+                print(f"MCP pool maintenance error: {e}")
+
+    async def start(self) -> None:
+        """Pre-warm min_size sessions and start the background health checker."""
+        if not self.enabled:
+            return
+        self._closed = False
+        for _ in range(self.min_size):
+            try:
+                self._idle.append(await self._connect())
+            except Exception as e:
+                # Startup must not fail because the MCP server is cold; sessions are created lazily
+                print(f"MCP pool: warm-up connection failed: {e}")
+                break
+        if self._maintenance_task is None or self._maintenance_task.done():
+            self._maintenance_task = asyncio.create_task(self._maintenance_loop())
+
+    async def close(self) -> None:
+        self._closed = True
+        if self._maintenance_task is not None:
+            self._maintenance_task.cancel()
+            self._maintenance_task = None
+        while self._idle:
+            await self._close_connection(self._idle.popleft())
+
+    def get_stats(self) -> Dict:
+        """Get pool metrics"""
+        return {
+            "enabled": self.enabled,
+            "max_size": self.max_size,
+            "min_size": self.min_size,
+            "idle": len(self._idle),
+            "in_use": self._in_use,
+            "waiting": self._waiting,
+            "borrows_total": self.borrows_total,
+            "warm_borrows_total": self.warm_borrows_total,
+            "connects_total": self.connects_total,
+            "connect_failures_total": self.connect_failures_total,
+            "reconnects_total": self.reconnects_total,
+            "discarded_total": self.discarded_total,
+            "health_checks_total": self.health_checks_total,
+            "health_check_failures_total": self.health_check_failures_total,
+            "avg_wait_ms": round(self._wait_seconds_total * 1000 / self.borrows_total, 2) if self.borrows_total else 0,
+        }
+
+# Global MCP session pool
+mcp_pool = MCPSessionPool(
+    max_size=int(os.getenv("MCP_POOL_SIZE", "8")),
+    min_size=int(os.getenv("MCP_POOL_MIN_SIZE", "1")),
+    health_check_interval=float(os.getenv("MCP_POOL_HEALTH_CHECK_SECONDS", "30")),
+    max_idle_seconds=float(os.getenv("MCP_POOL_MAX_IDLE_SECONDS", "300")),
+    connect_timeout=float(os.getenv("MCP_POOL_CONNECT_TIMEOUT", "15")),
+    enabled=os.getenv("MCP_POOL_ENABLED", "1").lower() not in ("0", "false", "no"),
+)
@@ -0,0 +1,175 @@
+"""
+Minimal Prometheus-style metrics for the Olexi Extension Host
+
+Histograms and counters are kept in-process and rendered in the Prometheus
+text exposition format at /metrics, so no client library is required.
+StageTimer records one research session's per-stage durations, both for the
+final `event: timings` SSE frame and for the stage histogram.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Seconds; covers cache hits (ms) through slow Gemini/AustLII calls (minute)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+
+def _labels(names: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{v}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], List[float]] = {}  # label values -> bucket counts + [sum, count]
+
+    def observe(self, value: float, *label_values: str) -> None:
+        series = self._series.get(label_values)
+        if series is None:
+            series = self._series[label_values] = [0.0] * (len(self.buckets) + 2)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def mean(self, *label_values: str) -> float:
+        series = self._series.get(label_values)
+        return series[-2] / series[-1] if series and series[-1] else 0.0
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for values, series in sorted(self._series.items()):
+            for bound, count in zip(self.buckets, series):
+                le = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, values, le)} {int(count)}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_labels(self.label_names, values, le)} {int(series[-1])}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, values)} {series[-2]:.6f}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, values)} {int(series[-1])}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1.0) -> None:
+        self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for values, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_labels(self.label_names, values)} {value:g}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: List = []
+        # Callbacks returning (name, help, type, [(labels dict, value)]) for values owned elsewhere
+        self._collectors: List[Callable[[], List[Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]]]] = []
+
+    def histogram(self, name: str, help_text: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, help_text, labels, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help_text: str, labels: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, help_text, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, fn: Callable) -> None:
+        self._collectors.append(fn)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collect in self._collectors:
+            try:
+                families = collect()
+            except Exception as e:
+                print(f"Metrics collector failed: {e}")
+                continue
+            for name, help_text, kind, samples in families:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_labels(tuple(labels), tuple(labels.values()))} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+METRICS = MetricsRegistry()
+STAGE_SECONDS = METRICS.histogram("olexi_stage_duration_seconds", "Duration of each research session stage", labels=("stage",))
+SESSION_SECONDS = METRICS.histogram("olexi_session_duration_seconds", "End-to-end research session duration", labels=("outcome",))
+UPSTREAM_ERRORS = METRICS.counter("olexi_upstream_errors_total", "Errors from upstream services", labels=("service", "stage"))
+SESSIONS_CANCELLED = METRICS.counter("olexi_sessions_cancelled_total", "Research sessions abandoned by the client, by the stage they were in", labels=("stage",))
+UPSTREAM_SECONDS_SAVED = METRICS.counter("olexi_upstream_seconds_saved_total", "Estimated MCP/Gemini seconds not spent because abandoned sessions were cancelled")
+PROGRESS_EVENTS = METRICS.counter("olexi_progress_events_total", "MCP progress events by outcome (sent, merged into a later one, dropped)", labels=("result",))
+
+
+class StageTimer:
+    """Per-session stage timings (milliseconds), also fed into STAGE_SECONDS."""
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.running: Dict[str, float] = {}  # stage -> perf_counter() at start, until recorded
+
+    def start(self, stage: str) -> float:
+        now = self.running[stage] = time.perf_counter()
+        return now
+
+    def record(self, stage: str, seconds: float) -> None:
+        # A stage can run more than once per session (e.g. MCP connect retries); sum them
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds * 1000
+        self.running.pop(stage, None)
+        STAGE_SECONDS.observe(seconds, stage)
+
+    def current_stage(self) -> str:
+        """The most recently started stage still running, else the last one recorded"""
+        if self.running:
+            return max(self.running, key=self.running.__getitem__)
+        return next(reversed(self.stages), "start") if self.stages else "start"
+
+    def remaining_seconds(self, stages: Sequence[str]) -> float:
+        """Expected time the given stages would still take: mean duration minus time already spent"""
+        now = time.perf_counter()
+        remaining = 0.0
+        for stage in stages:
+            if stage in self.stages:
+                continue
+            spent = now - self.running[stage] if stage in self.running else 0.0
+            remaining += max(0.0, STAGE_SECONDS.mean(stage) - spent)
+        return remaining
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def finish(self, outcome: str) -> Dict[str, float]:
+        total = time.perf_counter() - self.started
+        SESSION_SECONDS.observe(total, outcome)
+        out = {name: round(ms, 1) for name, ms in self.stages.items()}
+        out["total"] = round(total * 1000, 1)
+        return out
+
+
+# The StageTimer of the research session running in the current task (copied into tasks it spawns)
+current_timer: ContextVar[Optional[StageTimer]] = ContextVar("olexi_stage_timer", default=None)
@@ -3,86 +3,90 @@ Rate limiting implementation for Olexi Extension Host
 """
 import os
 import time
-from typing import Dict, Optional
-from collections import defaultdict
-import asyncio
+from typing import Dict, List
 from fastapi import HTTPException
 
+from .state_store import MemoryStateStore, Window, make_state_store
+
+
 class RateLimiter:
-    def __init__(self, requests_per_day: int = 50, requests_per_hour: int = 10):
+    def __init__(self, requests_per_day: int = 50, requests_per_hour: int = 10, store=None):
         self.requests_per_day = requests_per_day
         self.requests_per_hour = requests_per_hour
-        self.daily_counts: Dict[str, Dict[str, int]] = defaultdict(dict)  # fingerprint -> {date: count}
-        self.hourly_counts: Dict[str, Dict[str, int]] = defaultdict(dict)  # fingerprint -> {hour: count}
-        self.lock = asyncio.Lock()
-    
+        # Counter storage: in-process sliding windows by default, or shared (SQLite/Redis) fixed windows
+        self.store = store if store is not None else MemoryStateStore()
+        self._windows_cache: List[Window] = []
+        self._windows_valid_until = 0.0
+
+    def _windows(self) -> List[Window]:
+        """Current (name, key, limit, seconds) windows; keys are rebuilt at most once a minute"""
+        now = time.time()
+        if now >= self._windows_valid_until:
+            # Local-time offsets are whole minutes, so keys cannot change mid-minute
+            self._windows_cache = [
+                ("day", self._get_date_key(), self.requests_per_day, 86400),
+                ("hour", self._get_hour_key(), self.requests_per_hour, 3600),
+            ]
+            self._windows_valid_until = now - now % 60 + 60
+        return self._windows_cache
+
     def _get_date_key(self) -> str:
         return time.strftime("%Y-%m-%d")
-    
+
     def _get_hour_key(self) -> str:
         return time.strftime("%Y-%m-%d-%H")
-    
+
     async def check_and_increment(self, fingerprint: str) -> None:
         """Check rate limits and increment counters"""
-        async with self.lock:
-            date_key = self._get_date_key()
-            hour_key = self._get_hour_key()
-            
-            # Clean old entries (keep only current day and hour)
-            self._cleanup_old_entries(fingerprint, date_key, hour_key)
-            
-            # Check daily limit
-            daily_count = self.daily_counts[fingerprint].get(date_key, 0)
-            if daily_count >= self.requests_per_day:
-                raise HTTPException(
-                    status_code=429, 
-                    detail=f"Daily limit exceeded. Max {self.requests_per_day} requests per day."
-                )
-            
-            # Check hourly limit
-            hourly_count = self.hourly_counts[fingerprint].get(hour_key, 0)
-            if hourly_count >= self.requests_per_hour:
-                raise HTTPException(
-                    status_code=429,
-                    detail=f"Hourly limit exceeded. Max {self.requests_per_hour} requests per hour."
-                )
-            
-            # Increment counters
-            self.daily_counts[fingerprint][date_key] = daily_count + 1
-            self.hourly_counts[fingerprint][hour_key] = hourly_count + 1
-    
-    def _cleanup_old_entries(self, fingerprint: str, current_date: str, current_hour: str):
-        """Remove old entries to prevent memory leak"""
-        # Keep only current day
-        if fingerprint in self.daily_counts:
-            self.daily_counts[fingerprint] = {
-                k: v for k, v in self.daily_counts[fingerprint].items() 
-                if k == current_date
-            }
-        
-        # Keep only current hour
-        if fingerprint in self.hourly_counts:
-            self.hourly_counts[fingerprint] = {
-                k: v for k, v in self.hourly_counts[fingerprint].items() 
-                if k == current_hour
-            }
-    
-    def get_usage_stats(self, fingerprint: str) -> Dict[str, int]:
+        exceeded = await self.store.check_and_increment(fingerprint, self._windows())
+
+        # Check daily limit
+        if exceeded == 0:
+            raise HTTPException(
+                status_code=429,
+                detail=f"Daily limit exceeded. Max {self.requests_per_day} requests per day."
+            )
+
+        # Check hourly limit
+        if exceeded == 1:
+            raise HTTPException(
+                status_code=429,
+                detail=f"Hourly limit exceeded. Max {self.requests_per_hour} requests per hour."
+            )
+
+    async def get_usage_stats(self, fingerprint: str) -> Dict[str, int]:
         """Get current usage statistics for a fingerprint"""
-        date_key = self._get_date_key()
-        hour_key = self._get_hour_key()
-        
+        daily_count, hourly_count = await self.store.get_counts(fingerprint, self._windows())
+
         return {
-            "daily_count": self.daily_counts[fingerprint].get(date_key, 0),
+            "daily_count": daily_count,
             "daily_limit": self.requests_per_day,
-            "hourly_count": self.hourly_counts[fingerprint].get(hour_key, 0),
+            "hourly_count": hourly_count,
             "hourly_limit": self.requests_per_hour,
-            "daily_remaining": self.requests_per_day - self.daily_counts[fingerprint].get(date_key, 0),
-            "hourly_remaining": self.requests_per_hour - self.hourly_counts[fingerprint].get(hour_key, 0)
+            "daily_remaining": self.requests_per_day - daily_count,
+            "hourly_remaining": self.requests_per_hour - hourly_count
         }
 
+    async def start(self) -> None:
+        """Start background eviction of idle fingerprints (in-process store only)"""
+        if hasattr(self.store, "start"):
+            await self.store.start()
+
+    async def close(self) -> None:
+        if hasattr(self.store, "close"):
+            await self.store.close()
+
+    def approx_memory_bytes(self) -> int:
+        """Approximate in-process counter memory (0 for shared stores)"""
+        return self.store.approx_memory_bytes() if hasattr(self.store, "approx_memory_bytes") else 0
+
+    async def active_fingerprints(self) -> int:
+        """Number of fingerprints with live counters (-1 if the store cannot tell cheaply)"""
+        return await self.store.active_fingerprints()
+
 # Global rate limiter instance
 rate_limiter = RateLimiter(
     requests_per_day=int(os.getenv("DAILY_REQUEST_LIMIT", "50")),
-    requests_per_hour=int(os.getenv("HOURLY_REQUEST_LIMIT", "10"))
+    requests_per_hour=int(os.getenv("HOURLY_REQUEST_LIMIT", "10")),
+    store=make_state_store(os.getenv("RATE_LIMIT_STORE", "memory")),
 )
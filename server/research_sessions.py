@@ -0,0 +1,288 @@
+"""
+Resumable research sessions
+
+Each /session/research pipeline runs in its own task, owned by the registry
+rather than by the HTTP response. Its SSE frames are numbered
+(`id: <session_id>:<n>`) and kept in a bounded per-session ring buffer;
+frames pushed out of the ring can be spilled to disk. A client whose stream
+drops reconnects with Last-Event-ID (or the session id) and gets the frames it
+missed, then the live ones, from the same pipeline.
+
+A pipeline with no attached client is cancelled after a grace period; finished
+sessions stay replayable for a retention window. Sessions are per instance.
+"""
+import os
+import json
+import time
+import asyncio
+import secrets
+from collections import OrderedDict, deque
+from itertools import islice
+from typing import Any, AsyncIterator, Deque, Dict, Iterator, Optional, TextIO, Tuple
+
+from .sse import sse_event
+
+# A new session's response normally attaches within milliseconds; if it never
+# does (client gone before the first byte), the pipeline is cancelled after this
+# long, or after the grace period if that is longer.
+ATTACH_TIMEOUT_SECONDS = 5.0
+
+
+def parse_last_event_id(value: Optional[str]) -> Tuple[Optional[str], int]:
+    """Split a Last-Event-ID of the form '<session_id>:<n>' (a bare '<n>' has no session)"""
+    if not value:
+        return None, 0
+    session_id, _, number = value.strip().rpartition(":")
+    try:
+        n = int(number)
+    except ValueError:
+        return None, 0
+    return session_id or None, max(0, n)
+
+
+class ResearchSession:
+    __slots__ = (
+        "session_id", "fingerprint", "buffer", "next_id", "done", "created_at", "finished_at",
+        "task", "subscribers", "changed", "grace_handle", "spill_path", "_spill",
+    )
+
+    def __init__(self, session_id: str, fingerprint: str, buffer_events: int) -> None:
+        self.session_id = session_id
+        self.fingerprint = fingerprint
+        self.buffer: Deque[Tuple[int, str]] = deque(maxlen=buffer_events)  # (event number, frame)
+        self.next_id = 1
+        self.done = False
+        self.created_at = time.time()
+        self.finished_at = 0.0
+        self.task: Optional["asyncio.Task[None]"] = None
+        self.subscribers = 0
+        self.changed = asyncio.Condition()
+        self.grace_handle: Optional[asyncio.TimerHandle] = None
+        self.spill_path: Optional[str] = None
+        self._spill: Optional[TextIO] = None
+
+    @property
+    def first_buffered(self) -> int:
+        return self.buffer[0][0] if self.buffer else self.next_id
+
+    def spill(self, spill_dir: str, number: int, frame: str) -> bool:
+        if self._spill is None:
+            self.spill_path = os.path.join(spill_dir, f"{self.session_id}.jsonl")
+            try:
+                self._spill = open(self.spill_path, "a", encoding="utf-8")
+            except OSError as e:
+                print(f"Research session spill unavailable ({e})")
+                self.spill_path = None
+                return False
+        self._spill.write(json.dumps([number, frame]) + "\n")
+        return True
+
+    def read_spill(self, after: int) -> Iterator[Tuple[int, str]]:
+        if self.spill_path is None:
+            return
+        if self._spill is not None:
+            self._spill.flush()
+        try:
+            with open(self.spill_path, encoding="utf-8") as f:
+                for line in f:
+                    number, frame = json.loads(line)
+                    if number > after:
+                        yield number, frame
+        except OSError:
+            return
+
+    def close_spill(self, remove: bool = False) -> None:
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+        if remove and self.spill_path:
+            try:
+                os.remove(self.spill_path)
+            except OSError:
+                pass
+            self.spill_path = None
+
+
+class ResearchSessionRegistry:
+    def __init__(
+        self,
+        max_sessions: int = 1000,
+        buffer_events: int = 512,
+        retention_seconds: float = 120.0,
+        grace_seconds: float = 15.0,
+        spill_dir: Optional[str] = None,
+    ) -> None:
+        self.max_sessions = max(1, max_sessions)
+        self.buffer_events = max(1, buffer_events)
+        self.retention_seconds = retention_seconds
+        self.grace_seconds = grace_seconds
+        self.spill_dir = spill_dir
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+        self._sessions: "OrderedDict[str, ResearchSession]" = OrderedDict()  # creation order
+        self.started_total = 0
+        self.resumed_total = 0
+        self.replayed_events_total = 0
+        self.replay_gaps_total = 0
+        self.spilled_events_total = 0
+        self.abandoned_total = 0
+        self.evicted_total = 0
+
+    def _evict(self, now: float) -> None:
+        """Drop finished sessions past retention, then the oldest finished ones while over the cap"""
+        for session_id, session in list(self._sessions.items()):
+            if session.done and now - session.finished_at > self.retention_seconds:
+                self._remove(session_id)
+        if len(self._sessions) >= self.max_sessions:
+            for session_id, session in list(self._sessions.items()):
+                if len(self._sessions) < self.max_sessions:
+                    break
+                if session.done:
+                    self._remove(session_id)
+                    self.evicted_total += 1
+
+    def _remove(self, session_id: str) -> None:
+        session = self._sessions.pop(session_id)
+        session.close_spill(remove=True)
+
+    def create(self, fingerprint: str) -> ResearchSession:
+        self._evict(time.time())
+        session = ResearchSession(secrets.token_urlsafe(12), fingerprint, self.buffer_events)
+        self._sessions[session.session_id] = session
+        self.started_total += 1
+        return session
+
+    def run(self, session: ResearchSession, frames: AsyncIterator[str]) -> "asyncio.Task[None]":
+        """Drive the session's frame generator in a task of its own.
+
+        The abandonment timer is armed at once and cleared when a subscriber
+        attaches, so a response that is never streamed does not leave the
+        pipeline running.
+        """
+        session.task = asyncio.create_task(self._produce(session, frames))
+        self._arm_grace(session, max(self.grace_seconds, ATTACH_TIMEOUT_SECONDS))
+        return session.task
+
+    def get(self, session_id: str, fingerprint: str) -> Optional[ResearchSession]:
+        """A session that is still known here and belongs to this fingerprint"""
+        session = self._sessions.get(session_id)
+        if session is None or session.fingerprint != fingerprint:
+            return None
+        if session.done and time.time() - session.finished_at > self.retention_seconds:
+            return None
+        return session
+
+    async def _produce(self, session: ResearchSession, frames: AsyncIterator[str]) -> None:
+        try:
+            async for frame in frames:
+                number = session.next_id
+                session.next_id += 1
+                if len(session.buffer) == session.buffer.maxlen and self.spill_dir:
+                    if session.spill(self.spill_dir, *session.buffer[0]):
+                        self.spilled_events_total += 1
+                session.buffer.append((number, f"id: {session.session_id}:{number}\n{frame}"))
+                async with session.changed:
+                    session.changed.notify_all()
+        except Exception as e:
+            print(f"Research session {session.session_id} failed: {e}")
+        finally:
+            aclose = getattr(frames, "aclose", None)
+            if aclose is not None:
+                await aclose()
+            session.done = True
+            session.finished_at = time.time()
+            session.close_spill()
+            if session.grace_handle is not None:
+                session.grace_handle.cancel()
+            async with session.changed:
+                session.changed.notify_all()
+
+    def _detached(self, session: ResearchSession) -> None:
+        if session.subscribers or session.done or session.task is None:
+            return
+        if self.grace_seconds <= 0:
+            self._abandon(session)
+            return
+        self._arm_grace(session, self.grace_seconds)
+
+    def _arm_grace(self, session: ResearchSession, delay: float) -> None:
+        if session.grace_handle is not None:
+            session.grace_handle.cancel()
+        session.grace_handle = asyncio.get_running_loop().call_later(delay, self._abandon, session)
+
+    def _abandon(self, session: ResearchSession) -> None:
+        """Nobody came back for the session: cancel its pipeline"""
+        session.grace_handle = None
+        if session.subscribers or session.done or session.task is None:
+            return
+        self.abandoned_total += 1
+        session.task.cancel()
+
+    async def subscribe(self, session: ResearchSession, last_event_id: int = 0, resumed: bool = False) -> AsyncIterator[str]:
+        """Frames numbered after last_event_id: replayed ones first, then live ones until the session ends"""
+        session.subscribers += 1
+        if session.grace_handle is not None:
+            session.grace_handle.cancel()
+            session.grace_handle = None
+        replaying = resumed
+        if resumed:
+            self.resumed_total += 1
+        cursor = last_event_id
+        try:
+            while True:
+                if cursor + 1 < session.first_buffered:
+                    # Older than the ring: read what was spilled, else say what is missing
+                    for number, frame in session.read_spill(cursor):
+                        if number >= session.first_buffered:
+                            break
+                        cursor = number
+                        self.replayed_events_total += 1
+                        yield frame
+                    if cursor + 1 < session.first_buffered:
+                        self.replay_gaps_total += 1
+                        yield sse_event("replay_gap", {"from": cursor + 1, "to": session.first_buffered - 1})
+                        cursor = session.first_buffered - 1
+                start = cursor + 1 - session.first_buffered
+                pending = list(islice(session.buffer, start, None)) if start < len(session.buffer) else []
+                for number, frame in pending:
+                    cursor = number
+                    if replaying:
+                        self.replayed_events_total += 1
+                    yield frame
+                replaying = False
+                if session.done and cursor >= session.next_id - 1:
+                    return
+                async with session.changed:
+                    await session.changed.wait_for(lambda: session.done or session.next_id - 1 > cursor)
+        finally:
+            session.subscribers -= 1
+            self._detached(session)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get resumable session metrics"""
+        running = sum(1 for s in self._sessions.values() if not s.done)
+        return {
+            "sessions": len(self._sessions),
+            "running": running,
+            "detached": sum(1 for s in self._sessions.values() if not s.done and not s.subscribers),
+            "buffer_events": self.buffer_events,
+            "grace_seconds": self.grace_seconds,
+            "retention_seconds": self.retention_seconds,
+            "spill_dir": self.spill_dir,
+            "started_total": self.started_total,
+            "resumed_total": self.resumed_total,
+            "replayed_events_total": self.replayed_events_total,
+            "replay_gaps_total": self.replay_gaps_total,
+            "spilled_events_total": self.spilled_events_total,
+            "abandoned_total": self.abandoned_total,
+            "evicted_total": self.evicted_total,
+        }
+
+
+research_sessions = ResearchSessionRegistry(
+    max_sessions=int(os.getenv("RESEARCH_SESSION_MAX", "1000")),
+    buffer_events=int(os.getenv("RESEARCH_SESSION_BUFFER_EVENTS", "512")),
+    retention_seconds=float(os.getenv("RESEARCH_SESSION_RETENTION_SECONDS", "120")),
+    grace_seconds=float(os.getenv("RESEARCH_RESUME_GRACE_SECONDS", "15")),
+    spill_dir=os.getenv("RESEARCH_SESSION_SPILL_DIR") or None,
+)
@@ -0,0 +1,118 @@
+"""
+Short-lived result handles for research sessions
+
+The full filtered result set of a session is kept in memory under an opaque
+handle so the extension can page through it with GET /session/results/{handle}
+without another MCP search or LLM call. Handles belong to the fingerprint that
+created them, expire after a TTL and are evicted least recently used first.
+Handles are per instance; a request for one that lives elsewhere gets a 404.
+"""
+import os
+import sys
+import time
+import secrets
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+
+class _ResultSet:
+    __slots__ = ("fingerprint", "items", "meta", "expires_at")
+
+    def __init__(self, fingerprint: str, items: List[Dict[str, Any]], meta: Dict[str, Any], expires_at: float) -> None:
+        self.fingerprint = fingerprint
+        self.items = items
+        self.meta = meta
+        self.expires_at = expires_at
+
+
+class ResultHandleStore:
+    def __init__(self, ttl_seconds: float = 900, max_handles: int = 2000, max_items: int = 500, max_page_size: int = 100) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_handles = max(1, max_handles)
+        self.max_items = max(1, max_items)
+        self.max_page_size = max(1, max_page_size)
+        self._sets: "OrderedDict[str, _ResultSet]" = OrderedDict()  # handle -> result set, LRU order
+        self.created_total = 0
+        self.pages_served_total = 0
+        self.misses_total = 0
+        self.expired_total = 0
+        self.evicted_total = 0
+
+    def _purge_expired(self, now: float) -> None:
+        expired = [h for h, s in self._sets.items() if s.expires_at <= now]
+        for handle in expired:
+            del self._sets[handle]
+        self.expired_total += len(expired)
+
+    def put(self, fingerprint: str, items: List[Dict[str, Any]], **meta: Any) -> str:
+        """Keep up to max_items items for this fingerprint and return a new handle"""
+        now = time.time()
+        self._purge_expired(now)
+        while len(self._sets) >= self.max_handles:
+            self._sets.popitem(last=False)
+            self.evicted_total += 1
+        handle = secrets.token_urlsafe(16)
+        self._sets[handle] = _ResultSet(fingerprint, list(items[: self.max_items]), meta, now + self.ttl_seconds)
+        self.created_total += 1
+        return handle
+
+    def get_page(self, handle: str, fingerprint: str, offset: int = 0, limit: int = 25) -> Optional[Dict[str, Any]]:
+        """One page of a result set, or None if the handle is unknown, expired or not this fingerprint's"""
+        result_set = self._sets.get(handle)
+        now = time.time()
+        if result_set is not None and result_set.expires_at <= now:
+            del self._sets[handle]
+            self.expired_total += 1
+            result_set = None
+        if result_set is None or result_set.fingerprint != fingerprint:
+            self.misses_total += 1
+            return None
+        self._sets.move_to_end(handle)
+        offset = max(0, offset)
+        limit = max(1, min(limit, self.max_page_size))
+        page = result_set.items[offset: offset + limit]
+        next_offset = offset + len(page)
+        self.pages_served_total += 1
+        return {
+            "handle": handle,
+            "offset": offset,
+            "limit": limit,
+            "items": page,
+            "total": len(result_set.items),
+            "next_offset": next_offset if next_offset < len(result_set.items) else None,
+            "expires_in": int(result_set.expires_at - now),
+            **result_set.meta,
+        }
+
+    def approx_memory_bytes(self) -> int:
+        """Rough size of the retained items, extrapolated from one sampled set"""
+        size = sys.getsizeof(self._sets)
+        for result_set in self._sets.values():
+            per_item = 0
+            for item in result_set.items[:1]:
+                per_item = sys.getsizeof(item) + sum(sys.getsizeof(v) for v in item.values())
+            size += (sys.getsizeof(result_set) + sys.getsizeof(result_set.items) + per_item * len(result_set.items)) * len(self._sets)
+            break
+        return size
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get result handle metrics"""
+        return {
+            "handles": len(self._sets),
+            "max_handles": self.max_handles,
+            "ttl_seconds": self.ttl_seconds,
+            "created_total": self.created_total,
+            "pages_served_total": self.pages_served_total,
+            "misses_total": self.misses_total,
+            "expired_total": self.expired_total,
+            "evicted_total": self.evicted_total,
+            "approx_bytes": self.approx_memory_bytes(),
+        }
+
+
+result_handles = ResultHandleStore(
+    ttl_seconds=float(os.getenv("RESULT_HANDLE_TTL_SECONDS", "900")),
+    max_handles=int(os.getenv("RESULT_HANDLE_MAX", "2000")),
+    max_items=int(os.getenv("RESULT_HANDLE_MAX_ITEMS", "500")),
+    max_page_size=int(os.getenv("RESULT_PAGE_MAX", "100")),
+)
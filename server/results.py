@@ -0,0 +1,115 @@
+"""
+Result normalisation for MCP search items
+
+Each item is parsed once into a compact ResultRecord (year, court code,
+neutral citation, de-duplication key) with module-level precompiled patterns;
+filtering, sorting and de-duplication then run over the records in batch.
+"""
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+_MONTHS = "January|February|March|April|May|June|July|August|September|October|November|December"
+_YEAR_DATE_RE = re.compile(r"\((?:\d{1,2})\s+(?:" + _MONTHS + r")\s+(\d{4})\)")
+# First [YYYY], plus the rest of a neutral citation when it is one: [2020] HCA 12, [2019] NSWCA 3
+_BRACKET_CITATION_RE = re.compile(r"\[(\d{4})](?:\s+([A-Z][A-Za-z]{1,11})\s+(\d{1,5})\b)?")
+# AustLII case URLs: .../au/cases/cth/HCA/2020/12.html
+_URL_COURT_RE = re.compile(r"/cases/[a-z]+/([A-Za-z]+)/(\d{4})/")
+
+# Prompt hints that mean the user already gave a court, jurisdiction or date
+_SPECIFIC_HINTS = ("hca", "fca", "nsw", "vic", "qld", "tribunal", "since ", "after ", "before ", "between ", "[20", "(20")
+
+
+def is_vague(prompt: str) -> bool:
+    """Short or unanchored prompts get the MCP server's auto search method"""
+    p = (prompt or "").lower()
+    if len(p.split()) <= 3:
+        return True
+    return not any(h in p for h in _SPECIFIC_HINTS)
+
+
+class ResultRecord:
+    __slots__ = ("item", "year", "court", "citation", "key")
+
+    def __init__(self, item: Dict[str, Any], year: Optional[int], court: Optional[str], citation: Optional[str], key: str) -> None:
+        self.item = item
+        self.year = year
+        self.court = court
+        self.citation = citation
+        self.key = key
+
+
+def parse_item(item: Dict[str, Any]) -> ResultRecord:
+    title = str(item.get("title") or "")
+    url = str(item.get("url") or "")
+    year: Optional[int] = None
+    court: Optional[str] = None
+    citation: Optional[str] = None
+    # One search yields the year and, for neutral citations, court and number
+    m = _BRACKET_CITATION_RE.search(title) if "[" in title else None
+    if m:
+        year = int(m.group(1))
+        if m.group(2):
+            court = m.group(2)
+            citation = f"[{m.group(1)}] {court} {m.group(3)}"
+    elif "(" in title:
+        m = _YEAR_DATE_RE.search(title)
+        if m:
+            year = int(m.group(1))
+    if court is None and "/cases/" in url:
+        m = _URL_COURT_RE.search(url)
+        if m:
+            court = m.group(1)
+            if year is None:
+                year = int(m.group(2))
+    # The same decision can come back from several databases or under slightly different titles
+    key = citation or url.partition("#")[0].rstrip("/") or title.strip().lower()
+    return ResultRecord(item, year, court, citation, key)
+
+
+def normalize_items(items: Iterable[Any]) -> List[ResultRecord]:
+    """Parse every dict item once; anything else returned by the tool is dropped"""
+    return [parse_item(it) for it in items if isinstance(it, dict)]
+
+
+def dedupe(records: List[ResultRecord]) -> List[ResultRecord]:
+    """Keep the first (highest ranked) record for each key"""
+    seen = set()
+    out = []
+    for r in records:
+        if r.key not in seen:
+            seen.add(r.key)
+            out.append(r)
+    return out
+
+
+def filter_years(records: List[ResultRecord], year_from: Optional[int] = None, year_to: Optional[int] = None) -> List[ResultRecord]:
+    """Keep records inside the year range; with a range set, undated records are dropped"""
+    if not year_from and not year_to:
+        return records
+    lo = year_from or 0
+    hi = year_to or 9999
+    return [r for r in records if r.year is not None and lo <= r.year <= hi]
+
+
+def sort_records(records: List[ResultRecord], by: str = "relevance") -> List[ResultRecord]:
+    """relevance keeps the search order; newest/oldest sort by year (undated last), stable within a year"""
+    if by == "newest":
+        return sorted(records, key=lambda r: -(r.year or 0))
+    if by == "oldest":
+        return sorted(records, key=lambda r: r.year or 10000)
+    return records
+
+
+def process_results(
+    items: Iterable[Any],
+    year_from: Optional[int] = None,
+    year_to: Optional[int] = None,
+    sort: str = "relevance",
+) -> Tuple[List[ResultRecord], List[ResultRecord]]:
+    """Normalise and de-duplicate, then filter and sort. Returns (all records, filtered records)."""
+    records = dedupe(normalize_items(items))
+    return records, sort_records(filter_years(records, year_from, year_to), sort)
+
+
+def as_items(records: List[ResultRecord]) -> List[Dict[str, Any]]:
+    return [r.item for r in records]
@@ -0,0 +1,152 @@
+"""
+Deterministic fast-path planner for well-structured prompts
+
+Prompts such as "HCA negligence 2020" already name the court and plain search
+terms, so the Boolean query and database codes can be built locally from the
+catalogue index. Low-confidence prompts are left to HOST_AI.plan_search.
+"""
+import os
+import re
+from typing import Any, Dict, List, Optional
+
+from .catalogue import JURISDICTION_INDEX, ambiguous_terms, match_databases, strip_database_terms
+
+_QUOTED_RE = re.compile(r'"([^"]+)"')
+_YEAR_RE = re.compile(r"\b(?:19|20)\d{2}\b")
+_NUMBER_RE = re.compile(r"\d")
+_WORD_RE = re.compile(r"[a-z][a-z'\-]*[a-z]")
+# The user's own search syntax: AND/OR/NOT operators, -exclusions, grouping
+_BOOLEAN_RE = re.compile(r"\b(?:AND|OR|NOT)\b|(?:^|\s)-\w|[()]")
+
+_STOPWORDS = frozenset(
+    """a an and the of in on for to about regarding re with by from at as
+    case cases decision decisions judgment judgments judgement judgements authority authorities
+    recent latest new leading key important relevant find show me list any some all
+    court courts tribunal tribunals law laws australia australian""".split()
+)
+# Natural-language questions need the model to pick terms and synonyms
+_QUESTION_WORDS = frozenset(
+    """what how why whether when which who can could does do did is are should would
+    explain compare summarise summarize difference""".split()
+)
+# Date ranges need year expansion, which the model handles
+_RANGE_WORDS = frozenset("since after before between until from".split())
+# Alternatives and exclusions written in words cannot become a plain AND query
+_OPERATOR_WORDS = frozenset("or nor not except excluding without".split())
+# Words that join a legal phrase ("duty of care", "abuse of process") rather than separate terms
+_CONNECTIVES = frozenset("of to by".split())
+
+
+def _term_groups(words: List[str]) -> List[List[str]]:
+    """Search terms in order; content words joined by a connective stay together as one phrase"""
+    groups: List[List[str]] = []
+    joined = False
+    for i, w in enumerate(words):
+        if w in _STOPWORDS:
+            nxt = words[i + 1] if i + 1 < len(words) else ""
+            joined = w in _CONNECTIVES and i > 0 and words[i - 1] not in _STOPWORDS and bool(nxt) and nxt not in _STOPWORDS
+            if joined:
+                groups[-1].append(w)
+            continue
+        if joined:
+            groups[-1].append(w)
+            joined = False
+        else:
+            groups.append([w])
+    return groups
+
+
+class RulePlanner:
+    def __init__(self, min_confidence: float = 0.8, max_terms: int = 6, enabled: bool = True) -> None:
+        self.enabled = enabled
+        self.min_confidence = min_confidence
+        self.max_terms = max_terms
+        self.served_total = 0
+        self.fallback_total = 0
+
+    def plan(self, user_prompt: str, max_dbs: int = 5) -> Optional[Dict[str, Any]]:
+        """Plan locally, or return None when confidence is below min_confidence.
+
+        The returned plan has the same "query"/"databases" keys as
+        HostAI.plan_search plus a "confidence" score.
+        """
+        if not self.enabled:
+            return None
+        plan = self._plan(user_prompt or "", max(1, max_dbs))
+        if plan is None or plan["confidence"] < self.min_confidence:
+            self.fallback_total += 1
+            return None
+        self.served_total += 1
+        return plan
+
+    def _plan(self, prompt: str, max_dbs: int) -> Optional[Dict[str, Any]]:
+        courts, jurisdictions = match_databases(prompt)
+        confidence = 0.0
+        if courts:
+            databases = courts[:max_dbs]
+            confidence += 0.5
+        elif jurisdictions:
+            databases = []
+            for j in jurisdictions:
+                broad = f"au/cases/{j}"
+                databases.extend([broad] if broad in JURISDICTION_INDEX.get(j, []) else JURISDICTION_INDEX.get(j, [])[:2])
+            databases = databases[:max_dbs]
+            confidence += 0.3
+        else:
+            return None
+
+        if _BOOLEAN_RE.search(prompt):
+            # Keep the user's operators intact by letting the model build the query
+            return None
+        if ambiguous_terms(prompt):
+            # "native title", "fair work": stripping them as a court could drop the main search term
+            return None
+        phrases = [p.strip() for p in _QUOTED_RE.findall(prompt) if p.strip()]
+        rest = strip_database_terms(_QUOTED_RE.sub(" ", prompt))
+        years = sorted(set(_YEAR_RE.findall(rest)))
+        rest = _YEAR_RE.sub(" ", rest)
+        if _NUMBER_RE.search(rest):
+            # Section numbers and citations need the model's query construction
+            return None
+        words = _WORD_RE.findall(rest)
+        if any(w in _QUESTION_WORDS or w in _RANGE_WORDS or w in _OPERATOR_WORDS for w in words):
+            return None
+        terms: List[str] = []
+        for group in _term_groups(words):
+            term = " ".join(group)
+            if len(group) > 1:
+                if term not in phrases:
+                    phrases.append(term)
+            elif term not in terms:
+                terms.append(term)
+        n_terms = len(terms) + len(phrases)
+        if n_terms == 0:
+            return None
+        if n_terms <= 4:
+            confidence += 0.3
+        elif n_terms <= self.max_terms:
+            confidence += 0.1
+        if len(prompt.split()) <= 10:
+            confidence += 0.2
+
+        parts = [f'"{p}"' for p in phrases] + terms
+        if years:
+            parts.append(years[0] if len(years) == 1 else "(" + " OR ".join(years) + ")")
+        return {"query": " AND ".join(parts), "databases": databases, "confidence": round(confidence, 2)}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get fast-path usage statistics"""
+        total = self.served_total + self.fallback_total
+        return {
+            "enabled": self.enabled,
+            "min_confidence": self.min_confidence,
+            "served_total": self.served_total,
+            "fallback_total": self.fallback_total,
+            "served_ratio": round(self.served_total / total, 4) if total else 0,
+        }
+
+
+RULE_PLANNER = RulePlanner(
+    min_confidence=float(os.getenv("RULE_PLANNER_MIN_CONFIDENCE", "0.8")),
+    enabled=os.getenv("RULE_PLANNER_ENABLED", "1").lower() not in ("0", "false", "no"),
+)
@@ -1,11 +1,87 @@
 """
 Security utilities for the Olexi Extension Host
 """
+import os
 import re
 import hashlib
-from typing import Optional
+from collections import OrderedDict
+from typing import Optional, Tuple
 from fastapi import HTTPException, Request
 
+# Patterns are compiled once at import
+_CHROME_UA_RE = re.compile(r"Chrome/\d+")
+_AUSTLII_ORIGIN_RE = re.compile(r"https://([a-z0-9-]+\.)*austlii\.edu\.au/?$")
+_FINGERPRINT_RE = re.compile(r"[a-f0-9]{32}")
+
+# Common bot/automation tools, matched case-insensitively in one pass
+SUSPICIOUS_AGENTS = (
+    'curl', 'wget', 'python', 'bot', 'crawler', 'spider',
+    'automated', 'selenium', 'phantomjs', 'headless'
+)
+_SUSPICIOUS_AGENT_RE = re.compile("|".join(map(re.escape, SUSPICIOUS_AGENTS)), re.IGNORECASE)
+
+# Verdicts depend only on (user-agent, origin), which repeat across requests
+_VERDICT_CACHE_SIZE = int(os.getenv("SECURITY_VERDICT_CACHE_SIZE", "4096"))
+_verdict_cache: "OrderedDict[Tuple[str, str], Tuple[bool, bool]]" = OrderedDict()
+
+
+def _client_verdict(user_agent: str, origin: str) -> Tuple[bool, bool]:
+    """(trusted browser context, automation user-agent), cached per (UA, origin)"""
+    key = (user_agent, origin)
+    verdict = _verdict_cache.get(key)
+    if verdict is not None:
+        _verdict_cache.move_to_end(key)
+        return verdict
+    trusted = bool(_CHROME_UA_RE.search(user_agent)) and (
+        origin.startswith("chrome-extension://") or bool(_AUSTLII_ORIGIN_RE.match(origin))
+    )
+    verdict = (trusted, bool(_SUSPICIOUS_AGENT_RE.search(user_agent)))
+    _verdict_cache[key] = verdict
+    if len(_verdict_cache) > _VERDICT_CACHE_SIZE:
+        _verdict_cache.popitem(last=False)
+    return verdict
+
+
+class RequestSecurity:
+    """Security facts about one request, computed from its headers once."""
+
+    __slots__ = ("trusted_source", "suspicious_agent", "browser_headers", "fingerprint", "session_token")
+
+    def __init__(self, request: Request) -> None:
+        headers = request.headers
+        self.fingerprint: str = headers.get("x-extension-fingerprint") or ""
+        self.session_token: Optional[str] = headers.get("x-session-token")
+        trusted, self.suspicious_agent = _client_verdict(headers.get("user-agent", ""), headers.get("origin") or "")
+        self.trusted_source = trusted and bool(self.fingerprint)
+        self.browser_headers = bool(headers.get("accept-language")) and bool(headers.get("accept-encoding"))
+
+    def fingerprint_valid(self, fingerprint: Optional[str] = None) -> bool:
+        return validate_fingerprint_format(self.fingerprint if fingerprint is None else fingerprint)
+
+    def is_suspicious(self, fingerprint: Optional[str] = None) -> bool:
+        fp = self.fingerprint if fingerprint is None else fingerprint
+        return self.suspicious_agent or not self.browser_headers or _weak_fingerprint(fp)
+
+
+def analyse_request(request: Request) -> RequestSecurity:
+    """Analyse the request once and keep the result on request.state.security"""
+    security = getattr(request.state, "security", None)
+    if security is None:
+        security = RequestSecurity(request)
+        request.state.security = security
+    return security
+
+
+async def request_security(request: Request) -> RequestSecurity:
+    """FastAPI dependency form of analyse_request"""
+    return analyse_request(request)
+
+
+def _weak_fingerprint(fingerprint: str) -> bool:
+    # e.g. all zeros or repeating patterns
+    return fingerprint == "0" * 32 or len(set(fingerprint)) < 4
+
+
 def validate_chrome_extension_request(request: Request) -> bool:
     """Validate that the request comes from the trusted browser context.
 
@@ -14,39 +90,15 @@ def validate_chrome_extension_request(request: Request) -> bool:
     MV3 content scripts may present the page origin in the fetch Origin header.
     Additional checks (Chrome UA and fingerprint header) remain required.
     """
-    origin = request.headers.get("origin") or ""
-    user_agent = request.headers.get("user-agent", "")
-    fingerprint_present = bool(request.headers.get("x-extension-fingerprint"))
-
-    if not fingerprint_present:
-        return False
-
-    # Must look like Chrome
-    if not re.search(r"Chrome/\d+", user_agent):
-        return False
-
-    # Accept either the extension origin or austlii.edu.au (any subdomain)
-    if origin.startswith("chrome-extension://"):
-        return True
-    if re.match(r"https://([a-z0-9-]+\.)*austlii\.edu\.au/?$", origin):
-        return True
-
-    return False
+    return analyse_request(request).trusted_source
 
 def validate_fingerprint_format(fingerprint: str) -> bool:
     """Validate that the fingerprint has the expected format"""
     if not fingerprint:
         return False
     
-    # Should be 32 character hex string
-    if len(fingerprint) != 32:
-        return False
-    
-    # Should only contain hex characters
-    if not re.match(r'^[a-f0-9]{32}$', fingerprint):
-        return False
-    
-    return True
+    # Should be a 32 character lowercase hex string
+    return _FINGERPRINT_RE.fullmatch(fingerprint) is not None
 
 def get_client_ip(request: Request) -> str:
     """Get the real client IP, considering proxies"""
@@ -68,29 +120,4 @@ def get_client_ip(request: Request) -> str:
 
 def is_suspicious_request(request: Request, fingerprint: str) -> bool:
     """Detect potentially suspicious requests"""
-    
-    # Check for common automation indicators
-    user_agent = request.headers.get("user-agent", "").lower()
-    
-    # Common bot/automation tools
-    suspicious_agents = [
-        'curl', 'wget', 'python', 'bot', 'crawler', 'spider',
-        'automated', 'selenium', 'phantomjs', 'headless'
-    ]
-    
-    if any(agent in user_agent for agent in suspicious_agents):
-        return True
-    
-    # Check for missing standard browser headers
-    if not request.headers.get("accept-language"):
-        return True
-    
-    if not request.headers.get("accept-encoding"):
-        return True
-    
-    # Check for suspicious fingerprint patterns
-    # (e.g., all zeros, repeating patterns)
-    if fingerprint == "0" * 32 or len(set(fingerprint)) < 4:
-        return True
-    
-    return False
+    return analyse_request(request).is_suspicious(fingerprint)
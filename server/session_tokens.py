@@ -3,162 +3,437 @@ Session token management for Olexi Extension Host
 Provides temporary tokens without requiring user authentication
 """
 import os
+import sys
+import hmac
 import time
+import heapq
+import base64
 import secrets
 import hashlib
-from typing import Dict, Optional, Tuple
-from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+from collections import OrderedDict
 import asyncio
 from fastapi import HTTPException
 
+from .state_store import make_state_store
+
+
+class _TokenRecord:
+    __slots__ = ("fingerprint", "created_at", "last_used", "request_count")
+
+    def __init__(self, fingerprint: str, created_at: float) -> None:
+        self.fingerprint = fingerprint
+        self.created_at = created_at
+        self.last_used = created_at
+        self.request_count = 0
+
+    def to_dict(self) -> Dict:
+        return {
+            "fingerprint": self.fingerprint,
+            "created_at": self.created_at,
+            "last_used": self.last_used,
+            "request_count": self.request_count,
+        }
+
+
 class SessionTokenManager:
-    def __init__(self, token_lifetime_hours: int = 24, max_tokens_per_fingerprint: int = 3):
+    def __init__(self, token_lifetime_hours: int = 24, max_tokens_per_fingerprint: int = 3, max_fingerprints: int = 100000):
         self.token_lifetime_hours = token_lifetime_hours
         self.max_tokens_per_fingerprint = max_tokens_per_fingerprint
-        self.tokens: Dict[str, Dict] = {}  # token -> {fingerprint, created_at, last_used}
-        self.fingerprint_tokens: Dict[str, list] = defaultdict(list)  # fingerprint -> [tokens]
+        # Hard cap on tracked fingerprints; the least recently active one is evicted with its tokens
+        self.max_fingerprints = max(1, max_fingerprints)
+        self.tokens: Dict[str, _TokenRecord] = {}  # token -> record
+        self.fingerprint_tokens: "OrderedDict[str, Set[str]]" = OrderedDict()  # fingerprint -> {tokens}, LRU order
+        self.evicted_fingerprints_total = 0
+        # Min-heap of (expires_at, token). Entries for revoked or evicted tokens
+        # are left in place and skipped when they reach the top.
+        self._expiry_heap: List[Tuple[float, str]] = []
+        self._total_requests = 0
         self.lock = asyncio.Lock()
-    
-    def _is_token_expired(self, token_data: Dict) -> bool:
+
+    @property
+    def _lifetime_seconds(self) -> float:
+        return self.token_lifetime_hours * 3600
+
+    def _is_token_expired(self, token_data: _TokenRecord) -> bool:
         """Check if a token has expired"""
-        created_at = token_data.get("created_at", 0)
-        return time.time() - created_at > (self.token_lifetime_hours * 3600)
-    
+        return time.time() - token_data.created_at > self._lifetime_seconds
+
+    def _remove_token(self, token: str) -> Optional[_TokenRecord]:
+        record = self.tokens.pop(token, None)
+        if record is None:
+            return None
+        self._total_requests -= record.request_count
+        fp_tokens = self.fingerprint_tokens.get(record.fingerprint)
+        if fp_tokens is not None:
+            fp_tokens.discard(token)
+            if not fp_tokens:
+                del self.fingerprint_tokens[record.fingerprint]
+        return record
+
     def _cleanup_expired_tokens(self):
-        """Remove expired tokens"""
-        expired_tokens = []
-        for token, data in self.tokens.items():
-            if self._is_token_expired(data):
-                expired_tokens.append(token)
-        
-        for token in expired_tokens:
-            fingerprint = self.tokens[token]["fingerprint"]
-            del self.tokens[token]
-            if token in self.fingerprint_tokens[fingerprint]:
-                self.fingerprint_tokens[fingerprint].remove(token)
-    
+        """Remove expired tokens, oldest first, in O(log n) per expired token"""
+        now = time.time()
+        cutoff = now - self._lifetime_seconds
+        heap = self._expiry_heap
+        while heap and heap[0][0] < now:
+            _, token = heapq.heappop(heap)
+            record = self.tokens.get(token)
+            if record is not None and record.created_at < cutoff:
+                self._remove_token(token)
+        # Drop stale entries left by revocations once they dominate the heap
+        if len(heap) > 2 * len(self.tokens) + 1024:
+            self._expiry_heap = [(r.created_at + self._lifetime_seconds, t) for t, r in self.tokens.items()]
+            heapq.heapify(self._expiry_heap)
+
     async def generate_token(self, fingerprint: str) -> str:
         """Generate a new session token for a fingerprint"""
         async with self.lock:
             self._cleanup_expired_tokens()
-            
-            # Limit tokens per fingerprint
-            current_tokens = [
-                token for token in self.fingerprint_tokens[fingerprint]
-                if token in self.tokens and not self._is_token_expired(self.tokens[token])
-            ]
-            
+
             # Remove oldest tokens if we're at the limit
+            current_tokens = self.fingerprint_tokens.get(fingerprint, set())
             while len(current_tokens) >= self.max_tokens_per_fingerprint:
-                oldest_token = min(current_tokens, key=lambda t: self.tokens[t]["created_at"])
-                del self.tokens[oldest_token]
-                current_tokens.remove(oldest_token)
-                self.fingerprint_tokens[fingerprint].remove(oldest_token)
-            
+                oldest_token = min(current_tokens, key=lambda t: self.tokens[t].created_at)
+                self._remove_token(oldest_token)
+                current_tokens = self.fingerprint_tokens.get(fingerprint, set())
+
+            # Evict the least recently active fingerprint if this one would exceed the cap
+            if fingerprint not in self.fingerprint_tokens:
+                while len(self.fingerprint_tokens) >= self.max_fingerprints:
+                    _, evicted = self.fingerprint_tokens.popitem(last=False)
+                    for evicted_token in list(evicted):
+                        self._remove_token(evicted_token)
+                    self.evicted_fingerprints_total += 1
+
             # Generate new token
             token = secrets.token_urlsafe(32)
-            
-            # Store token data
-            self.tokens[token] = {
-                "fingerprint": fingerprint,
-                "created_at": time.time(),
-                "last_used": time.time(),
-                "request_count": 0
-            }
-            
-            self.fingerprint_tokens[fingerprint].append(token)
-            
+            now = time.time()
+
+            self.tokens[token] = _TokenRecord(fingerprint, now)
+            self.fingerprint_tokens.setdefault(fingerprint, set()).add(token)
+            self.fingerprint_tokens.move_to_end(fingerprint)
+            heapq.heappush(self._expiry_heap, (now + self._lifetime_seconds, token))
+
             return token
-    
+
     async def validate_token(self, token: str, fingerprint: str) -> bool:
         """Validate a session token against a fingerprint"""
         async with self.lock:
             self._cleanup_expired_tokens()
-            
-            if token not in self.tokens:
+
+            token_data = self.tokens.get(token)
+            if token_data is None:
                 return False
-            
-            token_data = self.tokens[token]
-            
+
             # Check if token belongs to this fingerprint
-            if token_data["fingerprint"] != fingerprint:
+            if token_data.fingerprint != fingerprint:
                 return False
-            
+
             # Check if token is expired
             if self._is_token_expired(token_data):
-                # Clean up expired token
-                del self.tokens[token]
-                if token in self.fingerprint_tokens[fingerprint]:
-                    self.fingerprint_tokens[fingerprint].remove(token)
+                self._remove_token(token)
                 return False
-            
+
             # Update last used time and increment request count
-            token_data["last_used"] = time.time()
-            token_data["request_count"] += 1
-            
+            token_data.last_used = time.time()
+            token_data.request_count += 1
+            self._total_requests += 1
+            if fingerprint in self.fingerprint_tokens:
+                self.fingerprint_tokens.move_to_end(fingerprint)
+
             return True
-    
+
     async def get_token_info(self, token: str) -> Optional[Dict]:
         """Get information about a token"""
         async with self.lock:
             self._cleanup_expired_tokens()
-            
-            if token not in self.tokens:
+
+            record = self.tokens.get(token)
+            if record is None:
                 return None
-            
-            token_data = self.tokens[token].copy()
-            token_data["expires_at"] = token_data["created_at"] + (self.token_lifetime_hours * 3600)
-            token_data["is_expired"] = self._is_token_expired(self.tokens[token])
-            
+
+            token_data = record.to_dict()
+            token_data["expires_at"] = record.created_at + self._lifetime_seconds
+            token_data["is_expired"] = self._is_token_expired(record)
+
             return token_data
-    
+
     async def revoke_token(self, token: str) -> bool:
         """Revoke a specific token"""
         async with self.lock:
-            if token not in self.tokens:
-                return False
-            
-            fingerprint = self.tokens[token]["fingerprint"]
-            del self.tokens[token]
-            
-            if token in self.fingerprint_tokens[fingerprint]:
-                self.fingerprint_tokens[fingerprint].remove(token)
-            
-            return True
-    
+            return self._remove_token(token) is not None
+
     async def get_fingerprint_tokens(self, fingerprint: str) -> list:
         """Get all valid tokens for a fingerprint"""
         async with self.lock:
             self._cleanup_expired_tokens()
-            
-            valid_tokens = []
-            for token in self.fingerprint_tokens[fingerprint]:
-                if token in self.tokens and not self._is_token_expired(self.tokens[token]):
-                    valid_tokens.append(token)
-            
-            return valid_tokens
-    
+
+            return [
+                token for token in self.fingerprint_tokens.get(fingerprint, ())
+                if not self._is_token_expired(self.tokens[token])
+            ]
+
     def get_stats(self) -> Dict:
         """Get statistics about token usage"""
         self._cleanup_expired_tokens()
-        
+
         total_tokens = len(self.tokens)
-        total_fingerprints = len([fp for fp, tokens in self.fingerprint_tokens.items() if tokens])
-        
+        total_fingerprints = len(self.fingerprint_tokens)
+
         # Calculate average requests per token
-        total_requests = sum(data["request_count"] for data in self.tokens.values())
+        total_requests = self._total_requests
         avg_requests = total_requests / total_tokens if total_tokens > 0 else 0
-        
+
         return {
+            "mode": "stateful",
             "total_active_tokens": total_tokens,
             "total_fingerprints": total_fingerprints,
             "total_requests_served": total_requests,
             "average_requests_per_token": round(avg_requests, 2),
+            "token_lifetime_hours": self.token_lifetime_hours,
+            "max_fingerprints": self.max_fingerprints,
+            "evicted_fingerprints_total": self.evicted_fingerprints_total,
+            "approx_bytes": self.approx_memory_bytes(),
+        }
+
+    def approx_memory_bytes(self) -> int:
+        """Rough size of the token maps, extrapolated from one sampled entry"""
+        size = sys.getsizeof(self.tokens) + sys.getsizeof(self.fingerprint_tokens) + sys.getsizeof(self._expiry_heap)
+        for token, record in self.tokens.items():
+            per_token = sys.getsizeof(token) + sys.getsizeof(record) + sys.getsizeof((0.0, token)) + 8
+            size += per_token * len(self.tokens)
+            break
+        for fingerprint, fp_tokens in self.fingerprint_tokens.items():
+            size += (sys.getsizeof(fingerprint) + sys.getsizeof(fp_tokens)) * len(self.fingerprint_tokens)
+            break
+        return size
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _parse_signing_keys(spec: str) -> List[Tuple[str, bytes]]:
+    """Parse "kid1:secret1,kid2:secret2"; the first key signs, all keys verify."""
+    keys: List[Tuple[str, bytes]] = []
+    for part in spec.split(","):
+        kid, sep, secret = part.strip().partition(":")
+        if sep and kid and secret:
+            keys.append((kid, secret.encode("utf-8")))
+    return keys
+
+
+class SignedTokenManager:
+    """Stateless HMAC-signed session tokens.
+
+    A token carries its fingerprint, issue time, expiry and a random id, signed
+    with the active key, so any replica holding the keys can validate it without
+    shared state or a lock. Key rotation: put the new key first in
+    TOKEN_SIGNING_KEYS and keep the old one listed until its tokens expire.
+    Revocation is a bounded per-instance deny-list of token ids, and
+    max_tokens_per_fingerprint cannot be enforced in this mode.
+    """
+
+    VERSION = "v1"
+
+    def __init__(
+        self,
+        signing_keys: List[Tuple[str, bytes]],
+        token_lifetime_hours: int = 24,
+        max_revoked: int = 100_000,
+    ) -> None:
+        if not signing_keys:
+            # Per-process key: tokens will not validate on other replicas or after restart
+            print("TOKEN_SIGNING_KEYS not set; using an ephemeral signing key")
+            signing_keys = [("ephemeral", secrets.token_bytes(32))]
+        self.token_lifetime_hours = token_lifetime_hours
+        self.max_revoked = max(1, max_revoked)
+        self._active_kid, self._active_key = signing_keys[0]
+        self._keys: Dict[str, bytes] = dict(signing_keys)
+        self._revoked: "OrderedDict[str, float]" = OrderedDict()  # token id -> expires_at
+        self.issued_total = 0
+        self.validated_total = 0
+        self.rejected_total = 0
+
+    def _sign(self, key: bytes, message: str) -> str:
+        return _b64encode(hmac.new(key, message.encode("ascii"), hashlib.sha256).digest())
+
+    def _decode(self, token: str) -> Optional[Dict]:
+        """Verify the signature and return the token's claims, or None."""
+        if not token.isascii():
+            # Header values can carry any text; a valid token is base64url only
+            return None
+        try:
+            version, kid, payload, signature = token.split(".")
+        except ValueError:
+            return None
+        key = self._keys.get(kid)
+        if version != self.VERSION or key is None:
+            return None
+        if not hmac.compare_digest(self._sign(key, f"{version}.{kid}.{payload}"), signature):
+            return None
+        try:
+            fingerprint, issued_at, expires_at, token_id = _b64decode(payload).decode("utf-8").split(":")
+            return {
+                "fingerprint": fingerprint,
+                "created_at": float(issued_at),
+                "expires_at": float(expires_at),
+                "token_id": token_id,
+            }
+        except Exception:
+            return None
+
+    async def generate_token(self, fingerprint: str) -> str:
+        """Generate a new signed session token for a fingerprint"""
+        now = int(time.time())
+        expires_at = now + int(self.token_lifetime_hours * 3600)
+        payload = _b64encode(f"{fingerprint}:{now}:{expires_at}:{secrets.token_hex(8)}".encode("utf-8"))
+        signing_input = f"{self.VERSION}.{self._active_kid}.{payload}"
+        self.issued_total += 1
+        return f"{signing_input}.{self._sign(self._active_key, signing_input)}"
+
+    async def validate_token(self, token: str, fingerprint: str) -> bool:
+        """Validate a session token against a fingerprint (no shared state)"""
+        claims = self._decode(token)
+        if (
+            claims is None
+            or claims["fingerprint"] != fingerprint
+            or claims["expires_at"] <= time.time()
+            or claims["token_id"] in self._revoked
+        ):
+            self.rejected_total += 1
+            return False
+        self.validated_total += 1
+        return True
+
+    async def get_token_info(self, token: str) -> Optional[Dict]:
+        """Get information about a token from its signed claims"""
+        claims = self._decode(token)
+        if claims is None or claims["token_id"] in self._revoked or claims["expires_at"] <= time.time():
+            return None
+        return {
+            "fingerprint": claims["fingerprint"],
+            "created_at": claims["created_at"],
+            "expires_at": claims["expires_at"],
+            "is_expired": False,
+        }
+
+    async def revoke_token(self, token: str) -> bool:
+        """Revoke a token by adding its id to the bounded deny-list"""
+        claims = self._decode(token)
+        now = time.time()
+        if claims is None or claims["expires_at"] <= now or claims["token_id"] in self._revoked:
+            return False
+        # Expired ids no longer need denying; drop them before evicting live ones
+        while self._revoked and next(iter(self._revoked.values())) <= now:
+            self._revoked.popitem(last=False)
+        while len(self._revoked) >= self.max_revoked:
+            self._revoked.popitem(last=False)
+        self._revoked[claims["token_id"]] = claims["expires_at"]
+        return True
+
+    async def get_fingerprint_tokens(self, fingerprint: str) -> list:
+        """Signed tokens are not tracked server-side"""
+        return []
+
+    def get_stats(self) -> Dict:
+        """Get statistics about token usage"""
+        return {
+            "mode": "signed",
+            "active_key_id": self._active_kid,
+            "verification_key_ids": list(self._keys),
+            "tokens_issued": self.issued_total,
+            "validations_ok": self.validated_total,
+            "validations_rejected": self.rejected_total,
+            "revoked_tokens": len(self._revoked),
             "token_lifetime_hours": self.token_lifetime_hours
         }
 
-# Global session token manager
-session_token_manager = SessionTokenManager(
-    token_lifetime_hours=int(os.getenv("TOKEN_LIFETIME_HOURS", "24")),
-    max_tokens_per_fingerprint=int(os.getenv("MAX_TOKENS_PER_FINGERPRINT", "3"))
-)
+
+class StoreTokenManager:
+    """Session tokens kept in a shared state store (SQLite or Redis).
+
+    Same behaviour as SessionTokenManager, but every replica sees the same
+    tokens; each call is one atomic store operation and expiry is handled by
+    the store.
+    """
+
+    def __init__(self, store, token_lifetime_hours: int = 24, max_tokens_per_fingerprint: int = 3):
+        self.store = store
+        self.token_lifetime_hours = token_lifetime_hours
+        self.max_tokens_per_fingerprint = max_tokens_per_fingerprint
+
+    async def generate_token(self, fingerprint: str) -> str:
+        """Generate a new session token for a fingerprint"""
+        token = secrets.token_urlsafe(32)
+        now = time.time()
+        await self.store.token_put(
+            token, fingerprint, now, now + self.token_lifetime_hours * 3600, self.max_tokens_per_fingerprint
+        )
+        return token
+
+    async def validate_token(self, token: str, fingerprint: str) -> bool:
+        """Validate a session token against a fingerprint"""
+        return await self.store.token_validate(token, fingerprint)
+
+    async def get_token_info(self, token: str) -> Optional[Dict]:
+        """Get information about a token"""
+        token_data = await self.store.token_get(token)
+        if token_data is None:
+            return None
+        token_data["is_expired"] = token_data["expires_at"] <= time.time()
+        return token_data
+
+    async def revoke_token(self, token: str) -> bool:
+        """Revoke a specific token"""
+        return await self.store.token_delete(token)
+
+    async def get_fingerprint_tokens(self, fingerprint: str) -> list:
+        """Get all valid tokens for a fingerprint"""
+        return await self.store.token_list(fingerprint)
+
+    async def get_stats(self) -> Dict:
+        """Get statistics about token usage"""
+        stats = await self.store.token_stats()
+        total_tokens = stats["total_active_tokens"]
+        total_requests = stats["total_requests_served"]
+        return {
+            "mode": f"stateful-{self.store.name}",
+            **stats,
+            "average_requests_per_token": round(total_requests / total_tokens, 2) if total_tokens > 0 else 0,
+            "token_lifetime_hours": self.token_lifetime_hours
+        }
+
+
+# Global session token manager (TOKEN_MODE=signed for stateless tokens)
+if os.getenv("TOKEN_MODE", "stateful").strip().lower() == "signed":
+    session_token_manager = SignedTokenManager(
+        _parse_signing_keys(os.getenv("TOKEN_SIGNING_KEYS", "")),
+        token_lifetime_hours=int(os.getenv("TOKEN_LIFETIME_HOURS", "24")),
+        max_revoked=int(os.getenv("TOKEN_REVOCATION_MAX", "100000")),
+    )
+else:
+    _token_store = None
+    if os.getenv("TOKEN_STORE", "memory").strip().lower() in ("sqlite", "redis"):
+        _token_store = make_state_store(os.getenv("TOKEN_STORE", "memory"))
+        if not hasattr(_token_store, "token_put"):
+            # make_state_store fell back to memory state, which cannot hold tokens
+            print("Token store unavailable; using the in-process token manager")
+            _token_store = None
+    if _token_store is not None:
+        session_token_manager = StoreTokenManager(
+            _token_store,
+            token_lifetime_hours=int(os.getenv("TOKEN_LIFETIME_HOURS", "24")),
+            max_tokens_per_fingerprint=int(os.getenv("MAX_TOKENS_PER_FINGERPRINT", "3"))
+        )
+    else:
+        session_token_manager = SessionTokenManager(
+            token_lifetime_hours=int(os.getenv("TOKEN_LIFETIME_HOURS", "24")),
+            max_tokens_per_fingerprint=int(os.getenv("MAX_TOKENS_PER_FINGERPRINT", "3")),
+            max_fingerprints=int(os.getenv("TOKEN_MAX_FINGERPRINTS", "100000"))
+        )
@@ -0,0 +1,96 @@
+"""
+Request coalescing (single-flight) for the Olexi Extension Host
+
+Concurrent callers asking for the same key share one upstream call; progress
+callbacks from that call are fanned out to every subscriber.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+ProgressCallback = Callable[[float, Optional[float], Optional[str]], Awaitable[None]]
+
+
+class _Flight:
+    __slots__ = ("task", "subscribers", "last_progress", "waiters")
+
+    def __init__(self) -> None:
+        self.task: Optional["asyncio.Task[Any]"] = None
+        self.waiters = 0
+        self.subscribers: List[ProgressCallback] = []
+        self.last_progress: Optional[Tuple[float, Optional[float], Optional[str]]] = None
+
+
+class SingleFlight:
+    def __init__(self) -> None:
+        self._flights: Dict[str, _Flight] = {}
+        self.flights_started = 0
+        self.coalesced_total = 0
+        self.abandoned_total = 0
+
+    async def run(
+        self,
+        key: str,
+        fn: Callable[[ProgressCallback], Awaitable[Any]],
+        on_progress: Optional[ProgressCallback] = None,
+    ) -> Any:
+        """Run fn(progress_callback) once per key, sharing its result with concurrent callers.
+
+        Late joiners are sent the most recent progress update straight away.
+        A caller being cancelled does not cancel the shared call for the others;
+        the call is cancelled once every caller waiting on it has been.
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight()
+            self._flights[key] = flight
+            self.flights_started += 1
+
+            async def _broadcast(progress: float, total: Optional[float], message: Optional[str]) -> None:
+                flight.last_progress = (progress, total, message)
+                for cb in list(flight.subscribers):
+                    try:
+                        await cb(progress, total, message)
+                    except Exception:
+                        continue
+
+            def _done(task: "asyncio.Task[Any]") -> None:
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+                # Mark the exception retrieved even if every subscriber went away
+                if not task.cancelled():
+                    task.exception()
+
+            flight.task = asyncio.create_task(fn(_broadcast))
+            flight.task.add_done_callback(_done)
+        else:
+            self.coalesced_total += 1
+            if on_progress is not None and flight.last_progress is not None:
+                await on_progress(*flight.last_progress)
+
+        if on_progress is not None:
+            flight.subscribers.append(on_progress)
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)  # type: ignore[arg-type]
+        except asyncio.CancelledError:
+            if flight.waiters == 1 and flight.task is not None and not flight.task.done():
+                # Nobody is left to use the result; new callers start afresh
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+                flight.task.cancel()
+                self.abandoned_total += 1
+            raise
+        finally:
+            flight.waiters -= 1
+            if on_progress is not None and on_progress in flight.subscribers:
+                flight.subscribers.remove(on_progress)
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get coalescing statistics"""
+        return {
+            "in_flight": len(self._flights),
+            "subscribers": sum(len(f.subscribers) for f in self._flights.values()),
+            "flights_started": self.flights_started,
+            "coalesced_total": self.coalesced_total,
+            "abandoned_total": self.abandoned_total,
+        }
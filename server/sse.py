@@ -0,0 +1,146 @@
+"""
+Server-sent event framing for research sessions
+
+- sse_event() serialises with orjson when installed (compact json.dumps otherwise)
+- ProgressChannel sits between MCP progress callbacks and the stream: it holds
+  only the latest event per stage and flushes at most once per interval, so a
+  chatty upstream cannot flood a slow client or grow an unbounded queue
+- with_keepalive() runs a session's event generator in one producer task behind
+  a bounded buffer and sends `: keep-alive` comments while it is quiet, so
+  proxies do not drop the connection during long searches or queue waits
+"""
+import os
+import json
+import time
+import asyncio
+from typing import Any, AsyncIterator, Dict, Optional
+
+from .metrics import PROGRESS_EVENTS
+
+try:
+    import orjson
+except Exception:  # pragma: no cover
+    orjson = None  # type: ignore
+
+KEEPALIVE_FRAME = ": keep-alive\n\n"
+
+
+def dumps(obj: Any) -> str:
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj).decode("utf-8")
+        except TypeError:
+            pass  # e.g. non-string keys or integers beyond 64 bits
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def sse_event(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {dumps(data)}\n\n"
+
+
+class ProgressChannel:
+    """Latest-value-per-stage progress buffer with interval coalescing.
+
+    publish() never blocks: an event replaces any unsent event of the same
+    stage (merge), and events for new stages beyond max_stages are dropped.
+    """
+
+    __slots__ = ("interval", "max_stages", "_pending", "_wakeup", "_closed", "_closed_event")
+
+    def __init__(self, interval: float = 0.25, max_stages: int = 8) -> None:
+        self.interval = interval
+        self.max_stages = max_stages
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._wakeup = asyncio.Event()
+        self._closed = False
+        self._closed_event = asyncio.Event()
+
+    def publish(self, event: Dict[str, Any]) -> None:
+        if self._closed:
+            return
+        stage = str(event.get("stage", ""))
+        if stage in self._pending:
+            PROGRESS_EVENTS.inc("merged")
+        elif len(self._pending) >= self.max_stages:
+            PROGRESS_EVENTS.inc("dropped")
+            return
+        self._pending[stage] = event
+        self._wakeup.set()
+
+    def close(self) -> None:
+        """No more events; pending ones are still flushed"""
+        self._closed = True
+        self._closed_event.set()
+        self._wakeup.set()
+
+    async def __aiter__(self) -> AsyncIterator[Dict[str, Any]]:
+        last_flush = float("-inf")
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            delay = last_flush + self.interval - time.monotonic()
+            if delay > 0 and not self._closed:
+                # Let more updates merge, but flush at once if the search finishes
+                try:
+                    await asyncio.wait_for(self._closed_event.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+            pending, self._pending = self._pending, {}
+            for event in pending.values():
+                PROGRESS_EVENTS.inc("sent")
+                yield event
+            last_flush = time.monotonic()
+            if self._closed and not self._pending:
+                return
+
+
+async def with_keepalive(frames: AsyncIterator[str], interval: float = 15.0, max_buffered: int = 64) -> AsyncIterator[str]:
+    """Relay frames from a producer task, adding keep-alive comments after `interval` idle seconds.
+
+    The producer runs in a single task, so context variables set inside it
+    persist between frames; it blocks once max_buffered frames are waiting for
+    a slow client. Closing this generator (client gone) cancels the producer.
+    """
+    buffer: "asyncio.Queue[Optional[str]]" = asyncio.Queue(max(1, max_buffered))
+    failure: Dict[str, BaseException] = {}
+
+    async def produce() -> None:
+        try:
+            async for frame in frames:
+                await buffer.put(frame)
+        except Exception as e:
+            failure["error"] = e
+        finally:
+            aclose = getattr(frames, "aclose", None)
+            if aclose is not None:
+                await aclose()
+        await buffer.put(None)
+
+    producer = asyncio.create_task(produce())
+    try:
+        while True:
+            if not buffer.empty():
+                frame = buffer.get_nowait()
+            else:
+                try:
+                    frame = await asyncio.wait_for(buffer.get(), interval) if interval > 0 else await buffer.get()
+                except asyncio.TimeoutError:
+                    yield KEEPALIVE_FRAME
+                    continue
+            if frame is None:
+                break
+            yield frame
+        if "error" in failure:
+            raise failure["error"]
+    finally:
+        if not producer.done():
+            producer.cancel()
+            try:
+                await producer
+            except BaseException:
+                pass
+
+
+PROGRESS_INTERVAL_SECONDS = float(os.getenv("SSE_PROGRESS_INTERVAL_SECONDS", "0.25"))
+KEEPALIVE_SECONDS = float(os.getenv("SSE_KEEPALIVE_SECONDS", "15"))
+MAX_BUFFERED_FRAMES = int(os.getenv("SSE_MAX_BUFFERED_FRAMES", "64"))
@@ -0,0 +1,449 @@
+"""
+Shared-state backends for rate limiting and session tokens
+
+The in-memory store keeps per-process sliding-window counters. The SQLite store (WAL
+mode) shares state between processes on one host or volume, and the Redis
+store shares it across Cloud Run instances. Every check is a single atomic
+round-trip: one transaction for SQLite, one Lua script for Redis. The shared
+stores count fixed calendar windows.
+
+Select with RATE_LIMIT_STORE / TOKEN_STORE = memory | sqlite | redis
+(STATE_SQLITE_PATH, STATE_REDIS_URL).
+"""
+import os
+import sys
+import time
+import sqlite3
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import redis.asyncio as aioredis  # type: ignore
+except Exception:  # pragma: no cover
+    aioredis = None  # type: ignore
+
+# (window name, fixed-window key, limit, window length in seconds), e.g. ("day", "2025-09-01", 50, 86400)
+Window = Tuple[str, str, int, int]
+
+# Shared stores keep fixed-window counters a little past the window length
+_COUNTER_TTL_GRACE = 3600
+
+
+class _RateRecord:
+    """Sliding-window counters for one fingerprint (one slot per window)."""
+
+    __slots__ = ("starts", "current", "previous", "last_seen")
+
+    def __init__(self, n_windows: int) -> None:
+        self.starts = [0.0] * n_windows
+        self.current = [0] * n_windows
+        self.previous = [0] * n_windows
+        self.last_seen = 0.0
+
+
+def _estimate(record: _RateRecord, i: int, seconds: int, now: float) -> float:
+    """Roll window i forward to `now` and return the sliding-window estimate.
+
+    The previous window's count is weighted by how much of it still overlaps
+    the last `seconds`, so a client cannot double up across a boundary.
+    """
+    start = now - now % seconds
+    if record.starts[i] != start:
+        record.previous[i] = record.current[i] if start - record.starts[i] == seconds else 0
+        record.current[i] = 0
+        record.starts[i] = start
+    return record.previous[i] * (1.0 - (now - start) / seconds) + record.current[i]
+
+
+class MemoryStateStore:
+    """Per-process sliding-window counters. Token state stays in SessionTokenManager.
+
+    Updates never await, so on the event loop they are atomic without a lock;
+    striped locks only guard against callers in worker threads. Idle
+    fingerprints are evicted by a background sweep (start()/close()), and at
+    most max_fingerprints are kept, dropping the least recently seen first.
+    """
+
+    name = "memory"
+
+    def __init__(self, stripes: int = 64, sweep_interval: float = 300.0, max_fingerprints: int = 100000) -> None:
+        self.records: "OrderedDict[str, _RateRecord]" = OrderedDict()  # LRU order
+        self.max_fingerprints = max(1, max_fingerprints)
+        self.capacity_evictions_total = 0
+        self._stripes = [threading.Lock() for _ in range(max(1, stripes))]
+        self.sweep_interval = sweep_interval
+        self.evicted_total = 0
+        self._idle_after = 0
+        self._sweep_task: Optional["asyncio.Task[None]"] = None
+
+    def _lock_for(self, fingerprint: str) -> threading.Lock:
+        return self._stripes[hash(fingerprint) % len(self._stripes)]
+
+    async def check_and_increment(self, fingerprint: str, windows: List[Window]) -> Optional[int]:
+        """Count the request in every window if all are under their limit.
+
+        Returns the index of the first window at its limit (nothing is
+        counted), or None when the request was counted.
+        """
+        now = time.time()
+        with self._stripes[hash(fingerprint) % len(self._stripes)]:
+            record = self.records.get(fingerprint)
+            if record is None:
+                while len(self.records) >= self.max_fingerprints:
+                    self.records.popitem(last=False)
+                    self.capacity_evictions_total += 1
+                record = self.records[fingerprint] = _RateRecord(len(windows))
+            else:
+                self.records.move_to_end(fingerprint)
+            i = 0
+            for _name, _key, limit, seconds in windows:
+                if _estimate(record, i, seconds, now) >= limit:
+                    return i
+                if seconds > self._idle_after:
+                    self._idle_after = seconds
+                i += 1
+            current = record.current
+            for i in range(len(windows)):
+                current[i] += 1
+            record.last_seen = now
+            return None
+
+    async def get_counts(self, fingerprint: str, windows: List[Window]) -> List[int]:
+        record = self.records.get(fingerprint)
+        if record is None:
+            return [0] * len(windows)
+        now = time.time()
+        with self._lock_for(fingerprint):
+            return [int(round(_estimate(record, i, w[3], now))) for i, w in enumerate(windows)]
+
+    async def active_fingerprints(self) -> int:
+        return len(self.records)
+
+    def approx_memory_bytes(self) -> int:
+        """Rough size of the counter map, extrapolated from one sampled record"""
+        size = sys.getsizeof(self.records)
+        for fingerprint, record in self.records.items():
+            per_record = sys.getsizeof(fingerprint) + sys.getsizeof(record) + sum(
+                sys.getsizeof(getattr(record, slot)) for slot in ("starts", "current", "previous")
+            )
+            size += per_record * len(self.records)
+            break
+        return size
+
+    def evict_idle(self, now: Optional[float] = None) -> int:
+        """Drop fingerprints whose counters have all aged out of every window."""
+        cutoff = (now or time.time()) - 2 * self._idle_after
+        evicted = 0
+        for fingerprint, record in list(self.records.items()):
+            if record.last_seen < cutoff:
+                with self._lock_for(fingerprint):
+                    if record.last_seen < cutoff and self.records.get(fingerprint) is record:
+                        del self.records[fingerprint]
+                        evicted += 1
+        self.evicted_total += evicted
+        return evicted
+
+    async def _sweep_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                self.evict_idle()
+            except Exception as e:
+                print(f"Rate limiter sweep error: {e}")
+
+    async def start(self) -> None:
+        if self._sweep_task is None or self._sweep_task.done():
+            self._sweep_task = asyncio.create_task(self._sweep_loop())
+
+    async def close(self) -> None:
+        if self._sweep_task is not None:
+            self._sweep_task.cancel()
+            self._sweep_task = None
+
+
+class SqliteStateStore:
+    """Counters and tokens in a local SQLite database in WAL mode.
+
+    Each operation is one IMMEDIATE transaction run in a worker thread.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS rate_counters ("
+            " fingerprint TEXT NOT NULL, window TEXT NOT NULL, window_key TEXT NOT NULL,"
+            " count INTEGER NOT NULL, expires_at REAL NOT NULL, PRIMARY KEY (fingerprint, window));"
+            "CREATE INDEX IF NOT EXISTS rate_counters_expiry ON rate_counters (expires_at);"
+            "CREATE TABLE IF NOT EXISTS session_tokens ("
+            " token TEXT PRIMARY KEY, fingerprint TEXT NOT NULL, created_at REAL NOT NULL,"
+            " expires_at REAL NOT NULL, last_used REAL NOT NULL, request_count INTEGER NOT NULL DEFAULT 0);"
+            "CREATE INDEX IF NOT EXISTS session_tokens_fp ON session_tokens (fingerprint, created_at);"
+            "CREATE INDEX IF NOT EXISTS session_tokens_expiry ON session_tokens (expires_at);"
+        )
+
+    def _transaction(self, fn, *args):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(*args)
+                self._conn.execute("COMMIT")
+                return result
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    async def _run(self, fn, *args):
+        return await asyncio.to_thread(self._transaction, fn, *args)
+
+    # Rate limiting
+
+    def _check_and_increment(self, fingerprint: str, windows: List[Window]) -> Optional[int]:
+        now = time.time()
+        rows = dict(
+            ((w, (k, c)) for w, k, c in self._conn.execute(
+                "SELECT window, window_key, count FROM rate_counters WHERE fingerprint = ? AND expires_at > ?",
+                (fingerprint, now),
+            ))
+        )
+        counts = []
+        for i, (name, key, limit, _seconds) in enumerate(windows):
+            stored = rows.get(name)
+            count = stored[1] if stored is not None and stored[0] == key else 0
+            if count >= limit:
+                return i
+            counts.append(count)
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO rate_counters (fingerprint, window, window_key, count, expires_at) VALUES (?, ?, ?, ?, ?)",
+            [(fingerprint, name, key, count + 1, now + seconds + _COUNTER_TTL_GRACE)
+             for (name, key, _limit, seconds), count in zip(windows, counts)],
+        )
+        return None
+
+    async def check_and_increment(self, fingerprint: str, windows: List[Window]) -> Optional[int]:
+        return await self._run(self._check_and_increment, fingerprint, windows)
+
+    def _get_counts(self, fingerprint: str, windows: List[Window]) -> List[int]:
+        rows = dict(
+            ((w, (k, c)) for w, k, c in self._conn.execute(
+                "SELECT window, window_key, count FROM rate_counters WHERE fingerprint = ? AND expires_at > ?",
+                (fingerprint, time.time()),
+            ))
+        )
+        return [rows[name][1] if name in rows and rows[name][0] == key else 0 for name, key, _limit, _seconds in windows]
+
+    async def get_counts(self, fingerprint: str, windows: List[Window]) -> List[int]:
+        return await self._run(self._get_counts, fingerprint, windows)
+
+    def _active_fingerprints(self) -> int:
+        now = time.time()
+        self._conn.execute("DELETE FROM rate_counters WHERE expires_at <= ?", (now,))
+        return self._conn.execute("SELECT COUNT(DISTINCT fingerprint) FROM rate_counters").fetchone()[0]
+
+    async def active_fingerprints(self) -> int:
+        return await self._run(self._active_fingerprints)
+
+    # Session tokens
+
+    def _token_put(self, token: str, fingerprint: str, created_at: float, expires_at: float, max_per_fingerprint: int) -> None:
+        self._conn.execute("DELETE FROM session_tokens WHERE expires_at <= ?", (created_at,))
+        # Keep at most max_per_fingerprint tokens, dropping the oldest
+        self._conn.execute(
+            "DELETE FROM session_tokens WHERE token IN ("
+            " SELECT token FROM session_tokens WHERE fingerprint = ? ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+            (fingerprint, max(0, max_per_fingerprint - 1)),
+        )
+        self._conn.execute(
+            "INSERT INTO session_tokens (token, fingerprint, created_at, expires_at, last_used) VALUES (?, ?, ?, ?, ?)",
+            (token, fingerprint, created_at, expires_at, created_at),
+        )
+
+    async def token_put(self, token: str, fingerprint: str, created_at: float, expires_at: float, max_per_fingerprint: int) -> None:
+        await self._run(self._token_put, token, fingerprint, created_at, expires_at, max_per_fingerprint)
+
+    def _token_validate(self, token: str, fingerprint: str, now: float) -> bool:
+        cur = self._conn.execute(
+            "UPDATE session_tokens SET last_used = ?, request_count = request_count + 1"
+            " WHERE token = ? AND fingerprint = ? AND expires_at > ?",
+            (now, token, fingerprint, now),
+        )
+        return cur.rowcount == 1
+
+    async def token_validate(self, token: str, fingerprint: str) -> bool:
+        return await self._run(self._token_validate, token, fingerprint, time.time())
+
+    def _token_get(self, token: str) -> Optional[Dict]:
+        row = self._conn.execute(
+            "SELECT fingerprint, created_at, expires_at, last_used, request_count FROM session_tokens"
+            " WHERE token = ? AND expires_at > ?",
+            (token, time.time()),
+        ).fetchone()
+        if row is None:
+            return None
+        return {"fingerprint": row[0], "created_at": row[1], "expires_at": row[2], "last_used": row[3], "request_count": row[4]}
+
+    async def token_get(self, token: str) -> Optional[Dict]:
+        return await self._run(self._token_get, token)
+
+    def _token_delete(self, token: str) -> bool:
+        return self._conn.execute("DELETE FROM session_tokens WHERE token = ?", (token,)).rowcount == 1
+
+    async def token_delete(self, token: str) -> bool:
+        return await self._run(self._token_delete, token)
+
+    def _token_list(self, fingerprint: str) -> List[str]:
+        return [r[0] for r in self._conn.execute(
+            "SELECT token FROM session_tokens WHERE fingerprint = ? AND expires_at > ?", (fingerprint, time.time())
+        )]
+
+    async def token_list(self, fingerprint: str) -> List[str]:
+        return await self._run(self._token_list, fingerprint)
+
+    def _token_stats(self) -> Dict:
+        row = self._conn.execute(
+            "SELECT COUNT(*), COUNT(DISTINCT fingerprint), COALESCE(SUM(request_count), 0) FROM session_tokens WHERE expires_at > ?",
+            (time.time(),),
+        ).fetchone()
+        return {"total_active_tokens": row[0], "total_fingerprints": row[1], "total_requests_served": row[2]}
+
+    async def token_stats(self) -> Dict:
+        return await self._run(self._token_stats)
+
+
+# Lua scripts make each Redis operation a single atomic round-trip
+_RATE_LUA = """
+for i = 1, #KEYS do
+  local c = tonumber(redis.call('GET', KEYS[i]) or '0')
+  if c >= tonumber(ARGV[2 * i - 1]) then return i end
+end
+for i = 1, #KEYS do
+  redis.call('INCR', KEYS[i])
+  redis.call('EXPIRE', KEYS[i], ARGV[2 * i])
+end
+return 0
+"""
+
+_TOKEN_PUT_LUA = """
+local fpkey, tokkey = KEYS[1], KEYS[2]
+local created, expires, maxn, prefix = tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4]), ARGV[5]
+redis.call('ZREMRANGEBYSCORE', fpkey, '-inf', '(' .. created)
+while redis.call('ZCARD', fpkey) >= maxn do
+  local oldest = redis.call('ZPOPMIN', fpkey)
+  redis.call('DEL', prefix .. oldest[1])
+end
+redis.call('HSET', tokkey, 'fingerprint', ARGV[1], 'created_at', created, 'expires_at', expires, 'last_used', created, 'request_count', 0)
+redis.call('EXPIREAT', tokkey, math.ceil(expires))
+redis.call('ZADD', fpkey, expires, ARGV[6])
+redis.call('EXPIREAT', fpkey, math.ceil(expires))
+return 1
+"""
+
+_TOKEN_VALIDATE_LUA = """
+if redis.call('HGET', KEYS[1], 'fingerprint') ~= ARGV[1] then return 0 end
+redis.call('HINCRBY', KEYS[1], 'request_count', 1)
+redis.call('HSET', KEYS[1], 'last_used', ARGV[2])
+return 1
+"""
+
+_TOKEN_DELETE_LUA = """
+local fp = redis.call('HGET', KEYS[1], 'fingerprint')
+if not fp then return 0 end
+redis.call('DEL', KEYS[1])
+redis.call('ZREM', ARGV[1] .. fp, ARGV[2])
+return 1
+"""
+
+
+class RedisStateStore:
+    """Counters and tokens in any Redis-protocol server (Redis, Valkey, Memorystore).
+
+    Counter and token keys carry server-side TTLs, so nothing needs sweeping.
+    """
+
+    name = "redis"
+
+    def __init__(self, url: str, prefix: str = "olexi") -> None:
+        if aioredis is None:
+            raise RuntimeError("Redis state store requires the 'redis' package")
+        self.client = aioredis.Redis.from_url(url, decode_responses=True)
+        self.prefix = prefix
+        self._rate = self.client.register_script(_RATE_LUA)
+        self._token_put_script = self.client.register_script(_TOKEN_PUT_LUA)
+        self._token_validate_script = self.client.register_script(_TOKEN_VALIDATE_LUA)
+        self._token_delete_script = self.client.register_script(_TOKEN_DELETE_LUA)
+
+    def _counter_key(self, fingerprint: str, name: str, key: str) -> str:
+        return f"{self.prefix}:rl:{fingerprint}:{name}:{key}"
+
+    def _token_key(self, token: str) -> str:
+        return f"{self.prefix}:tok:{token}"
+
+    def _fp_key(self, fingerprint: str) -> str:
+        return f"{self.prefix}:fptok:{fingerprint}"
+
+    async def check_and_increment(self, fingerprint: str, windows: List[Window]) -> Optional[int]:
+        keys = [self._counter_key(fingerprint, name, key) for name, key, _limit, _seconds in windows]
+        args: List[int] = []
+        for _name, _key, limit, seconds in windows:
+            args.extend([limit, seconds + _COUNTER_TTL_GRACE])
+        exceeded = int(await self._rate(keys=keys, args=args))
+        return exceeded - 1 if exceeded else None
+
+    async def get_counts(self, fingerprint: str, windows: List[Window]) -> List[int]:
+        values = await self.client.mget([self._counter_key(fingerprint, name, key) for name, key, _limit, _seconds in windows])
+        return [int(v or 0) for v in values]
+
+    async def active_fingerprints(self) -> int:
+        # Counting would need a keyspace scan; not tracked for Redis
+        return -1
+
+    async def token_put(self, token: str, fingerprint: str, created_at: float, expires_at: float, max_per_fingerprint: int) -> None:
+        await self._token_put_script(
+            keys=[self._fp_key(fingerprint), self._token_key(token)],
+            args=[fingerprint, created_at, expires_at, max(1, max_per_fingerprint), f"{self.prefix}:tok:", token],
+        )
+
+    async def token_validate(self, token: str, fingerprint: str) -> bool:
+        return bool(int(await self._token_validate_script(keys=[self._token_key(token)], args=[fingerprint, time.time()])))
+
+    async def token_get(self, token: str) -> Optional[Dict]:
+        data = await self.client.hgetall(self._token_key(token))
+        if not data:
+            return None
+        return {
+            "fingerprint": data.get("fingerprint", ""),
+            "created_at": float(data.get("created_at", 0)),
+            "expires_at": float(data.get("expires_at", 0)),
+            "last_used": float(data.get("last_used", 0)),
+            "request_count": int(data.get("request_count", 0)),
+        }
+
+    async def token_delete(self, token: str) -> bool:
+        return bool(int(await self._token_delete_script(keys=[self._token_key(token)], args=[f"{self.prefix}:fptok:", token])))
+
+    async def token_list(self, fingerprint: str) -> List[str]:
+        return list(await self.client.zrangebyscore(self._fp_key(fingerprint), f"({time.time()}", "+inf"))
+
+    async def token_stats(self) -> Dict:
+        # Exact totals would need a keyspace scan; report what is cheap
+        return {"total_active_tokens": -1, "total_fingerprints": -1, "total_requests_served": -1}
+
+
+def make_state_store(kind: str):
+    """Build a state store by name; falls back to memory if the backend cannot start."""
+    kind = (kind or "memory").strip().lower()
+    try:
+        if kind == "sqlite":
+            return SqliteStateStore(os.getenv("STATE_SQLITE_PATH", "/tmp/olexi-state.sqlite3"))
+        if kind == "redis":
+            return RedisStateStore(os.getenv("STATE_REDIS_URL", "redis://127.0.0.1:6379/0"))
+    except Exception as e:
+        print(f"State store '{kind}' unavailable ({e}); using in-memory state")
+    return MemoryStateStore(max_fingerprints=int(os.getenv("RATE_LIMIT_MAX_FINGERPRINTS", "100000")))
@@ -0,0 +1,155 @@
+"""
+Lightweight OpenTelemetry-style tracing for research sessions
+
+Spans follow the OpenTelemetry data model (128-bit trace id, 64-bit span id,
+parent span, attributes, events, status) and propagate over HTTP as a W3C
+`traceparent` header, so an MCP server with OpenTelemetry instrumentation
+joins the same trace. Finished spans are written as JSON lines to stdout or a
+file, which works offline with no collector.
+
+TRACE_EXPORTER=none (default) | stdout | file, TRACE_FILE, TRACE_SAMPLE_RATIO.
+"""
+import os
+import re
+import sys
+import json
+import time
+import asyncio
+import random
+import secrets
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional, TextIO
+
+_TRACEPARENT_RE = re.compile(r"00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})")
+
+
+class Span:
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "sampled", "start_ns", "end_ns", "attributes", "events", "status")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], sampled: bool, attributes: Dict[str, Any]) -> None:
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.sampled = sampled
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes = attributes
+        self.events: list = []
+        self.status = "OK"
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def add_event(self, name: str, **attributes: Any) -> None:
+        if self.sampled:
+            self.events.append({"name": name, "time_unix_nano": time.time_ns(), "attributes": attributes})
+
+    def record_exception(self, exc: BaseException) -> None:
+        self.status = "ERROR"
+        self.attributes["exception.type"] = type(exc).__name__
+        self.attributes["exception.message"] = str(exc)[:500]
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_id,
+            "name": self.name,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.end_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+            "events": self.events,
+        }
+
+
+class Tracer:
+    def __init__(self, exporter: str = "none", path: Optional[str] = None, sample_ratio: float = 1.0, service: str = "olexi-extension-host") -> None:
+        self.exporter = exporter
+        self.sample_ratio = sample_ratio
+        self.service = service
+        self.enabled = exporter in ("stdout", "file")
+        self._out: Optional[TextIO] = None
+        self._lock = threading.Lock()
+        if exporter == "stdout":
+            self._out = sys.stdout
+        elif exporter == "file":
+            try:
+                self._out = open(path or "/tmp/olexi-traces.jsonl", "a", buffering=1, encoding="utf-8")
+            except OSError as e:
+                print(f"Tracing: cannot open trace file ({e}); tracing disabled")
+                self.enabled = False
+        self.spans_exported = 0
+        self._current: ContextVar[Optional[Span]] = ContextVar("olexi_current_span", default=None)
+
+    def current_span(self) -> Optional[Span]:
+        return self._current.get()
+
+    def start_span(self, name: str, parent: Optional[Span] = None, traceparent: Optional[str] = None, **attributes: Any) -> Span:
+        """Start a span under `parent`, an incoming traceparent header, or the current span."""
+        if parent is None and traceparent:
+            m = _TRACEPARENT_RE.fullmatch(traceparent.strip())
+            if m:
+                return Span(name, m.group(1), m.group(2), m.group(3) == "01" and self.enabled, attributes)
+        if parent is None:
+            parent = self._current.get()
+        if parent is not None:
+            return Span(name, parent.trace_id, parent.span_id, parent.sampled, attributes)
+        sampled = self.enabled and random.random() < self.sample_ratio
+        return Span(name, secrets.token_hex(16), None, sampled, attributes)
+
+    def end_span(self, span: Span) -> None:
+        span.end_ns = time.time_ns()
+        if span.sampled and self._out is not None:
+            record = span.to_dict()
+            record["service"] = self.service
+            line = json.dumps(record, default=str)
+            with self._lock:
+                self._out.write(line + "\n")
+                self.spans_exported += 1
+
+    @contextmanager
+    def span(self, name: str, parent: Optional[Span] = None, traceparent: Optional[str] = None, **attributes: Any) -> Iterator[Span]:
+        """Run the block inside a new span, made current for the block.
+
+        Safe across `yield` in async generators: the previous span is restored
+        by value rather than with a context token.
+        """
+        span = self.start_span(name, parent=parent, traceparent=traceparent, **attributes)
+        previous = self._current.get()
+        self._current.set(span)
+        try:
+            yield span
+        except (GeneratorExit, asyncio.CancelledError):
+            # Client went away or the caller stopped consuming: not an error
+            span.set_attribute("cancelled", True)
+            raise
+        except BaseException as e:
+            span.record_exception(e)
+            raise
+        finally:
+            self._current.set(previous)
+            self.end_span(span)
+
+    def headers(self) -> Dict[str, str]:
+        """W3C trace-context headers for the current span (empty outside a span)"""
+        span = self._current.get()
+        return {"traceparent": span.traceparent} if span is not None else {}
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"exporter": self.exporter, "enabled": self.enabled, "sample_ratio": self.sample_ratio, "spans_exported": self.spans_exported}
+
+
+TRACER = Tracer(
+    exporter=os.getenv("TRACE_EXPORTER", "none").strip().lower(),
+    path=os.getenv("TRACE_FILE", "/tmp/olexi-traces.jsonl"),
+    sample_ratio=float(os.getenv("TRACE_SAMPLE_RATIO", "1.0")),
+)
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Compare planner prompt size (and optionally Gemini latency) for the legacy
+pretty-printed catalogue, the compact catalogue, and the prefiltered subset.
+
+Usage:
+  python3 tools/bench_planner_prompt.py            # token estimates + prompt build time
+  python3 tools/bench_planner_prompt.py --live 3   # also time 3 real planning calls per variant
+
+Token counts come from the Gemini count_tokens API when HOST_GOOGLE_API_KEY or
+GOOGLE_API_KEY is set, otherwise they are estimated as characters / 4.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from server.catalogue import catalogue_text, narrow_catalogue  # noqa: E402
+from server.database_map import DATABASE_TOOLS_LIST  # noqa: E402
+from server.host_agent import HOST_AI  # noqa: E402
+
+PROMPTS = [
+    "recent HCA cases on unconscionable conduct",
+    "NSW Court of Appeal negligence duty of care 2022",
+    "VCAT tenancy bond disputes",
+    "Full Federal Court migration character test s 501",
+    "contract damages remoteness",
+]
+
+
+def _variants(prompt: str) -> Dict[str, Dict[str, Any]]:
+    compact = HOST_AI._plan_request(prompt, DATABASE_TOOLS_LIST, 5)
+    contents = compact["contents"]
+    marker = "Available databases"
+    head = contents[: contents.index(marker)]
+    tail = contents[contents.index("\n\nUser Request:"):]
+    legacy = dict(compact, contents=f"{head}Available databases (code, name, description):\n{json.dumps(DATABASE_TOOLS_LIST, indent=2)}\n{tail}")
+    full_compact = dict(compact, contents=f"{head}Available databases (code | name (coverage from) | use for):\n{catalogue_text(DATABASE_TOOLS_LIST)}\n{tail}")
+    return {"legacy_json": legacy, "compact": full_compact, "compact_prefiltered": compact}
+
+
+def _count_tokens(contents: str) -> int:
+    if HOST_AI.available and HOST_AI.client is not None:
+        try:
+            resp = HOST_AI.client.models.count_tokens(model="gemini-2.5-flash", contents=contents)
+            return int(resp.total_tokens or 0)
+        except Exception:
+            pass
+    return len(contents) // 4
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--live", type=int, default=0, help="Timed Gemini planning calls per prompt and variant")
+    args = parser.parse_args()
+    if args.live and not HOST_AI.available:
+        print("--live needs HOST_GOOGLE_API_KEY or GOOGLE_API_KEY", file=sys.stderr)
+        return 2
+
+    build_runs = 2000
+    started = time.perf_counter()
+    for _ in range(build_runs):
+        HOST_AI._plan_request(PROMPTS[0], DATABASE_TOOLS_LIST, 5)
+    print(f"prompt build: {(time.perf_counter() - started) * 1e6 / build_runs:.1f} us/call (compact + prefilter)")
+    started = time.perf_counter()
+    for _ in range(build_runs):
+        json.dumps(DATABASE_TOOLS_LIST, indent=2)
+    print(f"legacy json.dumps(indent=2): {(time.perf_counter() - started) * 1e6 / build_runs:.1f} us/call\n")
+
+    latencies: Dict[str, List[float]] = {}
+    print(f"{'prompt':<52} {'legacy':>8} {'compact':>8} {'filtered':>9} {'dbs':>4}")
+    for prompt in PROMPTS:
+        variants = _variants(prompt)
+        counts = [_count_tokens(v["contents"]) for v in variants.values()]
+        n_dbs = len(narrow_catalogue(prompt, DATABASE_TOOLS_LIST))
+        print(f"{prompt[:52]:<52} {counts[0]:>8} {counts[1]:>8} {counts[2]:>9} {n_dbs:>4}")
+        for name, kwargs in variants.items():
+            for _ in range(args.live):
+                t = time.perf_counter()
+                HOST_AI.client.models.generate_content(**kwargs)  # type: ignore[union-attr]
+                latencies.setdefault(name, []).append(time.perf_counter() - t)
+
+    if latencies:
+        print("\nplanning latency (s): median / max")
+        for name, values in latencies.items():
+            print(f"  {name:<20} {statistics.median(values):.2f} / {max(values):.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
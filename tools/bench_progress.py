@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Progress relay cost with a chatty MCP upstream: unbounded queue vs ProgressChannel.
+
+Usage:
+  python3 tools/bench_progress.py [--sessions 50] [--events 2000] [--duration 1.0] [--interval 0.25]
+
+Each session receives --events progress callbacks spread over --duration
+seconds and relays them as SSE frames. "legacy" is the previous relay (one
+json.dumps frame per callback through an unbounded asyncio.Queue, sleep(0)
+after each); "channel" is server.sse.ProgressChannel + sse_event. Reports
+frames and bytes per session and CPU time for all sessions.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from server.sse import ProgressChannel, sse_event  # noqa: E402
+
+
+async def _upstream(publish: Callable[[float, str], Awaitable[None]], events: int, duration: float) -> None:
+    # Bursts of callbacks, as a server reporting per-page progress does
+    per_tick = max(1, events // 100)
+    sent = 0
+    while sent < events:
+        for _ in range(min(per_tick, events - sent)):
+            sent += 1
+            await publish(sent * 100 / events, f"Fetched page {sent}")
+        await asyncio.sleep(duration / 100)
+
+
+async def _legacy(events: int, duration: float, interval: float) -> Tuple[int, int]:
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def on_progress(pct: float, message: str) -> None:
+        evt = {"stage": "search", "pct": pct, "message": message, "cached": False}
+        await queue.put(f"event: progress\ndata: {json.dumps(evt)}\n\n")
+
+    async def run() -> None:
+        try:
+            await _upstream(on_progress, events, duration)
+        finally:
+            await queue.put("__DONE__")
+
+    task = asyncio.create_task(run())
+    frames = size = 0
+    while True:
+        msg = await queue.get()
+        if msg == "__DONE__":
+            break
+        await asyncio.sleep(0)
+        frames += 1
+        size += len(msg.encode())
+    await task
+    return frames, size
+
+
+async def _channel(events: int, duration: float, interval: float) -> Tuple[int, int]:
+    channel = ProgressChannel(interval=interval)
+
+    async def on_progress(pct: float, message: str) -> None:
+        channel.publish({"stage": "search", "pct": pct, "message": message, "cached": False})
+
+    async def run() -> None:
+        try:
+            await _upstream(on_progress, events, duration)
+        finally:
+            channel.close()
+
+    task = asyncio.create_task(run())
+    frames = size = 0
+    async for evt in channel:
+        frames += 1
+        size += len(sse_event("progress", evt).encode())
+    await task
+    return frames, size
+
+
+async def _run(relay, args: argparse.Namespace) -> Tuple[float, float, int, int]:
+    cpu, wall = time.process_time(), time.perf_counter()
+    results = await asyncio.gather(*(relay(args.events, args.duration, args.interval) for _ in range(args.sessions)))
+    cpu, wall = time.process_time() - cpu, time.perf_counter() - wall
+    return cpu, wall, results[0][0], results[0][1]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--events", type=int, default=2000, help="Progress callbacks per session")
+    parser.add_argument("--duration", type=float, default=1.0, help="Seconds the callbacks are spread over")
+    parser.add_argument("--interval", type=float, default=0.25, help="ProgressChannel flush interval")
+    args = parser.parse_args()
+
+    print(f"{args.sessions} sessions x {args.events} progress callbacks over {args.duration}s")
+    for name, relay in (("legacy", _legacy), ("channel", _channel)):
+        cpu, wall, frames, size = asyncio.run(_run(relay, args))
+        print(f"{name:<8} {frames:6d} frames/session {size / 1024:8.1f} KiB/session  cpu {cpu * 1000:8.1f} ms  wall {wall:5.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
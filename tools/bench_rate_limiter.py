@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Contention benchmark: global-lock fixed-window limiter vs sliding-window store.
+
+Usage:
+  python3 tools/bench_rate_limiter.py [--ops 100000] [--fingerprints 10000] [--threads 4]
+
+"legacy" reproduces the previous RateLimiter (one asyncio.Lock, strftime keys,
+per-request dict rebuilds). "sliding" is RateLimiter over MemoryStateStore.
+Each row drives --ops checks from N concurrent tasks; the threaded row runs
+one event loop per thread against the shared store. Also prints how many
+requests each engine admits across an hour boundary for one fingerprint.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import secrets
+import sys
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List
+from unittest import mock
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from fastapi import HTTPException  # noqa: E402
+
+from server.rate_limiter import RateLimiter  # noqa: E402
+from server.state_store import MemoryStateStore  # noqa: E402
+
+
+class LegacyRateLimiter:
+    """The previous implementation, kept here only for comparison."""
+
+    def __init__(self, requests_per_day: int, requests_per_hour: int) -> None:
+        self.requests_per_day = requests_per_day
+        self.requests_per_hour = requests_per_hour
+        self.daily_counts: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self.hourly_counts: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self.lock = asyncio.Lock()
+
+    async def check_and_increment(self, fingerprint: str) -> None:
+        async with self.lock:
+            date_key = time.strftime("%Y-%m-%d")
+            hour_key = time.strftime("%Y-%m-%d-%H")
+            if fingerprint in self.daily_counts:
+                self.daily_counts[fingerprint] = {k: v for k, v in self.daily_counts[fingerprint].items() if k == date_key}
+            if fingerprint in self.hourly_counts:
+                self.hourly_counts[fingerprint] = {k: v for k, v in self.hourly_counts[fingerprint].items() if k == hour_key}
+            daily_count = self.daily_counts[fingerprint].get(date_key, 0)
+            if daily_count >= self.requests_per_day:
+                raise HTTPException(status_code=429, detail="Daily limit exceeded.")
+            hourly_count = self.hourly_counts[fingerprint].get(hour_key, 0)
+            if hourly_count >= self.requests_per_hour:
+                raise HTTPException(status_code=429, detail="Hourly limit exceeded.")
+            self.daily_counts[fingerprint][date_key] = daily_count + 1
+            self.hourly_counts[fingerprint][hour_key] = hourly_count + 1
+
+
+async def _drive(limiter, fingerprints: List[str], n_ops: int, concurrency: int) -> float:
+    counter = iter(range(n_ops))
+
+    async def worker() -> None:
+        for i in counter:
+            await limiter.check_and_increment(fingerprints[i % len(fingerprints)])
+            if i % 64 == 0:
+                await asyncio.sleep(0)  # let other tasks interleave, as real requests would
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return n_ops / (time.perf_counter() - started)
+
+
+def _threaded(limiter: RateLimiter, fingerprints: List[str], n_ops: int, threads: int) -> float:
+    per_thread = n_ops // threads
+    started = time.perf_counter()
+    workers = [
+        threading.Thread(target=lambda: asyncio.run(_drive(limiter, fingerprints, per_thread, 50)))
+        for _ in range(threads)
+    ]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    return per_thread * threads / (time.perf_counter() - started)
+
+
+async def _boundary_burst(limiter) -> int:
+    """Requests admitted in the last minute of one hour plus the first of the next."""
+    admitted = 0
+    strftime = time.strftime
+    hour = 3600 * 500_000
+    for t in (hour - 30, hour + 30):
+        with mock.patch("time.time", return_value=float(t)), \
+                mock.patch("time.strftime", side_effect=lambda fmt, *_a: strftime(fmt, time.gmtime(t))):
+            for _ in range(100):
+                try:
+                    await limiter.check_and_increment("burst")
+                    admitted += 1
+                except HTTPException:
+                    pass
+    return admitted
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ops", type=int, default=100_000)
+    parser.add_argument("--fingerprints", type=int, default=10_000)
+    parser.add_argument("--threads", type=int, default=4)
+    args = parser.parse_args()
+
+    fingerprints = [secrets.token_hex(16) for _ in range(args.fingerprints)]
+    big = 10**9
+    for concurrency in (1, 50, 500):
+        legacy = asyncio.run(_drive(LegacyRateLimiter(big, big), fingerprints, args.ops, concurrency))
+        sliding = asyncio.run(_drive(RateLimiter(big, big, store=MemoryStateStore()), fingerprints, args.ops, concurrency))
+        print(f"{concurrency:>4} tasks   legacy {legacy:>10,.0f} ops/s | sliding {sliding:>10,.0f} ops/s ({sliding / legacy:.1f}x)")
+    threaded = _threaded(RateLimiter(big, big, store=MemoryStateStore()), fingerprints, args.ops, args.threads)
+    print(f"{args.threads:>4} threads  sliding {threaded:>10,.0f} ops/s (legacy asyncio.Lock cannot be shared across loops)")
+
+    legacy_burst = asyncio.run(_boundary_burst(LegacyRateLimiter(big, 10)))
+    sliding_burst = asyncio.run(_boundary_burst(RateLimiter(big, 10, store=MemoryStateStore())))
+    print(f"hour-boundary burst with limit 10/h: legacy admitted {legacy_burst}, sliding admitted {sliding_burst}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Cost of result normalisation per 10k MCP items: previous inline filter vs server.results.
+
+Usage:
+  python3 tools/bench_results.py [--items 10000] [--rounds 20] [--duplicates 0.2]
+
+"legacy" reproduces the previous per-request code (closure redefined, `re`
+re-imported, two uncompiled searches per title, year filter only). "year only"
+is the same work with precompiled patterns, kept here as a baseline only;
+"normalise" is server.results.process_results as /session/research runs it,
+which also extracts court and neutral citation and de-duplicates. All run with
+a yearFrom/yearTo range.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from server.results import process_results  # noqa: E402
+
+COURTS = ("HCA", "FCA", "FCAFC", "NSWSC", "NSWCA", "VSC", "QCA", "WASC", "AATA")
+MONTHS = ("January", "March", "June", "September", "December")
+MONTHS_ALL = ("January", "February", "March", "April", "May", "June", "July", "August", "September", "October", "November", "December")
+
+
+def _items(n: int, duplicates: float) -> List[Dict]:
+    rng = random.Random(7)
+    items: List[Dict] = []
+    for i in range(n):
+        if items and rng.random() < duplicates:
+            items.append(dict(rng.choice(items)))
+            continue
+        court = rng.choice(COURTS)
+        year = rng.randint(1990, 2025)
+        kind = rng.random()
+        if kind < 0.7:
+            title = f"Smith v Jones Pty Ltd {i} [{year}] {court} {rng.randint(1, 900)} ({rng.randint(1, 28)} {rng.choice(MONTHS)} {year})"
+        elif kind < 0.9:
+            title = f"Re Application of Brown {i} ({rng.randint(1, 28)} {rng.choice(MONTHS)} {year})"
+        else:
+            title = f"Commissioner of Taxation v Citizen {i}"
+        items.append({"title": title, "url": f"https://www.austlii.edu.au/cgi-bin/viewdoc/au/cases/cth/{court}/{year}/{i}.html"})
+    return items
+
+
+def _legacy(items: List[Dict], y_from: Optional[int], y_to: Optional[int]) -> List[Dict]:
+    def _extract_year(title: str) -> Optional[int]:
+        import re as _re
+        m = _re.search(r"\[(\d{4})]", title)
+        if m:
+            return int(m.group(1))
+        m2 = _re.search(r"\((?:\d{1,2})\s+(January|February|March|April|May|June|July|August|September|October|November|December)\s+(\d{4})\)", title)
+        if m2:
+            return int(m2.group(2))
+        return None
+
+    filtered: List[Dict] = []
+    for it in items:
+        t = str(it.get('title') or '')
+        y = _extract_year(t)
+        if y is None:
+            continue
+        if y_from and y < y_from:
+            continue
+        if y_to and y > y_to:
+            continue
+        filtered.append(it)
+    return filtered
+
+
+_YEAR_BRACKET_RE = re.compile(r"\[(\d{4})]")
+_YEAR_DATE_RE = re.compile(r"\((?:\d{1,2})\s+(?:" + "|".join(MONTHS_ALL) + r")\s+(\d{4})\)")
+
+
+def _year_only(items: List[Dict], y_from: Optional[int], y_to: Optional[int]) -> List[Dict]:
+    # The legacy title-only year filter with the patterns compiled once
+    out: List[Dict] = []
+    for it in items:
+        t = str(it.get('title') or '')
+        m = _YEAR_BRACKET_RE.search(t) if "[" in t else None
+        if m is None and "(" in t:
+            m = _YEAR_DATE_RE.search(t)
+        if m is None:
+            continue
+        y = int(m.group(1))
+        if (y_from and y < y_from) or (y_to and y > y_to):
+            continue
+        out.append(it)
+    return out
+
+
+def _time(fn, rounds: int) -> float:
+    started = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - started) / rounds
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=10_000)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--duplicates", type=float, default=0.2, help="Fraction of items repeating an earlier one")
+    args = parser.parse_args()
+
+    items = _items(args.items, args.duplicates)
+    legacy = _time(lambda: _legacy(items, 2005, 2020), args.rounds)
+    year_only = _time(lambda: _year_only(items, 2005, 2020), args.rounds)
+    new = _time(lambda: process_results(items, 2005, 2020), args.rounds)
+    records, kept = process_results(items, 2005, 2020)
+    scale = 10_000 / args.items
+    print(f"{args.items:,} items ({len(records):,} after de-duplication, {len(kept):,} in 2005-2020)")
+    print(f"legacy    {legacy * scale * 1000:7.2f} ms per 10k results (year filter)")
+    print(f"year only {year_only * scale * 1000:7.2f} ms per 10k results ({legacy / year_only:.1f}x)")
+    print(f"normalise {new * scale * 1000:7.2f} ms per 10k results (year, court, citation, dedupe, filter)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
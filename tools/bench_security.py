@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Per-request validation overhead: previous security checks vs the cached fast path.
+
+Usage:
+  python3 tools/bench_security.py [--requests 200000] [--distinct-agents 50]
+
+Each iteration builds a fresh Starlette Request from realistic headers and runs
+the checks /session/research performs (source, fingerprint format, suspicious
+patterns). "legacy" reproduces the previous functions; "fast path" is
+server.security.analyse_request plus the RequestSecurity checks.
+"""
+from __future__ import annotations
+
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from starlette.requests import Request  # noqa: E402
+
+from server.security import analyse_request  # noqa: E402
+
+FP = "0123456789abcdef0123456789abcdef"
+
+
+def _legacy_checks(request: Request) -> bool:
+    """The previous validate_chrome_extension_request + validate_fingerprint_format + is_suspicious_request."""
+    origin = request.headers.get("origin") or ""
+    user_agent = request.headers.get("user-agent", "")
+    if not request.headers.get("x-extension-fingerprint"):
+        return False
+    if not re.search(r"Chrome/\d+", user_agent):
+        return False
+    if not (origin.startswith("chrome-extension://") or re.match(r"https://([a-z0-9-]+\.)*austlii\.edu\.au/?$", origin)):
+        return False
+    fingerprint = request.headers.get("x-extension-fingerprint")
+    if not fingerprint or len(fingerprint) != 32 or not re.match(r'^[a-f0-9]{32}$', fingerprint):
+        return False
+    ua = request.headers.get("user-agent", "").lower()
+    suspicious_agents = ['curl', 'wget', 'python', 'bot', 'crawler', 'spider', 'automated', 'selenium', 'phantomjs', 'headless']
+    if any(agent in ua for agent in suspicious_agents):
+        return False
+    if not request.headers.get("accept-language") or not request.headers.get("accept-encoding"):
+        return False
+    if fingerprint == "0" * 32 or len(set(fingerprint)) < 4:
+        return False
+    return True
+
+
+def _fast_checks(request: Request) -> bool:
+    security = analyse_request(request)
+    return security.trusted_source and security.fingerprint_valid() and not security.is_suspicious()
+
+
+def _scopes(n_agents: int) -> List[dict]:
+    scopes = []
+    for i in range(n_agents):
+        headers = {
+            "origin": "chrome-extension://abcdefghijklmnopabcdefghijklmnop",
+            "user-agent": f"Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/{100 + i}.0.0.0 Safari/537.36",
+            "x-extension-fingerprint": FP,
+            "x-session-token": "t" * 43,
+            "accept-language": "en-AU,en;q=0.9",
+            "accept-encoding": "gzip, deflate, br",
+            "content-type": "application/json",
+        }
+        scopes.append({
+            "type": "http",
+            "method": "POST",
+            "path": "/session/research",
+            "headers": [(k.encode("latin-1"), v.encode("latin-1")) for k, v in headers.items()],
+        })
+    return scopes
+
+
+def _time(check, scopes: List[dict], n: int) -> float:
+    started = time.perf_counter()
+    for i in range(n):
+        if not check(Request(scopes[i % len(scopes)])):
+            raise RuntimeError("request unexpectedly rejected")
+    return (time.perf_counter() - started) / n * 1e6
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200_000)
+    parser.add_argument("--distinct-agents", type=int, default=50)
+    args = parser.parse_args()
+
+    scopes = _scopes(args.distinct_agents)
+    baseline = _time(lambda r: True, scopes, args.requests)
+    legacy = _time(_legacy_checks, scopes, args.requests) - baseline
+    fast = _time(_fast_checks, scopes, args.requests) - baseline
+    print(f"{args.requests:,} requests, {args.distinct_agents} distinct user-agents")
+    print(f"legacy    {legacy:6.2f} µs/request")
+    print(f"fast path {fast:6.2f} µs/request ({legacy / fast:.1f}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for SessionTokenManager at increasing numbers of live tokens.
+
+Usage:
+  python3 tools/bench_session_tokens.py [--sizes 10000 100000 1000000] [--ops 20000]
+
+Reports per-operation cost of validate_token, generate_token and get_stats,
+plus the cost of expiring a batch of tokens, with N tokens already live.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import secrets
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from server.session_tokens import SessionTokenManager  # noqa: E402
+
+
+async def bench(size: int, ops: int) -> None:
+    # No fingerprint cap below the table size, so every row holds the tokens it reports
+    mgr = SessionTokenManager(token_lifetime_hours=24, max_tokens_per_fingerprint=3, max_fingerprints=size)
+    fingerprints = [secrets.token_hex(16) for _ in range(max(1, size // 2))]
+
+    started = time.perf_counter()
+    issued = []
+    for i in range(size):
+        fp = fingerprints[i % len(fingerprints)]
+        issued.append((await mgr.generate_token(fp), fp))
+    populate = time.perf_counter() - started
+    live = len(mgr.tokens)
+
+    sample = [issued[(i * 7919) % size] for i in range(ops)]
+    started = time.perf_counter()
+    for token, fp in sample:
+        await mgr.validate_token(token, fp)
+    validate_us = (time.perf_counter() - started) * 1e6 / ops
+
+    started = time.perf_counter()
+    for i in range(ops):
+        await mgr.generate_token(fingerprints[i % len(fingerprints)])
+    generate_us = (time.perf_counter() - started) * 1e6 / ops
+
+    started = time.perf_counter()
+    for _ in range(100):
+        mgr.get_stats()
+    stats_us = (time.perf_counter() - started) * 1e6 / 100
+
+    # Age a tenth of the tokens past their lifetime and time the cleanup that expires them
+    expire_n = max(1, len(mgr._expiry_heap) // 10)
+    aged = sorted(mgr._expiry_heap)[:expire_n]
+    for expires_at, token in aged:
+        record = mgr.tokens.get(token)
+        if record is not None:
+            record.created_at -= 2 * mgr._lifetime_seconds
+    mgr._expiry_heap = [(e - 2 * mgr._lifetime_seconds, t) if i < expire_n else (e, t) for i, (e, t) in enumerate(sorted(mgr._expiry_heap))]
+    started = time.perf_counter()
+    mgr._cleanup_expired_tokens()
+    expire_ms = (time.perf_counter() - started) * 1e3
+
+    print(
+        f"{size:>9} tokens ({live} live) | populate {populate:6.2f}s | validate {validate_us:6.2f} us | "
+        f"generate {generate_us:6.2f} us | get_stats {stats_us:8.2f} us | expire {expire_n} in {expire_ms:7.2f} ms"
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--ops", type=int, default=20_000)
+    args = parser.parse_args()
+    for size in args.sizes:
+        asyncio.run(bench(size, args.ops))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for the rate-limit / session-token state stores.
+
+Usage:
+  python3 tools/bench_state_store.py [--ops 20000] [--concurrency 50]
+      [--sqlite-path /tmp/bench-state.sqlite3] [--redis-url redis://127.0.0.1:6379/15]
+
+Runs the memory and SQLite stores always, and the Redis store when --redis-url
+is given (any Redis-protocol server, e.g. a local redis-server or valkey).
+Reports operations/sec for rate-limit checks and token validation.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import secrets
+import sys
+import time
+from pathlib import Path
+from typing import Any, List
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from server.rate_limiter import RateLimiter  # noqa: E402
+from server.session_tokens import SessionTokenManager, StoreTokenManager  # noqa: E402
+from server.state_store import MemoryStateStore, RedisStateStore, SqliteStateStore  # noqa: E402
+
+
+async def _drive(n_ops: int, concurrency: int, op) -> float:
+    """Run op(i) n_ops times across `concurrency` tasks; return ops/sec."""
+    counter = iter(range(n_ops))
+
+    async def worker() -> None:
+        for i in counter:
+            await op(i)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return n_ops / (time.perf_counter() - started)
+
+
+async def bench(name: str, store: Any, ops: int, concurrency: int) -> None:
+    limiter = RateLimiter(requests_per_day=10**9, requests_per_hour=10**9, store=store)
+    fingerprints: List[str] = [secrets.token_hex(16) for _ in range(1000)]
+
+    async def rate_op(i: int) -> None:
+        await limiter.check_and_increment(fingerprints[i % len(fingerprints)])
+
+    rate_ops = await _drive(ops, concurrency, rate_op)
+
+    tokens = SessionTokenManager() if isinstance(store, MemoryStateStore) else StoreTokenManager(store)
+    issued = [(await tokens.generate_token(fp), fp) for fp in fingerprints]
+
+    async def validate_op(i: int) -> None:
+        token, fp = issued[i % len(issued)]
+        if not await tokens.validate_token(token, fp):
+            raise RuntimeError("token failed to validate")
+
+    validate_ops = await _drive(ops, concurrency, validate_op)
+    print(f"{name:<8} rate-limit check {rate_ops:>10,.0f} ops/s | token validate {validate_ops:>10,.0f} ops/s")
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    await bench("memory", MemoryStateStore(), args.ops, args.concurrency)
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(args.sqlite_path + suffix):
+            os.remove(args.sqlite_path + suffix)
+    await bench("sqlite", SqliteStateStore(args.sqlite_path), args.ops, args.concurrency)
+    if args.redis_url:
+        store = RedisStateStore(args.redis_url, prefix=f"olexi-bench-{secrets.token_hex(4)}")
+        await bench("redis", store, args.ops, args.concurrency)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ops", type=int, default=20_000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--sqlite-path", default="/tmp/olexi-bench-state.sqlite3")
+    parser.add_argument("--redis-url", help="Redis-protocol server to benchmark (optional)")
+    asyncio.run(main_async(parser.parse_args()))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
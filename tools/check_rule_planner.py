@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Check the rule-based fast-path planner against known prompts.
+
+Usage:
+  python3 tools/check_rule_planner.py [-v]
+
+Each case is a prompt and either the query the planner must build or None
+when it must leave the prompt to Gemini (the user's own Boolean syntax, or
+court aliases such as "native title" that may be the search itself). Exits
+non-zero on any mismatch.
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from server.rule_planner import RulePlanner  # noqa: E402
+
+CASES: List[Tuple[str, Optional[str]]] = [
+    ("HCA negligence 2020", "negligence AND 2020"),
+    ("high court duty of care", '"duty of care"'),
+    ("NSW breach of contract damages", '"breach of contract" AND damages'),
+    ('VSC "unfair dismissal" employer', '"unfair dismissal" AND employer'),
+    ("FCA right to silence and abuse of process", '"right to silence" AND "abuse of process"'),
+    ("HCA negligence in employment", "negligence AND employment"),
+    # The user's own search syntax
+    ("HCA contract NOT employment", None),
+    ("NSW negligence OR nuisance", None),
+    ("HCA negligence or nuisance", None),
+    ("HCA defamation -online", None),
+    ("HCA (contract OR tort) damages", None),
+    # Court aliases that are also subject matter
+    ("HCA native title extinguishment", None),
+    ("Mabo native title HCA 1992", None),
+    ("fair work unfair dismissal FCA", None),
+    ("county court sentencing VSC", None),
+    # Questions, ranges and section numbers
+    ("what is the test for negligence in the HCA", None),
+    ("HCA negligence since 2015", None),
+    ("FCA s 18 misleading conduct", None),
+]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-v", "--verbose", action="store_true", help="Print every plan, not only mismatches")
+    args = parser.parse_args()
+
+    planner = RulePlanner()
+    failures = 0
+    for prompt, expected in CASES:
+        plan = planner.plan(prompt)
+        query = plan["query"] if plan else None
+        if query != expected:
+            failures += 1
+            print(f"MISMATCH {prompt!r}\n  expected: {expected}\n  planned:  {plan}", file=sys.stderr)
+        elif args.verbose:
+            print(f"ok {prompt!r} -> {plan}")
+    print(f"{len(CASES) - failures}/{len(CASES)} planner cases match")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
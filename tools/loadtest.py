@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+"""
+Offline throughput benchmark for server.main:app.
+
+Usage:
+  python3 tools/loadtest.py [--sessions 200] [--concurrency 50] [--mcp-latency 0.5]
+                            [--progress-steps 3] [--progress-interval 0.1] [--results 20]
+                            [--plan-delay 0.3] [--summary-delay 0.2] [--chunks 8] [--chunk-delay 0.05]
+                            [--cache] [--distinct-prompts 0] [--mcp-url URL] [--json]
+
+Starts tools/loadtest_mcp_stub.py (unless --mcp-url is given), serves the app
+with uvicorn on a background thread with a fake HostAI (configurable Gemini
+delays, no network), then opens --sessions /session/research SSE streams,
+--concurrency at a time, each with its own valid fingerprint and token.
+
+Reports sessions/sec, time to first SSE event and full-session latency
+(p50/p95/p99), the app event loop's lag (how late a 10 ms timer fires) and the
+mean of each stage from the final `event: timings` frame. Response caches are
+disabled unless --cache, so every session exercises the full hot path.
+Server-side settings (ADMISSION_*, STAGE_*_CONCURRENCY, MCP_POOL_SIZE, ...)
+are taken from the environment as usual.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import secrets
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import types
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import httpx  # noqa: E402
+
+HEADERS = {
+    "origin": "chrome-extension://abcdefghijklmnopabcdefghijklmnop",
+    "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/128.0.0.0 Safari/537.36",
+    "accept-language": "en-AU,en;q=0.9",
+    "accept-encoding": "gzip, deflate, br",
+}
+
+PROMPTS = (
+    "High Court negligence duty of care for public authorities",
+    "Federal Court misleading or deceptive conduct in franchising",
+    "NSW Court of Appeal adverse possession of Torrens title land",
+    "unfair dismissal remedies for casual employees",
+    "Victorian Supreme Court breach of confidence by former employees",
+)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_for_port(port: int, timeout: float = 15.0) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"nothing listening on port {port} after {timeout:.0f}s")
+
+
+def _percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+    ordered = sorted(values)
+
+    def pct(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+    return {"p50": pct(50), "p95": pct(95), "p99": pct(99), "max": ordered[-1]}
+
+
+class _Resp:
+    __slots__ = ("text",)
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+
+
+class FakeModels:
+    """Stands in for genai.Client().aio.models with fixed delays"""
+
+    def __init__(self, plan_delay: float, summary_delay: float, chunks: int, chunk_delay: float) -> None:
+        self.plan_delay = plan_delay
+        self.summary_delay = summary_delay
+        self.chunks = chunks
+        self.chunk_delay = chunk_delay
+
+    async def generate_content(self, **kwargs: Any) -> _Resp:
+        contents = str(kwargs.get("contents", ""))
+        if "legal research planner" in contents:
+            await asyncio.sleep(self.plan_delay)
+            return _Resp('{"query": "(negligen* OR \\"duty of care\\")", "databases": ["au/cases/cth/HCA", "au/cases/cth/FCA"]}')
+        await asyncio.sleep(self.summary_delay)
+        return _Resp("## Summary\nSynthetic answer.\n\n## Key cases\n- Smith v Jones [2020] HCA 1\n")
+
+    async def generate_content_stream(self, **kwargs: Any) -> Any:
+        await asyncio.sleep(self.summary_delay)
+
+        async def gen():
+            yield _Resp("## Summary\n")
+            for i in range(self.chunks):
+                await asyncio.sleep(self.chunk_delay)
+                yield _Resp(f"Synthetic sentence {i} citing Smith v Jones [2020] HCA 1. ")
+
+        return gen()
+
+
+class _LagSampler:
+    """Measures how late a short sleep wakes up on the app's event loop"""
+
+    def __init__(self, interval: float = 0.01) -> None:
+        self.interval = interval
+        self.samples: List[float] = []
+        self.running = False
+
+    async def run(self) -> None:
+        self.running = True
+        loop = asyncio.get_running_loop()
+        while self.running:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - started - self.interval))
+
+
+class _AppServer:
+    """uvicorn serving server.main:app on its own thread and event loop"""
+
+    def __init__(self, app: Any, port: int) -> None:
+        import uvicorn
+
+        self.port = port
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", access_log=False))
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.thread = threading.Thread(target=self._run, name="loadtest-app", daemon=True)
+
+    def _run(self) -> None:
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_until_complete(self.server.serve())
+
+    def start(self) -> None:
+        self.thread.start()
+        deadline = time.time() + 30
+        while not self.server.started:
+            if time.time() > deadline or not self.thread.is_alive():
+                raise RuntimeError("uvicorn did not start")
+            time.sleep(0.05)
+
+    def stop(self) -> None:
+        self.server.should_exit = True
+        self.thread.join(timeout=10)
+
+
+class SessionResult:
+    __slots__ = ("status", "first_event", "total", "events", "error", "timings")
+
+    def __init__(self) -> None:
+        self.status = 0
+        self.first_event: Optional[float] = None
+        self.total = 0.0
+        self.events = 0
+        self.error: Optional[str] = None
+        self.timings: Dict[str, float] = {}
+
+
+async def _issue_tokens(client: httpx.AsyncClient, n: int) -> List[Dict[str, str]]:
+    """One fresh fingerprint + session token per simulated installation"""
+
+    async def one() -> Dict[str, str]:
+        fingerprint = secrets.token_hex(16)
+        headers = dict(HEADERS, **{"x-extension-fingerprint": fingerprint})
+        resp = await client.post("/session/token", json={"fingerprint": fingerprint}, headers=headers)
+        resp.raise_for_status()
+        headers["x-session-token"] = resp.json()["token"]
+        return headers
+
+    sem = asyncio.Semaphore(64)
+
+    async def bounded() -> Dict[str, str]:
+        async with sem:
+            return await one()
+
+    return await asyncio.gather(*(bounded() for _ in range(n)))
+
+
+async def _run_session(client: httpx.AsyncClient, headers: Dict[str, str], prompt: str) -> SessionResult:
+    result = SessionResult()
+    started = time.perf_counter()
+    event = ""
+    try:
+        async with client.stream("POST", "/session/research", json={"prompt": prompt}, headers=headers) as resp:
+            result.status = resp.status_code
+            if resp.status_code != 200:
+                await resp.aread()
+                result.error = f"HTTP {resp.status_code}"
+                return result
+            async for line in resp.aiter_lines():
+                if line.startswith("event:"):
+                    event = line[6:].strip()
+                    if result.first_event is None:
+                        result.first_event = time.perf_counter() - started
+                    result.events += 1
+                elif line.startswith("data:"):
+                    if event == "error" and result.error is None:
+                        result.error = json.loads(line[5:]).get("code", "error")
+                    elif event == "timings":
+                        result.timings = json.loads(line[5:])
+    except Exception as e:
+        result.error = type(e).__name__
+    finally:
+        result.total = time.perf_counter() - started
+    return result
+
+
+async def _drive(base_url: str, args: argparse.Namespace) -> Dict[str, Any]:
+    limits = httpx.Limits(max_connections=args.concurrency + 64, max_keepalive_connections=args.concurrency + 64)
+    async with httpx.AsyncClient(base_url=base_url, timeout=httpx.Timeout(120.0), limits=limits) as client:
+        identities = await _issue_tokens(client, args.sessions)
+        if args.distinct_prompts:
+            prompts = [f"{PROMPTS[i % len(PROMPTS)]} ({i % args.distinct_prompts})" for i in range(args.sessions)]
+        else:
+            # Unique per session, so caches and single-flight coalescing never help
+            prompts = [f"{PROMPTS[i % len(PROMPTS)]} #{secrets.token_hex(4)}" for i in range(args.sessions)]
+
+        sem = asyncio.Semaphore(args.concurrency)
+
+        async def bounded(i: int) -> SessionResult:
+            async with sem:
+                return await _run_session(client, identities[i], prompts[i])
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*(bounded(i) for i in range(args.sessions)))
+        elapsed = time.perf_counter() - started
+
+    ok = [r for r in results if r.status == 200 and r.error is None]
+    errors: Dict[str, int] = {}
+    for r in results:
+        if r.error:
+            errors[r.error] = errors.get(r.error, 0) + 1
+    stages: Dict[str, List[float]] = {}
+    for r in ok:
+        for name, ms in r.timings.items():
+            stages.setdefault(name, []).append(ms)
+    return {
+        "sessions": args.sessions,
+        "concurrency": args.concurrency,
+        "completed": len(ok),
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "sessions_per_s": round(len(ok) / elapsed, 2) if elapsed else 0.0,
+        "first_event_ms": {k: round(v * 1000, 1) for k, v in _percentiles([r.first_event for r in ok if r.first_event is not None]).items()},
+        "session_ms": {k: round(v * 1000, 1) for k, v in _percentiles([r.total for r in ok]).items()},
+        "events_per_session": round(statistics.mean(r.events for r in ok), 1) if ok else 0.0,
+        "stage_mean_ms": {name: round(statistics.mean(v), 1) for name, v in sorted(stages.items())},
+    }
+
+
+def _configure_env(args: argparse.Namespace, mcp_url: str) -> None:
+    os.environ["MCP_URL"] = mcp_url
+    # The driver is one client hammering the host; keep per-fingerprint limits out of the way
+    os.environ.setdefault("DAILY_REQUEST_LIMIT", "1000000")
+    os.environ.setdefault("HOURLY_REQUEST_LIMIT", "1000000")
+    os.environ.setdefault("SHARE_URL_MODE", "local")
+    os.environ.setdefault("TRACE_EXPORTER", "none")
+    if not args.cache:
+        for prefix in ("PLAN", "SEARCH", "SUMMARY"):
+            os.environ[f"{prefix}_CACHE_ENABLED"] = "0"
+
+
+def _print_report(report: Dict[str, Any]) -> None:
+    print(f"{report['completed']}/{report['sessions']} sessions completed at concurrency {report['concurrency']} in {report['elapsed_s']:.2f}s")
+    print(f"throughput        {report['sessions_per_s']:8.2f} sessions/s")
+    for label, key in (("first event", "first_event_ms"), ("session", "session_ms"), ("event-loop lag", "loop_lag_ms")):
+        p = report[key]
+        print(f"{label:<17} p50 {p['p50']:8.1f} ms  p95 {p['p95']:8.1f} ms  p99 {p['p99']:8.1f} ms  max {p['max']:8.1f} ms")
+    print(f"events/session    {report['events_per_session']:8.1f}")
+    if report["stage_mean_ms"]:
+        print("stage means (ms)  " + "  ".join(f"{k}={v}" for k, v in report["stage_mean_ms"].items()))
+    if report["errors"]:
+        print("errors            " + ", ".join(f"{k}={v}" for k, v in sorted(report["errors"].items())))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--mcp-url", help="Use an already running MCP server instead of the stub")
+    parser.add_argument("--mcp-latency", type=float, default=0.5, help="Stub: total seconds per search")
+    parser.add_argument("--progress-steps", type=int, default=3, help="Stub: progress notifications per search")
+    parser.add_argument("--progress-interval", type=float, default=0.1, help="Stub: seconds between progress notifications")
+    parser.add_argument("--results", type=int, default=20, help="Stub: items per search")
+    parser.add_argument("--plan-delay", type=float, default=0.3, help="Fake Gemini: seconds per planning call")
+    parser.add_argument("--summary-delay", type=float, default=0.2, help="Fake Gemini: seconds before the first summary chunk")
+    parser.add_argument("--chunks", type=int, default=8, help="Fake Gemini: streamed summary chunks")
+    parser.add_argument("--chunk-delay", type=float, default=0.05, help="Fake Gemini: seconds between chunks")
+    parser.add_argument("--cache", action="store_true", help="Leave the plan/search/summary caches enabled")
+    parser.add_argument("--distinct-prompts", type=int, default=0, help="Cycle this many prompts (0 = every prompt unique)")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    stub: Optional[subprocess.Popen] = None
+    mcp_url = args.mcp_url
+    if not mcp_url:
+        stub_port = _free_port()
+        stub = subprocess.Popen([
+            sys.executable, str(ROOT / "tools" / "loadtest_mcp_stub.py"),
+            "--port", str(stub_port),
+            "--latency", str(args.mcp_latency),
+            "--progress-steps", str(args.progress_steps),
+            "--progress-interval", str(args.progress_interval),
+            "--results", str(args.results),
+        ], stdout=subprocess.DEVNULL)
+        mcp_url = f"http://127.0.0.1:{stub_port}/mcp"
+    app_server: Optional[_AppServer] = None
+    try:
+        if stub is not None:
+            _wait_for_port(stub_port)
+        _configure_env(args, mcp_url)
+
+        from server import main as host  # noqa: E402  (reads the environment at import)
+        from server.host_agent import HOST_AI  # noqa: E402
+
+        HOST_AI.client = types.SimpleNamespace(
+            aio=types.SimpleNamespace(models=FakeModels(args.plan_delay, args.summary_delay, args.chunks, args.chunk_delay)),
+            models=None,
+        )
+        HOST_AI.available = True
+
+        app_server = _AppServer(host.app, _free_port())
+        app_server.start()
+        sampler = _LagSampler()
+        assert app_server.loop is not None
+        asyncio.run_coroutine_threadsafe(sampler.run(), app_server.loop)
+
+        report = asyncio.run(_drive(f"http://127.0.0.1:{app_server.port}", args))
+        sampler.running = False
+        report["loop_lag_ms"] = {k: round(v * 1000, 2) for k, v in _percentiles(sampler.samples).items()}
+        report["admission"] = host.admission.get_stats()
+    finally:
+        if app_server is not None:
+            app_server.stop()
+        if stub is not None:
+            stub.terminate()
+            stub.wait(timeout=10)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        _print_report(report)
+    return 0 if report["completed"] else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the AustLII MCP server, for load tests.
+
+Usage:
+  python3 tools/loadtest_mcp_stub.py [--port 8765] [--latency 0.5] [--progress-steps 3]
+                                     [--progress-interval 0.1] [--results 20] [--url-latency 0.0]
+
+Exposes `search_with_progress` and `build_search_url` over streamable HTTP at
+http://127.0.0.1:PORT/mcp. A search reports --progress-steps notifications
+--progress-interval seconds apart, then sleeps out the rest of --latency and
+returns --results synthetic case items (titles carry a year and neutral
+citation, as AustLII's do).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+import urllib.parse
+from typing import Dict, List
+
+from mcp.server.fastmcp import Context, FastMCP
+
+_COURTS = ("HCA", "FCA", "FCAFC", "NSWSC", "NSWCA", "VSC", "QCA", "WASC")
+
+
+def build_server(
+    port: int,
+    latency: float,
+    progress_steps: int,
+    progress_interval: float,
+    results: int,
+    url_latency: float,
+) -> FastMCP:
+    mcp = FastMCP("olexi-loadtest-stub", host="127.0.0.1", port=port, log_level="WARNING")
+
+    @mcp.tool()
+    async def search_with_progress(query: str, databases: List[str], method: str = "auto", ctx: Context = None) -> List[Dict]:
+        started = time.perf_counter()
+        for i in range(progress_steps):
+            if ctx is not None:
+                await ctx.report_progress((i + 1) * 100 / (progress_steps + 1), 100, f"Searching ({i + 1}/{progress_steps})")
+            await asyncio.sleep(progress_interval)
+        remaining = latency - (time.perf_counter() - started)
+        if remaining > 0:
+            await asyncio.sleep(remaining)
+        items = []
+        for i in range(results):
+            court = _COURTS[i % len(_COURTS)]
+            year = 2000 + (hash((query, i)) % 25)
+            items.append({
+                "title": f"Smith v Jones {i} [{year}] {court} {i + 1} ({query[:40]})",
+                "url": f"https://www.austlii.edu.au/cgi-bin/viewdoc/au/cases/cth/{court}/{year}/{i + 1}.html",
+                "metadata": {"database": databases[0] if databases else ""},
+            })
+        return items
+
+    @mcp.tool()
+    async def build_search_url(query: str, databases: List[str]) -> str:
+        if url_latency > 0:
+            await asyncio.sleep(url_latency)
+        params = [("query", query), ("method", "boolean"), ("meta", "/au")] + [("mask_path", d) for d in databases]
+        return "https://www.austlii.edu.au/cgi-bin/sinosrch.cgi?" + urllib.parse.urlencode(params)
+
+    return mcp
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.5, help="Total seconds per search")
+    parser.add_argument("--progress-steps", type=int, default=3)
+    parser.add_argument("--progress-interval", type=float, default=0.1, help="Seconds between progress notifications")
+    parser.add_argument("--results", type=int, default=20)
+    parser.add_argument("--url-latency", type=float, default=0.0, help="Seconds per build_search_url call")
+    args = parser.parse_args()
+
+    server = build_server(args.port, args.latency, args.progress_steps, args.progress_interval, args.results, args.url_latency)
+    print(f"Stub MCP server on http://127.0.0.1:{args.port}/mcp", flush=True)
+    server.run(transport="streamable-http")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Print span trees from a TRACE_EXPORTER=file trace log.
+
+Usage:
+  python3 tools/trace_summary.py [/tmp/olexi-traces.jsonl] [--slowest 5] [--trace TRACE_ID]
+
+Shows the slowest research sessions (or one trace) as an indented tree with
+each span's start offset and duration, so the stage adding the long tail is
+visible at a glance.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+from collections import defaultdict
+from typing import Dict, List
+
+
+def _print_tree(spans: List[dict]) -> None:
+    children: Dict[str, List[dict]] = defaultdict(list)
+    ids = {s["span_id"] for s in spans}
+    roots = []
+    for s in spans:
+        if s.get("parent_span_id") in ids:
+            children[s["parent_span_id"]].append(s)
+        else:
+            roots.append(s)
+    t0 = min(s["start_time_unix_nano"] for s in spans)
+
+    def walk(span: dict, depth: int) -> None:
+        offset = (span["start_time_unix_nano"] - t0) / 1e6
+        flag = " !" if span.get("status") == "ERROR" else (" (cancelled)" if span["attributes"].get("cancelled") else "")
+        print(f"  {'  ' * depth}{span['name']:<32} +{offset:9.1f} ms {span['duration_ms']:10.1f} ms{flag}")
+        for child in sorted(children[span["span_id"]], key=lambda c: c["start_time_unix_nano"]):
+            walk(child, depth + 1)
+
+    for root in sorted(roots, key=lambda r: r["start_time_unix_nano"]):
+        walk(root, 0)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("path", nargs="?", default="/tmp/olexi-traces.jsonl")
+    parser.add_argument("--slowest", type=int, default=5)
+    parser.add_argument("--trace", help="Show only this trace id")
+    args = parser.parse_args()
+
+    traces: Dict[str, List[dict]] = defaultdict(list)
+    with open(args.path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                span = json.loads(line)
+                traces[span["trace_id"]].append(span)
+
+    if args.trace:
+        selected = [args.trace]
+    else:
+        sessions = [s for spans in traces.values() for s in spans if s["name"] == "session_research"]
+        sessions.sort(key=lambda s: s["duration_ms"], reverse=True)
+        selected = [s["trace_id"] for s in sessions[: args.slowest]]
+    for trace_id in selected:
+        print(f"trace {trace_id}")
+        _print_tree(traces.get(trace_id, []))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Check the host's local share URL builder against the MCP `build_search_url` tool.
+
+Usage:
+  python3 tools/verify_share_url.py                      # offline, against the fixtures below
+  python3 tools/verify_share_url.py --live               # compare against the live MCP (MCP_URL)
+  python3 tools/verify_share_url.py --record             # record live tool outputs to share_urls_recorded.json
+  python3 tools/verify_share_url.py --fixtures other.json
+
+Offline runs use tools/fixtures/share_urls_recorded.json when it exists. Until
+it has been recorded from a live MCP they fall back to
+share_urls_expected.json, which holds the expected encoding of each case
+(written by hand, not tool output): that only guards the builder against
+regressions, and conformance with the real tool stays unverified. Exits
+non-zero on any mismatch, so it can gate a deploy.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, List
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from server.main import _build_austlii_url, _fetch_remote_share_url  # noqa: E402
+from server.mcp_pool import get_mcp_url  # noqa: E402
+
+FIXTURES_DIR = Path(__file__).resolve().parent / "fixtures"
+RECORDED = FIXTURES_DIR / "share_urls_recorded.json"
+EXPECTED = FIXTURES_DIR / "share_urls_expected.json"
+
+
+async def _record(cases: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    out = []
+    for case in cases:
+        url = await _fetch_remote_share_url(case["query"], case["databases"])
+        out.append({"query": case["query"], "databases": case["databases"], "url": url})
+    return out
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fixtures", help="Fixture file (default: recorded outputs if present, else expected encoding)")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--live", action="store_true", help="Ask the live MCP instead of reading fixtures")
+    group.add_argument("--record", action="store_true", help=f"Ask the live MCP and write {RECORDED.name}")
+    args = parser.parse_args()
+
+    path = Path(args.fixtures) if args.fixtures else (RECORDED if RECORDED.exists() else EXPECTED)
+    with open(path, "r", encoding="utf-8") as f:
+        fixtures = json.load(f)
+    cases = fixtures["cases"]
+    source = fixtures.get("source", "")
+    if args.live or args.record:
+        cases = asyncio.run(_record(cases))
+        source = f"recorded from build_search_url at {get_mcp_url()}"
+        if args.record:
+            with open(RECORDED, "w", encoding="utf-8") as f:
+                json.dump({"source": source, "cases": cases}, f, indent=2, ensure_ascii=False)
+                f.write("\n")
+            print(f"Recorded {len(cases)} cases to {RECORDED}")
+        path = Path("live MCP")
+    print(f"Comparing against {path.name}: {source}")
+
+    failures = 0
+    for case in cases:
+        local = _build_austlii_url(case["query"], case["databases"])
+        if local != case.get("url"):
+            failures += 1
+            print(f"MISMATCH {case['query']!r} {case['databases']}\n  local:  {local}\n  remote: {case.get('url')}", file=sys.stderr)
+    print(f"{len(cases) - failures}/{len(cases)} share URLs match")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -313,57 +313,106 @@
     }
 
     // --- Streaming SSE over POST to /session/research ---
+    // Events carry ids ("<session>:<n>"); if the stream drops before the answer we
+    // reconnect with Last-Event-ID and the host replays what we missed from the same run.
+    const RESUME_ATTEMPTS = 3;
+
     async function streamSession(prompt) {
         const controller = new AbortController();
         const timeoutId = setTimeout(() => controller.abort(), 120000);
         let shareUrl = null;
+        let streamedMd = '';
+        let moreResults = [];
+        let sessionId = null;
+        let lastEventId = null;
+        let finished = false;
         try {
             const base = await resolveHostBase();
             const fingerprint = await generateInstallationFingerprint();
             const token = await getOrCreateSessionToken();
-            let res;
-            try {
-                res = await fetch(base + '/session/research', {
-                method: 'POST',
-                headers: {
+            const openStream = async () => {
+                const headers = {
                     'Content-Type': 'application/json',
                     'Accept': 'text/event-stream',
                     'X-Extension-Id': 'olexi-local',
                     'X-Extension-Fingerprint': fingerprint,
                     'X-Session-Token': token
-                },
-                mode: 'cors',
-                credentials: 'omit',
-                body: JSON.stringify({ prompt }),
-                signal: controller.signal,
-                });
-            } catch (netErr) {
-                const msg = (netErr && netErr.message) ? netErr.message : String(netErr);
-                throw new Error(`Network error contacting Olexi host at ${base}: ${msg}`);
-            }
-            if (!res.ok || !res.body) {
-                let detail = '';
-                try { 
-                    const errorData = await res.json();
-                    detail = errorData.detail || '';
-                } catch {
-                    try { detail = await res.text(); } catch {}
+                };
+                if (lastEventId) headers['Last-Event-ID'] = lastEventId;
+                let res;
+                try {
+                    res = await fetch(base + '/session/research', {
+                    method: 'POST',
+                    headers,
+                    mode: 'cors',
+                    credentials: 'omit',
+                    body: JSON.stringify(sessionId ? { prompt, sessionId } : { prompt }),
+                    signal: controller.signal,
+                    });
+                } catch (netErr) {
+                    const msg = (netErr && netErr.message) ? netErr.message : String(netErr);
+                    throw new Error(`Network error contacting Olexi host at ${base}: ${msg}`);
                 }
-                
-                // Handle token-related errors
-                if (res.status === 401 && detail.includes('token')) {
-                    // Clear stored token and try to get a new one
-                    localStorage.removeItem('olexi-session-token');
-                    sessionToken = null;
-                    throw new Error('Session expired. Please try your request again.');
+                if (!res.ok || !res.body) {
+                    let detail = '';
+                    try { 
+                        const errorData = await res.json();
+                        detail = errorData.detail || '';
+                    } catch {
+                        try { detail = await res.text(); } catch {}
+                    }
+                    
+                    // Handle token-related errors
+                    if (res.status === 401 && detail.includes('token')) {
+                        // Clear stored token and try to get a new one
+                        localStorage.removeItem('olexi-session-token');
+                        sessionToken = null;
+                        throw new Error('Session expired. Please try your request again.');
+                    }
+
+                    // Host is overloaded and its queue is full
+                    if (res.status === 503 && res.headers.get('retry-after')) {
+                        throw new Error(`Olexi is busy right now. Please try again in ${res.headers.get('retry-after')} seconds.`);
+                    }
+                    
+                    throw new Error(detail || res.statusText || `HTTP ${res.status}`);
+                }
+                const ctype = (res.headers && res.headers.get && res.headers.get('content-type')) || '';
+                if (!/text\/event-stream/i.test(ctype)) {
+                    throw new Error(`Unexpected response content-type: ${ctype || 'unknown'}`);
+                }
+                return res;
+            };
+            let res = await openStream();
+            for (let attempt = 0; ; attempt++) {
+                if (res) {
+                    try {
+                        await readStream(res);
+                    } catch (readErr) {
+                        if (controller.signal.aborted) throw readErr;
+                    }
+                }
+                if (finished || !sessionId || controller.signal.aborted || attempt >= RESUME_ATTEMPTS) break;
+                // Stream dropped mid-session: back off, then resume where we left off
+                await new Promise((resolve) => setTimeout(resolve, 1000 * 2 ** attempt));
+                try {
+                    res = await openStream();
+                } catch (e) {
+                    // Host still unreachable: try again; anything else (e.g. session expired) is final
+                    if (!/^Network error/.test(e.message)) throw e;
+                    res = null;
                 }
-                
-                throw new Error(detail || res.statusText || `HTTP ${res.status}`);
             }
-            const ctype = (res.headers && res.headers.get && res.headers.get('content-type')) || '';
-            if (!/text\/event-stream/i.test(ctype)) {
-                throw new Error(`Unexpected response content-type: ${ctype || 'unknown'}`);
+            if (!finished && !controller.signal.aborted) {
+                throw new Error('Lost connection to the Olexi host. Please try your request again.');
             }
+            clearTimeout(timeoutId);
+        } catch (e) {
+            clearTimeout(timeoutId);
+            throw e;
+        }
+
+        async function readStream(res) {
             const reader = res.body.getReader();
             const decoder = new TextDecoder('utf-8');
             let buffer = '';
@@ -379,14 +428,21 @@
                     let event = null;
                     let data = '';
                     for (const line of lines) {
-                        if (line.startsWith('event:')) event = line.slice(6).trim();
+                        if (line.startsWith('id:')) lastEventId = line.slice(3).trim();
+                        else if (line.startsWith('event:')) event = line.slice(6).trim();
                         else if (line.startsWith('data:')) data += line.slice(5).trim();
                     }
                     if (!event) continue;
                     try {
                         const payload = data ? JSON.parse(data) : {};
-                        if (event === 'progress') {
+                        if (event === 'session') {
+                            sessionId = payload.session_id || null;
+                        } else if (event === 'progress') {
                             // Could update loading text here
+                        } else if (event === 'queued') {
+                            // Host is at capacity; we hold a place in its queue
+                            const el = document.getElementById('olexi-loading');
+                            if (el) el.innerHTML = `\u23f3 Olexi is busy. You are number ${Number(payload.position) || 1} in the queue...<br><small>Your search will start automatically</small>`;
                         } else if (event === 'results_preview') {
                             // Show the initial preview, then immediately show a processing spinner while AI prepares the summary
                             removeLoadingIndicator();
@@ -394,27 +450,37 @@
                             const md = renderResultsMarkdown(items);
                             displayMessage(md, 'ai');
                             showProcessingIndicator();
+                        } else if (event === 'results_batch') {
+                            // Further results beyond the preview; shown after the answer
+                            if (Array.isArray(payload.items)) moreResults = moreResults.concat(payload.items);
+                        } else if (event === 'answer_delta') {
+                            // Render the summary progressively as tokens arrive
+                            removeLoadingIndicator();
+                            removeProcessingIndicator();
+                            streamedMd += typeof payload.text === 'string' ? payload.text : '';
+                            updateStreamingMessage(streamedMd);
                         } else if (event === 'answer') {
                             removeLoadingIndicator();
                             removeProcessingIndicator();
+                            removeStreamingMessage();
                             shareUrl = payload.url || null;
                             const md = typeof payload.markdown === 'string' ? payload.markdown : 'No answer.';
                             displayMessage(md, 'ai', shareUrl);
+                            if (moreResults.length) displayMessage(renderMoreResultsMarkdown(moreResults), 'ai');
+                            finished = true;
                         } else if (event === 'error') {
                             removeLoadingIndicator();
                             removeProcessingIndicator();
+                            removeStreamingMessage();
                             const msg = payload.detail || 'Error during research session.';
                             displayMessage(msg, 'ai');
+                            finished = true;
                         }
                     } catch (e) {
                         // ignore parse errors for partial chunks
                     }
                 }
             }
-            clearTimeout(timeoutId);
-        } catch (e) {
-            clearTimeout(timeoutId);
-            throw e;
         }
     }
 
@@ -427,6 +493,11 @@
         return `Top Search Results:\n\n${items.join('\n')}${extra}`;
     }
 
+    function renderMoreResultsMarkdown(results) {
+        const items = results.map((r) => `- [${escapeMd(r.title || 'Untitled')}](${r.url})`);
+        return `More Results:\n\n${items.join('\n')}`;
+    }
+
     function escapeMd(s) {
         return String(s).replace(/[\\`*_{}[\]()#+\-.!]/g, '\\$&');
     }
@@ -517,6 +588,34 @@
         if (el) el.remove();
     }
 
+    // Transient bubble for a summary that is still streaming; replaced by the final answer
+    let _streamingRenderPending = false;
+    let _streamingLatestMd = '';
+    function updateStreamingMessage(md) {
+        _streamingLatestMd = md;
+        if (_streamingRenderPending) return;
+        _streamingRenderPending = true;
+        requestAnimationFrame(() => {
+            _streamingRenderPending = false;
+            if (!_streamingLatestMd) return; // final answer already rendered
+            let el = document.getElementById('olexi-streaming');
+            if (!el) {
+                el = document.createElement('div');
+                el.id = 'olexi-streaming';
+                el.classList.add('olexi-message', 'ai-message');
+                messagesContainer.appendChild(el);
+            }
+            el.innerHTML = mdToHtml(_streamingLatestMd);
+            messagesContainer.scrollTop = messagesContainer.scrollHeight;
+        });
+    }
+
+    function removeStreamingMessage() {
+        _streamingLatestMd = '';
+        const el = document.getElementById('olexi-streaming');
+        if (el) el.remove();
+    }
+
     // --- Helpers ---
     function createIconButton(iconText, title) {
         const btn = document.createElement('button');